@@ -1,15 +1,48 @@
 import os
+import re
 import streamlit as st
 import streamlit.components.v1 as components
-from src.graph.generate_kgraph import generate_knowledge_graph
-from src.utils.file_op import hash_text , list_graph_files ,save_graph_html , file_already_exist 
-from src.model.model_info import get_ollama_models
+from src.jobs.job_queue import get_job_queue
+from src.utils.file_op import hash_text , list_graph_files , count_graph_files , file_already_exist , ensure_graph_html , graph_data_path , ensure_diff_html
+from src.utils.graph_catalog import get_catalog
+from src.graph.graph_query import load_graph_index
+from src.graph.visulization import visualize_graph, render_communities
+from src.graph.communities import load_communities
+from src.graph.graph_viewer import build_viewer_component, read_view_spec
+from src.utils.ingest import hash_stream
+from src.model.model_info import get_ollama_models, get_model_lifecycle
+from src.model.backend_pool import get_backend_pool
+from src.utils.tracing import get_tracer
 from src.config.folder_con import DATA_DIR
+from src.config.pipeline_con import RENDER_MAX_NODES, EXTRACTION_SCHEMA, COMMUNITY_TOP_MAX
+
+# Compact views are drawn by a local component page: it and vis-network are fetched once and
+# cached by the browser, and each graph only sends its compressed view spec
+graph_viewer = components.declare_component("kg_graph_viewer", path=build_viewer_component(os.path.join(DATA_DIR, "viewer")))
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def load_view(filepath, mtime):
+    """
+    A stored view, read once per file version: (view spec, None) for compact pages, else (None, html).
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        html = f.read()
+    spec = read_view_spec(html)
+    return spec, None if spec is not None else html
+
+
+def show_view(spec=None, html=None, key=None):
+    if spec is not None:
+        graph_viewer(spec=spec, key=key, default=None)
+    else:
+        components.html(html, height=1000, width=1500, scrolling=True)
+
 
 # --- Load environment variables ---
 def display_graph_html(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        components.html(f.read(), height=1000, width=1500, scrolling=True)
+    spec, html = load_view(filepath, os.path.getmtime(filepath))
+    show_view(spec, html, key=f"view:{os.path.basename(filepath)}")
 
 
 # --- Streamlit UI ---
@@ -21,44 +54,266 @@ st.sidebar.title("📄 Input Document")
 input_method = st.sidebar.radio("Choose input method:", ["Upload txt", "Input text"])
 
 text = ""
+uploaded_file = None
 if input_method == "Upload txt":
     uploaded_file = st.sidebar.file_uploader("Upload a .txt file", type=["txt"])
-    if uploaded_file:
-        text = uploaded_file.read().decode("utf-8")
 else:
     text = st.sidebar.text_area("Enter text:", height=300)
+# Graphs generated under the same document name are stored as versions of one another
+document_name = st.sidebar.text_input("Document name (links revisions as versions)",
+                                      value=uploaded_file.name if uploaded_file else "").strip()
 
 # --- Sidebar: Model Selection ---
 st.sidebar.title("🤖 Ollama Model")
-ollama_models = get_ollama_models()
+# The model list is cached in src.model.model_info, so reruns don't query Ollama each time
+ollama_models = get_ollama_models(refresh=st.sidebar.button("🔄 Refresh models"))
 if not ollama_models:
     st.sidebar.warning("⚠️ No Ollama models found. Use `ollama pull <model>` in your terminal.")
 selected_model = st.sidebar.selectbox("Select a model (fallback: gemma)", [""] + ollama_models)
+# The model starts loading when it is picked, so the first chunk of the next job does not wait for it
+model_lifecycle = get_model_lifecycle()
+if selected_model and st.session_state.get("preloaded_model") != selected_model:
+    model_lifecycle.preload(selected_model)
+    st.session_state["preloaded_model"] = selected_model
+busy_models = model_lifecycle.conflicts(selected_model or "gemma")
+if busy_models:
+    st.sidebar.warning(f"⚠️ Jobs are running on {', '.join(busy_models)}. New jobs with this model wait for them "
+                       f"instead of swapping models (KG_MAX_LOADED_MODELS={model_lifecycle.max_loaded}).")
+if ollama_models:
+    resident = model_lifecycle.resident()
+    st.sidebar.caption("Loaded in Ollama: " + (", ".join(sorted({r["model"] for r in resident})) or "none"))
+st.sidebar.caption(f"Extraction schema: `{EXTRACTION_SCHEMA}` (set with `KG_SCHEMA`)")
+
+# --- Sidebar: Corpus graph ---
+st.sidebar.title("🧩 Corpus Graph")
+append_mode = st.sidebar.checkbox("Append to a corpus graph instead of creating a new one")
+corpus_name = ""
+if append_mode:
+    corpus_name = re.sub(r"[^\w-]", "_", st.sidebar.text_input("Corpus name", value="corpus").strip())
 
+# --- Sidebar: Rendering ---
+st.sidebar.title("🖼️ Rendering")
+max_nodes = st.sidebar.number_input("Max nodes shown (0 = all)", min_value=0, value=RENDER_MAX_NODES, step=100)
+lod = st.sidebar.checkbox(
+    "Collapse hidden nodes into clusters (double-click to expand)", disabled=not max_nodes
+) and bool(max_nodes)
 
 # --- Button to generate graph ---
-if text and st.sidebar.button("Generate Knowledge Graph"):
-    hash_of_text = hash_text(text)
-    if file_already_exist(hash_of_text):
-        filepath = os.path.join(DATA_DIR, f"{hash_of_text}.html")
-        display_graph_html(filepath)
+# Extraction runs in the shared background job queue; the script thread only submits and polls
+job_queue = get_job_queue()
+st.session_state.setdefault("jobs", [])
+
+if (text or uploaded_file) and st.sidebar.button("Generate Knowledge Graph"):
+    # Uploads are hashed and processed as streams, never decoded into one big string
+    hash_of_text = hash_stream(uploaded_file) if uploaded_file else hash_text(text)
+    model_to_use = selected_model or "gemma"
+    if append_mode and corpus_name:
+        job = job_queue.submit(
+            "append", f"corpus_{corpus_name}", model_to_use,
+            text=None if uploaded_file else text, source=uploaded_file, document_id=hash_of_text,
+        )
+    elif file_already_exist(hash_of_text):
+        job = None
+        st.session_state["show_graph"] = f"{hash_of_text}.html"
     else:
-        with st.spinner("Generating knowledge graph..."):
-            model_to_use = selected_model or "gemma"
-            net = generate_knowledge_graph(text, model_to_use)
-            filename = hash_of_text + ".html"
-            save_path = save_graph_html(net, filename)
-            st.success(f"Graph saved as `{filename}`")
-            display_graph_html(save_path)
+        job = job_queue.submit(
+            "generate", hash_of_text, model_to_use, text=None if uploaded_file else text, source=uploaded_file,
+            lineage=document_name or None,
+        )
+    if job and job not in st.session_state["jobs"]:
+        st.session_state["jobs"].append(job)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "estimating..."
+    return f"~{int(seconds // 60)}m {int(seconds % 60)}s left"
+
+
+@st.fragment(run_every=2)
+def show_jobs():
+    """
+    Progress of this session's jobs; a finished job's graph is shown in the main view.
+    """
+    for job in list(st.session_state["jobs"]):
+        record = job_queue.get(job)
+        if record is None:
+            st.session_state["jobs"].remove(job)
+            continue
+        name = record["graph_name"]
+        if record["status"] == "done":
+            st.session_state["jobs"].remove(job)
+            if record["kind"] == "append":
+                st.session_state["job_message"] = f"Merged into `{name}`. Select it under Load Existing Graph to view."
+            else:
+                st.session_state["show_graph"] = f"{name}.html"
+                st.session_state["job_message"] = f"Graph saved as `{name}.html`"
+            st.rerun(scope="app")
+        elif record["status"] == "failed":
+            st.error(f"Job for `{name}` failed: {record['error']}")
+            if st.button("Dismiss", key=f"dismiss_{job}"):
+                st.session_state["jobs"].remove(job)
+                st.rerun(scope="app")
+        else:
+            total = max(record["chunks_expected"] or 0, record["chunks_total"] or 0)
+            done = record["chunks_done"] or 0
+            label = (f"`{name}` {record['status']}: {done}/{total or '?'} chunks, {format_eta(record['eta'])}"
+                     if record["status"] == "running" else f"`{name}` queued")
+            st.progress(min(done / total, 1.0) if total else 0.0, text=label)
+            show_preview(job)
+
+
+def show_preview(job):
+    """
+    Partial graph of a running job; the job rewrites it a few times per minute as chunks finish.
+    """
+    try:
+        with open(job_queue.preview_path(job), "r", encoding="utf-8") as f:
+            html = f.read()
+    except OSError:
+        return
+    st.caption("Partial graph, updated while extraction runs")
+    spec = read_view_spec(html)
+    show_view(spec, None if spec is not None else html, key=f"preview:{job}")
+
+
+if st.session_state["jobs"]:
+    show_jobs()
+if "job_message" in st.session_state:
+    st.success(st.session_state.pop("job_message"))
+if "show_graph" in st.session_state:
+    display_graph_html(ensure_graph_html(st.session_state.pop("show_graph"), max_nodes, lod))
+
+# --- Sidebar: Pipeline metrics (this process, since start) ---
+with st.sidebar.expander("📈 Pipeline Metrics"):
+    metrics = get_tracer().summary()
+    counters = metrics["counters"]
+    if not metrics["spans"]:
+        st.caption("No extraction has run yet.")
+    else:
+        llm_calls = counters.get("llm_calls", 0)
+        st.markdown(
+            f"**{counters.get('chunks', 0):.0f}** chunks, **{llm_calls:.0f}** LLM calls, "
+            f"**{counters.get('retries', 0):.0f}** retries, **{counters.get('parse_failures', 0):.0f}** parse failures, "
+            f"**{counters.get('llm_calls_saved', 0):.0f}** calls saved by dedup, "
+            f"**{counters.get('prompt_tokens_saved', 0):.0f}** prompt tokens saved by batching, "
+            f"**{counters.get('model_load_seconds', 0):.1f}** s waiting for model loads\n\n"
+            f"**{counters.get('prompt_tokens', 0):.0f}** prompt / **{counters.get('output_tokens', 0):.0f}** output "
+            f"tokens, **{counters.get('nodes', 0):.0f}** nodes, **{counters.get('edges', 0):.0f}** edges"
+        )
+        st.table([{"stage": name, "count": s["count"], "total s": s["total_s"], "avg s": s["avg_s"],
+                   "max s": s["max_s"], "errors": s["errors"]} for name, s in sorted(metrics["spans"].items())])
+    backends = get_backend_pool().status()
+    if len(backends) > 1:
+        st.table([{"host": b["host"], "healthy": b["healthy"], "circuit": b["circuit"], "in flight": b["outstanding"],
+                   "requests": b["requests"], "failures": b["failures"]} for b in backends])
+    st.caption(f"Exported to `{os.path.basename(get_tracer().trace_path)}` and "
+               f"`{os.path.basename(get_tracer().metrics_path)}` in {DATA_DIR}")
 
 # --- Sidebar: Load stored graphs ---
 st.sidebar.title("📁 Load Existing Graph")
-graph_files = list_graph_files()
+# Listing comes from the graph catalog, one page at a time, instead of scanning DATA_DIR
+GRAPHS_PER_PAGE = 50
+graph_search = st.sidebar.text_input("Search graphs (name or model)", "")
+graph_count = count_graph_files(graph_search)
+pages = max(1, -(-graph_count // GRAPHS_PER_PAGE))
+page = st.sidebar.number_input(f"Page (of {pages}, {graph_count} graphs)", min_value=1, max_value=pages, value=1) \
+    if pages > 1 else 1
+graph_files = list_graph_files(graph_search, (page - 1) * GRAPHS_PER_PAGE, GRAPHS_PER_PAGE)
 
 selected_graph = st.sidebar.selectbox("Select a graph to view:", ["-- Select --"] + graph_files)
 
+# --- Sidebar: Query the selected graph ---
+query_mode = "Whole graph"
+version = None
+if selected_graph != "-- Select --" and os.path.exists(graph_data_path(os.path.splitext(selected_graph)[0])):
+    version = get_catalog().version_of(os.path.splitext(selected_graph)[0])
+    st.sidebar.title("🔎 Query")
+    query_mode = st.sidebar.radio("Show", ["Whole graph", "Communities", "Neighborhood", "Shortest path"]
+                                  + (["Changes between versions"] if version and version["parent"] else []))
+    if query_mode == "Neighborhood":
+        focus_node = st.sidebar.text_input("Node")
+        hops = st.sidebar.slider("Hops", 1, 4, 2)
+    elif query_mode == "Shortest path":
+        path_from = st.sidebar.text_input("From")
+        path_to = st.sidebar.text_input("To")
+    elif query_mode == "Changes between versions":
+        earlier = [v for v in get_catalog().versions(version["lineage"]) if v["version"] < version["version"]]
+        base_version = st.sidebar.selectbox("Compare with", earlier[::-1], format_func=lambda v: f"v{v['version']}")
+        changes_only = st.sidebar.checkbox("Only changed entities", value=True)
+    if version:
+        st.sidebar.caption(f"Version {version['version']} of `{version['lineage']}`")
+
 if selected_graph != "-- Select --":
-    st.info(f"Showing saved graph: `{selected_graph}`")
-    filepath = os.path.join(DATA_DIR, selected_graph)
-    display_graph_html(filepath)
+    if query_mode == "Whole graph":
+        st.info(f"Showing saved graph: `{selected_graph}`")
+        filepath = ensure_graph_html(selected_graph, max_nodes, lod)
+        display_graph_html(filepath)
+    elif query_mode == "Changes between versions":
+        filepath, summary = ensure_diff_html(os.path.splitext(selected_graph)[0], base_version["name"],
+                                             changes_only, max_nodes or None)
+        if filepath is None:
+            st.warning(f"The graph of v{base_version['version']} is no longer stored.")
+        else:
+            st.info(f"Changes in v{version['version']} since v{base_version['version']}: "
+                    f"{summary['nodes_added']} entities added, {summary['nodes_removed']} removed, "
+                    f"{summary['nodes_retyped']} retyped; {summary['edges_added']} relationships added, "
+                    f"{summary['edges_removed']} removed")
+            display_graph_html(filepath)
+    elif query_mode == "Communities":
+        graph_path = graph_data_path(os.path.splitext(selected_graph)[0])
+        graph_data = load_graph_index(graph_path).graph
+        try:
+            with st.spinner("Finding communities..."):
+                hierarchy = load_communities(graph_path, graph_data)
+        except Exception as e:
+            st.error(f"Could not find the communities of `{selected_graph}`: {e}")
+            st.stop()
+        # Drill-down path per graph: the (level, community) pairs opened so far
+        drill = st.session_state.setdefault("drill", {}).setdefault(selected_graph, [])
+        level, community = drill[-1] if drill else (None, None)
+        shown_level, shown = hierarchy.contents(level, community)
+        if drill and st.sidebar.button("⬆ Up one level"):
+            drill.pop()
+            st.rerun()
+        if shown_level < 0:
+            st.info(f"Community `{hierarchy.label(level, community, graph_data.node_ids)}`: {len(shown)} entities")
+            net = render_communities(hierarchy, graph_data, level, community, max_nodes=max_nodes or None)
+        else:
+            listed = shown[:COMMUNITY_TOP_MAX]
+            st.info(f"Level {shown_level + 1} of {hierarchy.num_levels}: {len(shown)} communities"
+                    + (f", largest {len(listed)} shown" if len(listed) < len(shown) else "")
+                    + f" (modularity {hierarchy.modularity[shown_level]})")
+            pick = st.sidebar.selectbox("Drill into", [None] + list(listed), key=f"drill:{selected_graph}:{len(drill)}",
+                                        format_func=lambda c: "-- Select --" if c is None else
+                                        hierarchy.label(shown_level, c, graph_data.node_ids))
+            if pick is not None:
+                drill.append((shown_level, int(pick)))
+                st.rerun()
+            net = render_communities(hierarchy, graph_data, level, community)
+        spec = net.view_spec() if hasattr(net, "view_spec") else None
+        show_view(spec, None if spec is not None else net.generate_html(), key="community_view")
+        if shown_level >= 0:
+            st.dataframe(hierarchy.describe(shown_level, listed, graph_data))
+    else:
+        index = load_graph_index(graph_data_path(os.path.splitext(selected_graph)[0]))
+        try:
+            if query_mode == "Neighborhood" and focus_node:
+                net = visualize_graph(index.graph, max_nodes=max_nodes or None, focus=focus_node, hops=hops)
+            elif query_mode == "Shortest path" and path_from and path_to:
+                net = visualize_graph(index.graph, path=(path_from, path_to))
+            else:
+                net = None
+        except KeyError as e:
+            st.warning(f"{e.args[0]} in `{selected_graph}`")
+            net = None
+        if net is not None:
+            if not net.nodes:
+                st.warning("No path found.")
+            else:
+                st.info(f"Query result from `{selected_graph}`: {len(net.nodes)} nodes, {len(net.edges)} edges")
+                spec = net.view_spec() if hasattr(net, "view_spec") else None
+                show_view(spec, None if spec is not None else net.generate_html(), key="query_view")
+        st.sidebar.caption("Top entities by PageRank")
+        st.sidebar.table([{"node": name, "type": node_type} for name, node_type, _ in index.top_nodes(10, "pagerank")])
 
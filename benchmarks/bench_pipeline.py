@@ -0,0 +1,220 @@
+"""
+End-to-end pipeline benchmark against a fake LLM backend (no Ollama needed).
+
+    python -m benchmarks.bench_pipeline --sizes 10KB,1MB,10MB --latency 0.05 --json results.json
+    python -m benchmarks.bench_pipeline --sizes 500MB --latency 0 --render-max-nodes 2000
+    python -m benchmarks.bench_pipeline --sizes 1MB --batch-chunks 4 --prompt-tps 2000
+    python -m benchmarks.bench_pipeline --sizes 10MB --snapshot-interval 1 --no-dedup
+
+Each corpus size runs in a fresh subprocess with its own temporary data directory, reporting
+per-stage wall time (clean, split, extract, merge, render, save), peak RSS, LLM calls, calls saved
+by dedup and token counts. Results are printed as a table and optionally written as JSON for comparing runs.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import multiprocessing
+from queue import Empty
+
+FIRST = ["Alice", "Bruno", "Chen", "Dara", "Elif", "Farid", "Grace", "Hugo", "Ines", "Jonas", "Kofi", "Lena"]
+LAST = ["Nakamura", "Okafor", "Petrov", "Quinn", "Rossi", "Silva", "Tanaka", "Ulrich", "Varga", "Weber"]
+ORGS = ["Acme", "Globex", "Initech", "Umbrella", "Stark", "Wayne", "Tyrell", "Cyberdyne", "Soylent", "Hooli"]
+CITIES = ["Paris", "Lagos", "Osaka", "Lima", "Oslo", "Cairo", "Quito", "Perth", "Turin", "Dakar"]
+TEMPLATES = [
+    "{p} joined {o} Labs in {c} after working with {q}.",
+    "At {o} Labs, {p} and {q} presented the {c} roadmap.",
+    "{p} moved from {c} to lead the research group at {o} Labs.",
+    "The {c} office of {o} Labs hired {q} on the advice of {p}.",
+]
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def write_corpus(path: str, size: int, seed: int = 0):
+    """
+    Synthetic text of about `size` bytes. The entity vocabulary grows with the corpus so
+    larger inputs produce larger graphs, not just more duplicates.
+    """
+    rng = random.Random(seed)
+    people = [f"{f} {l}" for f in FIRST for l in LAST]
+    extra = max(1, int((size / 1024) ** 0.5))
+    orgs = ORGS + [f"{o}{i}" for i in range(extra) for o in ORGS[:2]]
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            sentences = []
+            for _ in range(rng.randint(3, 6)):
+                template = rng.choice(TEMPLATES)
+                sentences.append(template.format(p=rng.choice(people), q=rng.choice(people),
+                                                 o=rng.choice(orgs), c=rng.choice(CITIES)))
+            paragraph = " ".join(sentences) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def run_size(size: int, args, queue):
+    """
+    One benchmark run in a subprocess: fresh data directory, fresh counters, fresh peak RSS.
+    The corpus goes through GraphExtractor.aextract as one document, like a job or a CLI file,
+    so dedup, snapshots, batching and tracing are part of what is measured.
+    """
+    data_dir = tempfile.mkdtemp(prefix="kg_bench_")
+    os.environ["GRAPH_DIR"] = data_dir
+    # Stage times are read from the tracer
+    os.environ["KG_TRACING"] = "1"
+    # Imported after GRAPH_DIR is set so caches and catalogs land in the temporary directory
+    from benchmarks.fake_llm import FakeGraphChatModel
+    from src.config.pipeline_con import PREVIEW_MAX_NODES
+    from src.graph.generate_kgraph import GraphExtractor
+    from src.graph.graph_store import save_graph_data
+    from src.graph.visulization import render_graph
+    from src.utils.ingest import iter_lines
+    from src.utils.text_clean import iter_clean_paragraphs
+    from src.utils.tracing import TimedIterator, get_tracer
+    from src.utils.tokenizer import approx_token_count
+
+    corpus = os.path.join(data_dir, "corpus.txt")
+    write_corpus(corpus, size, args.seed)
+    llm = FakeGraphChatModel(latency=args.latency, prompt_tps=args.prompt_tps, output_tps=args.output_tps,
+                             parallel=args.parallel)
+    extractor = GraphExtractor("fake", use_cache=False, llm=llm, context_length=args.num_ctx,
+                               count_tokens=approx_token_count, batch_chunks=args.batch_chunks)
+
+    def on_snapshot(graph_data, stats):
+        # What the job queue does with each snapshot: render the capped preview
+        render_graph(graph_data, max_nodes=PREVIEW_MAX_NODES).generate_html()
+
+    total_start = time.perf_counter()
+    paragraphs = TimedIterator(iter_clean_paragraphs(iter_lines(corpus)))
+    graph_data, stats = asyncio.run(extractor.aextract(
+        paragraphs, args.concurrency, size_hint=size,
+        on_snapshot=on_snapshot if args.snapshot_interval else None,
+        snapshot_interval=args.snapshot_interval or 0, dedup=not args.no_dedup,
+    ))
+    spans = get_tracer().summary()["spans"]
+    # clean, split and extract are recorded by aextract; merge includes the snapshots
+    stages = {name: spans.get(name, {}).get("total_s", 0.0) for name in ("clean", "split", "extract", "merge")}
+
+    start = time.perf_counter()
+    html = render_graph(graph_data, max_nodes=args.render_max_nodes or None).generate_html()
+    stages["render"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    save_graph_data(graph_data, os.path.join(data_dir, "bench.npz"))
+    with open(os.path.join(data_dir, "bench.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+    stages["save"] = time.perf_counter() - start
+    total = time.perf_counter() - total_start
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    queue.put({
+        "size_bytes": size,
+        "paragraphs": paragraphs.items,
+        "chunks": stats.chunks_total,
+        "chunks_failed": stats.chunks_failed,
+        "chunk_tokens": extractor.chunk_tokens,
+        "llm_calls": llm.calls,
+        "llm_calls_saved": stats.dedup.calls_saved,
+        "paragraphs_dropped": stats.dedup.paragraphs_dropped,
+        "prompt_tokens": llm.prompt_tokens,
+        "output_tokens": llm.output_tokens,
+        "prompt_tokens_saved": stats.prompt_tokens_saved,
+        "first_chunk_s": round(stats.first_chunk, 4) if stats.first_chunk is not None else None,
+        "nodes": graph_data.num_nodes,
+        "edges": graph_data.num_edges,
+        "stages_s": {k: round(v, 4) for k, v in stages.items()},
+        "total_s": round(total, 4),
+        "mb_per_s": round(size / 1024 / 1024 / total, 3) if total else None,
+        "peak_rss_mb": round(peak / 1024 / 1024, 1),
+    })
+
+
+def _wait_result(process, queue, timeout: float):
+    """
+    Result of one run, or RuntimeError if the subprocess died without one or ran past timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=1.0)
+        except Empty:
+            pass
+        if not process.is_alive():
+            # A result put just before exiting may still be on its way through the pipe
+            try:
+                return queue.get(timeout=1.0)
+            except Empty:
+                raise RuntimeError(f"benchmark process exited with code {process.exitcode}") from None
+        if time.monotonic() > deadline:
+            process.terminate()
+            process.join()
+            raise RuntimeError(f"no result after {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10KB,100KB,1MB,10MB", help="comma-separated corpus sizes (KB/MB/GB)")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM seconds per call")
+    parser.add_argument("--prompt-tps", type=float, default=0.0, help="fake LLM prompt tokens/s (0 = instant)")
+    parser.add_argument("--output-tps", type=float, default=0.0, help="fake LLM output tokens/s (0 = instant)")
+    parser.add_argument("--parallel", type=int, default=4, help="fake server slots (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--concurrency", type=int, default=4, help="chunk extractions in flight")
+    parser.add_argument("--batch-chunks", type=int, default=1, help="chunks per request (batched prompting)")
+    parser.add_argument("--num-ctx", type=int, default=8192, help="context window used for chunk sizing")
+    parser.add_argument("--render-max-nodes", type=int, default=2000, help="node cap for the render stage (0 = all)")
+    parser.add_argument("--snapshot-interval", type=float, default=0.0,
+                        help="seconds between rendered partial-graph snapshots, as in jobs (0 = no snapshots)")
+    parser.add_argument("--no-dedup", action="store_true", help="send duplicate paragraphs and chunks to the model")
+    parser.add_argument("--timeout", type=float, default=3600.0, help="seconds to wait for one corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for size in (parse_size(s) for s in args.sizes.split(",")):
+        queue = context.Queue()
+        process = context.Process(target=run_size, args=(size, args, queue))
+        process.start()
+        try:
+            result = _wait_result(process, queue, args.timeout)
+        except RuntimeError as e:
+            print(f"{size / 1024 / 1024:9.2f} MB  failed: {e}")
+            results.append({"size_bytes": size, "error": str(e)})
+            continue
+        process.join()
+        results.append(result)
+        stages = "  ".join(f"{k} {v:7.3f}s" for k, v in result["stages_s"].items())
+        print(f"{size / 1024 / 1024:9.2f} MB  {result['chunks']:6d} chunks  {result['llm_calls']:6d} calls  "
+              f"{result['nodes']:7d} nodes  total {result['total_s']:8.2f}s  peak {result['peak_rss_mb']:7.1f} MB\n"
+              f"             {stages}")
+
+    if args.json:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": vars(args),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Microbenchmark: current text cleaner vs the previous six-pass implementation.
+
+    python -m benchmarks.bench_text_clean --mb 20
+"""
+import os
+import re
+import time
+import argparse
+import tempfile
+import tracemalloc
+from src.utils.text_clean import clean_text, iter_clean_paragraphs
+
+
+def legacy_clean_text(text: str) -> str:
+    """
+    The original implementation (six full-string passes, newlines collapsed).
+    """
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'\+?\d[\d\s-]{7,}\d', '', text)
+    text = re.sub(r'[^a-zA-Z0-9\s.,;:!?()-]', '', text)
+    text = re.sub(r'\n+', '\n', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+PARAGRAPH = (
+    "Élodie Durand joined Acme Corp. in 2019 (see https://acme.example/team or mail "
+    "elodie@acme.example).   She leads the São Paulo office; call +55 11 5555-1234!\n"
+    "The office works closely with Zürich & Kraków teams on \"Project Ørsted\".\n\n"
+)
+
+
+def make_corpus(mb: float) -> str:
+    return PARAGRAPH * max(1, int(mb * 1024 * 1024 / len(PARAGRAPH.encode("utf-8"))))
+
+
+def measure(label, fn):
+    """
+    Time one run, then trace allocations in a second run (tracemalloc distorts timings).
+    """
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {elapsed:8.3f}s   peak {peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=10, help="corpus size in MB")
+    args = parser.parse_args()
+
+    text = make_corpus(args.mb)
+    print(f"Corpus: {len(text.encode('utf-8')) / 1024 / 1024:.1f} MB\n")
+
+    measure("legacy clean_text", lambda: legacy_clean_text(text))
+    measure("clean_text (ascii)", lambda: clean_text(text, keep_unicode=False))
+    measure("clean_text (unicode)", lambda: clean_text(text))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", encoding="utf-8", delete=False) as f:
+        f.write(text)
+
+    def stream():
+        with open(f.name, encoding="utf-8") as source:
+            for _ in iter_clean_paragraphs(source):
+                pass
+
+    try:
+        measure("iter_clean_paragraphs (file)", stream)
+    finally:
+        os.remove(f.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Deterministic stand-in for ChatOllama, so the extraction pipeline can be measured without a server.
+
+It answers LLMGraphTransformer's structured-output (tool call) requests, and batched requests
+with numbered sections, with a synthetic graph built from the capitalized names in each chunk,
+and simulates an Ollama server: fixed latency per
+call, prompt and generation throughput, and a bounded number of parallel slots.
+"""
+import re
+import asyncio
+import hashlib
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_NAME_RE = re.compile(r"\b[A-Z][a-z]+(?: [A-Z][a-z]+)*")
+_TYPES = ("Person", "Organization", "Location", "Concept", "Event")
+_RELATIONS = ("WORKS_AT", "LOCATED_IN", "KNOWS", "PART_OF", "RELATED_TO")
+_SECTION_RE = re.compile(r"^### Section (\d+)\n", re.MULTILINE)
+
+
+def _stable_index(text: str, modulo: int) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little") % modulo
+
+
+class FakeGraphChatModel(BaseChatModel):
+    """
+    Fake chat model with tool calling. Output depends only on the input text, so runs are
+    reproducible; counters (calls, prompt/output tokens) are kept for reporting.
+    """
+
+    latency: float = 0.0
+    prompt_tps: float = 0.0
+    output_tps: float = 0.0
+    parallel: int = 4
+    max_entities: int = 12
+    temperature: float = 0.0
+    calls: int = 0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    _slots: Any = None
+    _slots_loop: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-graph-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+    def _graph_args(self, text: str) -> dict:
+        names = list(dict.fromkeys(_NAME_RE.findall(text)))[:self.max_entities]
+        nodes = [{"id": name, "type": _TYPES[_stable_index(name, len(_TYPES))]} for name in names]
+        relationships = []
+        for a, b in zip(nodes, nodes[1:]):
+            relationships.append({
+                "source_node_id": a["id"], "source_node_type": a["type"],
+                "target_node_id": b["id"], "target_node_type": b["type"],
+                "type": _RELATIONS[_stable_index(a["id"] + b["id"], len(_RELATIONS))],
+            })
+        return {"nodes": nodes, "relationships": relationships}
+
+    def _sections_args(self, text: str) -> dict:
+        parts = _SECTION_RE.split(text)
+        return {"sections": [{"section": int(number), **self._graph_args(body)}
+                             for number, body in zip(parts[1::2], parts[2::2])]}
+
+    def answer(self, text: str, batched: bool = False) -> dict:
+        """
+        Structured output for the last (human) message of an extraction request.
+        """
+        # The chunk follows the transformer's instructions; batches list numbered sections
+        chunk = text.rsplit("input:", 1)[-1] if not batched else text.split("Input:", 1)[-1]
+        return self._sections_args(chunk) if batched else self._graph_args(chunk)
+
+    def _respond(self, messages: List[BaseMessage], tools) -> tuple:
+        text = "\n".join(str(m.content) for m in messages)
+        name = self._tool_name(tools[0]) if tools else "DynamicGraph"
+        args = self.answer(str(messages[-1].content) if messages else "", batched=name == "SectionGraphs")
+        prompt_tokens = max(1, len(text) // 4)
+        output_tokens = max(1, len(str(args)) // 4)
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        message = AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": f"call_{self.calls}"}],
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": output_tokens,
+                            "total_tokens": prompt_tokens + output_tokens},
+        )
+        delay = self.latency
+        if self.prompt_tps:
+            delay += prompt_tokens / self.prompt_tps
+        if self.output_tps:
+            delay += output_tokens / self.output_tps
+        return ChatResult(generations=[ChatGeneration(message=message)]), delay
+
+    @staticmethod
+    def _tool_name(tool) -> str:
+        if isinstance(tool, dict):
+            return tool.get("function", tool).get("name", "DynamicGraph")
+        return getattr(tool, "__name__", "DynamicGraph")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, tools=None, **kwargs) -> ChatResult:
+        result, delay = self._respond(messages, tools)
+        if delay:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, tools=None, **kwargs) -> ChatResult:
+        # Server slots: requests beyond `parallel` queue like on OLLAMA_NUM_PARALLEL
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(max(1, self.parallel))
+            self._slots_loop = loop
+        async with self._slots:
+            result, delay = self._respond(messages, tools)
+            if delay:
+                await asyncio.sleep(delay)
+        return result
+
+    def reset_counters(self):
+        self.calls = self.prompt_tokens = self.output_tokens = 0
@@ -0,0 +1,210 @@
+"""
+Stub Ollama servers for exercising the backend pool without GPUs.
+
+    python -m benchmarks.stub_ollama --ports 11501,11502 --latency 0.2
+    OLLAMA_HOSTS=http://127.0.0.1:11501,http://127.0.0.1:11502 python cli.py docs/ --model stub --no-cache
+
+Each port serves the endpoints the pipeline uses: /api/tags (health checks and model lists),
+/api/show (context length), /api/ps (loaded models), /api/generate (token counting and
+preloading) and /api/chat, which answers extraction requests, single or batched, with the
+synthetic graphs of benchmarks.fake_llm.
+--fail-rate makes a share of chat requests fail with HTTP 500 (circuit breaking), and
+stopping one process while the others keep running shows requests moving to healthy hosts.
+--load-time makes the first request for a model wait that long, as loading it would; models
+stay loaded for the request's keep_alive (listed by /api/ps) and at most --max-loaded at once,
+the least recently used being unloaded first.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.fake_llm import FakeGraphChatModel
+
+
+class StubOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int, models, latency: float = 0.0, fail_rate: float = 0.0,
+                 context_length: int = 8192, parallel: int = 4, seed: int = 0, load_time: float = 0.0,
+                 max_loaded: int = 1):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.models = list(models)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.context_length = context_length
+        self.slots = threading.Semaphore(max(1, parallel))
+        self.fake = FakeGraphChatModel()
+        self.random = random.Random(seed + port)
+        self.lock = threading.Lock()
+        self.chats = 0
+        self.failures = 0
+        self.load_time = load_time
+        self.max_loaded = max(1, max_loaded)
+        # Loaded models, least recently used first, with the time (epoch) they unload at
+        self.loaded = OrderedDict()
+        self.load_lock = threading.Lock()
+        self.loads = 0
+
+    def load(self, model: str, keep_alive) -> float:
+        """
+        Make `model` resident for keep_alive; returns the seconds spent loading it.
+        """
+        with self.load_lock:
+            now = time.time()
+            for name in [name for name, expires in self.loaded.items() if expires <= now]:
+                del self.loaded[name]
+            waited = 0.0
+            if model not in self.loaded:
+                while len(self.loaded) >= self.max_loaded:
+                    self.loaded.popitem(last=False)
+                time.sleep(self.load_time)
+                waited = self.load_time
+                self.loads += 1
+            self.loaded[model] = time.time() + _keep_alive_seconds(keep_alive)
+            self.loaded.move_to_end(model)
+            if self.loaded[model] <= now:
+                del self.loaded[model]
+            return waited
+
+
+def _keep_alive_seconds(keep_alive) -> float:
+    # Ollama's default is 5 minutes; negative values keep the model loaded
+    if keep_alive is None:
+        return 300.0
+    if isinstance(keep_alive, str) and keep_alive[-1:] in ("s", "m", "h"):
+        seconds = float(keep_alive[:-1]) * {"s": 1, "m": 60, "h": 3600}[keep_alive[-1]]
+    else:
+        seconds = float(keep_alive)
+    return float("inf") if seconds < 0 else seconds
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubOllama
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send(200, {"models": [{"model": m, "name": m, "digest": f"stub-{m}", "size": 0}
+                                        for m in self.server.models]})
+        elif self.path == "/api/ps":
+            with self.server.load_lock:
+                loaded = [(m, expires) for m, expires in self.server.loaded.items() if expires > time.time()]
+            self._send(200, {"models": [
+                {"model": m, "name": m, "digest": f"stub-{m}", "size": 0, "size_vram": 0,
+                 "expires_at": datetime.fromtimestamp(min(expires, 4e9), timezone.utc).isoformat()}
+                for m, expires in loaded]})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "")
+        if self.path in ("/api/show", "/api/generate", "/api/chat") and model not in self.server.models:
+            self._send(404, {"error": f"model '{model}' not found"})
+        elif self.path == "/api/show":
+            self._send(200, {"model_info": {"stub.context_length": self.server.context_length},
+                             "details": {"family": "stub"}})
+        elif self.path == "/api/generate":
+            load = self.server.load(model, request.get("keep_alive"))
+            self._send(200, {"model": model, "response": "", "done": True, "load_duration": int(load * 1e9),
+                             "prompt_eval_count": max(1, len(request.get("prompt", "")) // 4), "eval_count": 1})
+        elif self.path == "/api/chat":
+            self._chat(request)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _chat(self, request):
+        server = self.server
+        with server.lock:
+            server.chats += 1
+            fail = server.random.random() < server.fail_rate
+            server.failures += fail
+        load = server.load(request.get("model"), request.get("keep_alive"))
+        with server.slots:
+            if server.latency:
+                time.sleep(server.latency)
+        if fail:
+            self._send(500, {"error": "stub failure"})
+            return
+        messages = request.get("messages") or [{}]
+        text = str(messages[-1].get("content", ""))
+        schema = request.get("format")
+        batched = isinstance(schema, dict) and "sections" in schema.get("properties", {})
+        args = server.fake.answer(text, batched=batched)
+        message = {"role": "assistant", "content": ""}
+        if isinstance(schema, dict) or not request.get("tools"):
+            message["content"] = json.dumps(args)
+        else:
+            name = request["tools"][0]["function"]["name"]
+            message["tool_calls"] = [{"function": {"name": name, "arguments": args}}]
+        prompt_tokens = max(1, sum(len(str(m.get("content", ""))) for m in messages) // 4)
+        final = {"model": request.get("model"), "created_at": "2024-01-01T00:00:00Z", "message": message,
+                 "done": True, "done_reason": "stop", "load_duration": int(load * 1e9),
+                 "prompt_eval_count": prompt_tokens,
+                 "eval_count": max(1, len(json.dumps(args)) // 4)}
+        if request.get("stream", True):
+            data = (json.dumps(final) + "\n").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send(200, final)
+
+
+def serve(ports, models, **options):
+    """
+    Start one stub server per port in background threads; returns the servers (call shutdown()).
+    """
+    servers = []
+    for port in ports:
+        server = StubOllama(port, models, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ports", default="11501,11502", help="comma-separated ports, one stub server each")
+    parser.add_argument("--models", default="stub", help="comma-separated model names to serve")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per chat request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of chat requests answered with 500")
+    parser.add_argument("--parallel", type=int, default=4, help="chat requests served at once per server")
+    parser.add_argument("--num-ctx", type=int, default=8192, help="context length reported by /api/show")
+    parser.add_argument("--load-time", type=float, default=0.0, help="seconds to load a model that is not loaded")
+    parser.add_argument("--max-loaded", type=int, default=1, help="models kept loaded at once per server")
+    args = parser.parse_args()
+
+    servers = serve([int(p) for p in args.ports.split(",")], args.models.split(","), latency=args.latency,
+                    fail_rate=args.fail_rate, context_length=args.num_ctx, parallel=args.parallel,
+                    load_time=args.load_time, max_loaded=args.max_loaded)
+    print("Serving " + ", ".join(f"http://127.0.0.1:{s.server_address[1]}" for s in servers) + " (Ctrl+C stops)")
+    try:
+        while True:
+            time.sleep(10)
+            print("  ".join(f":{s.server_address[1]} {s.chats} chats / {s.failures} failed / {s.loads} loads"
+                            for s in servers))
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
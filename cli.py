@@ -0,0 +1,161 @@
+"""
+Headless batch extraction: turn a directory or glob of .txt files into stored knowledge graphs.
+
+    python cli.py docs/ --model gemma3:4b --html
+    python cli.py "corpus/**/*.txt" --corpus papers --workers 4
+
+Every file is stored as <output dir>/<content hash>.npz (the same naming the Streamlit app
+uses, so results show up under Load Existing Graph), or merged into corpus_<name>.npz with
+--corpus. Files whose output already exists are skipped, so an interrupted run resumes where
+it stopped; within a file, finished chunks come back from the chunk cache. With --versions,
+an edited file's new graph is stored as the next version of the file's previous graph.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract knowledge graphs from text files without the UI.")
+    parser.add_argument("inputs", nargs="+", help="Text files, directories (searched recursively) or glob patterns")
+    parser.add_argument("--model", default=None, help="Ollama model (default: gemma3:4b)")
+    parser.add_argument("--out", default=None, help="Output directory (default: GRAPH_DIR or Data)")
+    parser.add_argument("--corpus", default=None, help="Merge every file into corpus_<name> instead of one graph per file")
+    parser.add_argument("--html", action="store_true", help="Also render an HTML view per graph")
+    parser.add_argument("--workers", type=int, default=None, help="Files processed at once (default: KG_JOB_WORKERS)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="LLM calls in flight across all files (default: KG_MAX_CONCURRENCY)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the per-chunk extraction cache")
+    parser.add_argument("--schema", default=None, help="Extraction schema: open, general, business, science or a "
+                                                       "JSON file (default: KG_SCHEMA)")
+    parser.add_argument("--versions", action="store_true",
+                        help="Store each file's graph as a new version of the previous graph of the same path, "
+                             "as changes against it")
+    parser.add_argument("--pattern", default="*.txt", help="File pattern inside directories (default: *.txt)")
+    parser.add_argument("--log", default=None, help="JSON lines file with one record per processed file "
+                                                    "(default: <out>/batch_log.jsonl)")
+    return parser.parse_args(argv)
+
+
+def collect_files(inputs, pattern="*.txt"):
+    """
+    Expand files, directories and glob patterns into a sorted, de-duplicated file list.
+    """
+    files = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "**", pattern), recursive=True))
+        elif os.path.isfile(item):
+            files.add(item)
+        else:
+            files.update(glob.glob(item, recursive=True))
+    return sorted(f for f in files if os.path.isfile(f))
+
+
+async def run_batch(files, args):
+    # Imported here so --out can set GRAPH_DIR before the data directory is resolved
+    from src.config.pipeline_con import MAX_CONCURRENCY, JOB_WORKERS
+    from src.graph.generate_kgraph import GraphExtractor, merge_into_graph
+    from src.graph.graph_store import load_manifest
+    from src.graph.visulization import render_graph
+    from src.utils.file_op import graph_data_path, save_graph, save_graph_html, file_already_exist
+    from src.utils.ingest import hash_stream, iter_lines
+    from src.utils.text_clean import iter_clean_paragraphs
+    from src.config.folder_con import DATA_DIR
+
+    concurrency = args.concurrency or MAX_CONCURRENCY
+    workers = max(1, args.workers or JOB_WORKERS)
+    # One client, transformer and token budget for the whole batch; the semaphore bounds the
+    # LLM calls in flight across all files
+    extractor = GraphExtractor(args.model, use_cache=not args.no_cache, max_in_flight=concurrency,
+                               schema=args.schema)
+    corpus = f"corpus_{args.corpus}" if args.corpus else None
+    merged = set()
+    if corpus and os.path.exists(graph_data_path(corpus)):
+        merged = set(load_manifest(graph_data_path(corpus))["meta"].get("documents", []))
+
+    log_path = args.log or os.path.join(DATA_DIR, "batch_log.jsonl")
+    totals = {"done": 0, "skipped": 0, "failed": 0, "chunks": 0, "chunks_failed": 0, "tokens": 0}
+    merge_lock = asyncio.Lock()
+    file_iter = iter(enumerate(files, 1))
+    started = time.perf_counter()
+
+    def log(record):
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    async def process(index, path):
+        digest = hash_stream(path)
+        name = corpus or digest
+        if (corpus and digest in merged) or (not corpus and file_already_exist(name)):
+            totals["skipped"] += 1
+            print(f"[{index}/{len(files)}] skip {path} (already processed)")
+            return
+
+        t0 = time.perf_counter()
+        paragraphs = iter_clean_paragraphs(iter_lines(path))
+        graph_data, stats = await extractor.aextract(paragraphs, concurrency, size_hint=os.path.getsize(path))
+        if corpus:
+            # Merges load, update and save the same file; one at a time
+            async with merge_lock:
+                graph_data = merge_into_graph(corpus, graph_data, digest)
+                merged.add(digest)
+        else:
+            save_graph(graph_data, name, lineage=os.path.normpath(path) if args.versions else None)
+        if args.html:
+            save_graph_html(render_graph(graph_data), f"{name}.html")
+
+        totals["done"] += 1
+        totals["chunks"] += stats.chunks_total
+        totals["chunks_failed"] += stats.chunks_failed
+        totals["tokens"] += stats.tokens
+        log({"file": path, "hash": digest, "graph": name, "chunks": stats.chunks_total,
+             "chunks_failed": stats.chunks_failed, "tokens": stats.tokens,
+             "seconds": round(time.perf_counter() - t0, 2)})
+        print(f"[{index}/{len(files)}] {path} -> {name}.npz ({stats.summary()})")
+
+    async def worker():
+        for index, path in file_iter:
+            try:
+                await process(index, path)
+            except Exception as e:
+                totals["failed"] += 1
+                log({"file": path, "error": str(e)})
+                print(f"[{index}/{len(files)}] FAILED {path}: {e}")
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"\n{totals['done']} files processed, {totals['skipped']} skipped, {totals['failed']} failed "
+        f"in {elapsed:.1f}s\n"
+        f"{totals['chunks']} chunks ({totals['chunks_failed']} failed), {totals['tokens']} tokens: "
+        f"{totals['done'] / elapsed:.2f} files/s, {totals['chunks'] / elapsed:.2f} chunks/s, "
+        f"{totals['tokens'] / elapsed:.0f} tokens/s [workers={workers}, concurrency={concurrency}]"
+    )
+    if extractor.cache is not None:
+        print(f"Chunk cache: {extractor.cache.summary()}")
+    extractor.tracer.flush()
+    print(f"Traces: {extractor.tracer.trace_path}, metrics: {extractor.tracer.metrics_path}")
+    return totals
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.out:
+        os.environ["GRAPH_DIR"] = args.out
+    files = collect_files(args.inputs, args.pattern)
+    if not files:
+        print("No input files found.")
+        return 1
+    print(f"{len(files)} files to process")
+    totals = asyncio.run(run_batch(files, args))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Ollama servers chunk extraction is spread over (comma-separated URLs, defaults to
+# OLLAMA_HOST). The first one also answers model list and context length lookups.
+OLLAMA_HOSTS = [
+    h.strip().rstrip("/")
+    for h in os.getenv("OLLAMA_HOSTS", os.getenv("OLLAMA_HOST", "http://localhost:11434")).split(",")
+    if h.strip()
+]
+
+# Number of chunk extractions kept in flight against Ollama.
+# Match this to OLLAMA_NUM_PARALLEL times the number of hosts for best throughput.
+MAX_CONCURRENCY = int(os.getenv("KG_MAX_CONCURRENCY",
+                                str(int(os.getenv("OLLAMA_NUM_PARALLEL", "4")) * len(OLLAMA_HOSTS))))
+
+# Per-chunk retry policy (exponential backoff with jitter)
+MAX_RETRIES = int(os.getenv("KG_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("KG_RETRY_BACKOFF", "1.0"))
+
+# Bump whenever the extraction prompt/transformer settings change so cached
+# chunk extractions from older prompts are not reused.
+EXTRACTION_PROMPT_VERSION = "1"
+
+# Size bound of the per-chunk extraction cache (LRU eviction beyond this)
+CHUNK_CACHE_MAX_MB = float(os.getenv("KG_CHUNK_CACHE_MB", "512"))
+
+# Upper bound on the context window requested from Ollama (num_ctx). Larger
+# windows mean fewer calls per document but more memory on the server.
+MAX_NUM_CTX = int(os.getenv("KG_MAX_NUM_CTX", "8192"))
+
+# Expected extraction output (JSON graph) per input token, reserved in the context window
+OUTPUT_TOKEN_RATIO = float(os.getenv("KG_OUTPUT_TOKEN_RATIO", "0.75"))
+
+# Graph views with more nodes than this get positions computed server-side with physics
+# disabled in the browser (layout="auto"); vis.js physics stalls on a few thousand nodes.
+STATIC_LAYOUT_MIN_NODES = int(os.getenv("KG_STATIC_LAYOUT_MIN_NODES", "400"))
+# Above this many shown nodes the server-side layout is spectral only (no force refinement)
+FORCE_LAYOUT_MAX_NODES = int(os.getenv("KG_FORCE_LAYOUT_MAX_NODES", "5000"))
+# Default node cap for rendered views (0 = show all)
+RENDER_MAX_NODES = int(os.getenv("KG_RENDER_MAX_NODES", "0"))
+
+# Seconds the Ollama model list is cached before it is fetched again; context lengths
+# are kept until the model's digest changes
+MODEL_INFO_TTL = float(os.getenv("KG_MODEL_INFO_TTL", "60"))
+# Seconds to wait when connecting to Ollama (requests themselves are not time-limited)
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("KG_OLLAMA_CONNECT_TIMEOUT", "3"))
+
+# Graph generation jobs run at once in the background job queue. The chunk concurrency
+# above is shared between them, so the load on Ollama stays bounded.
+JOB_WORKERS = int(os.getenv("KG_JOB_WORKERS", "2"))
+
+# Pipeline spans/counters (Data/traces.jsonl, Data/metrics.prom); cheap enough to leave on
+TRACING_ENABLED = os.getenv("KG_TRACING", "1").lower() not in ("0", "false", "no")
+TRACE_MAX_MB = float(os.getenv("KG_TRACE_MAX_MB", "50"))
+
+# Partial graph snapshots while a document is extracted: seconds between snapshots (the
+# first one comes with the first finished chunk) and the node cap of the preview view
+SNAPSHOT_INTERVAL = float(os.getenv("KG_SNAPSHOT_INTERVAL", "15"))
+PREVIEW_MAX_NODES = int(os.getenv("KG_PREVIEW_MAX_NODES", "300"))
+
+# Compact graph views: shared styles in vis.js groups/options, gzip-compressed node and edge
+# columns and locally served vis-network files. 0 writes the classic pyvis page (CDN assets)
+COMPACT_HTML = os.getenv("KG_COMPACT_HTML", "1").lower() not in ("0", "false", "no")
+
+# Dedup before extraction (repeated paragraphs, chunks within KG_DEDUP_DISTANCE SimHash bits
+# of an earlier chunk) and after it (relationships read twice from chunk overlaps)
+DEDUP_ENABLED = os.getenv("KG_DEDUP", "1").lower() not in ("0", "false", "no")
+DEDUP_MAX_DISTANCE = int(os.getenv("KG_DEDUP_DISTANCE", "3"))
+
+# Backend pool: seconds between health checks (reachability and model list per host),
+# consecutive failed requests that open a host's circuit, and seconds an open circuit
+# waits before one trial request is let through
+BACKEND_HEALTH_INTERVAL = float(os.getenv("KG_BACKEND_HEALTH_INTERVAL", "30"))
+BACKEND_FAILURE_THRESHOLD = int(os.getenv("KG_BACKEND_FAILURES", "3"))
+BACKEND_COOLDOWN = float(os.getenv("KG_BACKEND_COOLDOWN", "30"))
+
+# Batched prompting: up to KG_BATCH_CHUNKS short chunks share one extraction request and its
+# prompt (1 = one request per chunk). Chunks keep their single-request size, so only those
+# that fit the context window together are batched; a partial batch waits KG_BATCH_WAIT
+# seconds for more chunks before it is sent.
+BATCH_CHUNKS = int(os.getenv("KG_BATCH_CHUNKS", "1"))
+BATCH_WAIT = float(os.getenv("KG_BATCH_WAIT", "0.05"))
+
+# Extraction schema: a preset from src/graph/schemas.py (open, general, business, science)
+# or a JSON file. Its node/relationship types constrain the model's structured output, and
+# relationship synonyms are collapsed onto them before the graph is built. The default,
+# open, leaves the types free (only case and separators of relationship types are
+# normalized) and keeps existing chunk cache entries valid.
+EXTRACTION_SCHEMA = os.getenv("KG_SCHEMA", "open")
+
+# Versions of a document (graphs linked by document name) are stored as node/edge deltas
+# against the previous version; every KG_VERSION_KEYFRAME-th version is stored in full, so
+# loading one reads at most that many files
+VERSION_KEYFRAME_INTERVAL = int(os.getenv("KG_VERSION_KEYFRAME", "8"))
+
+# Community views: communities are merged level by level until at most this many are left,
+# which are shown first (see src/graph/communities.py)
+COMMUNITY_TOP_MAX = int(os.getenv("KG_COMMUNITY_TOP", "50"))
+
+# Model lifecycle: how long Ollama keeps a model loaded after its last request (Ollama
+# duration such as "30m", or -1 to keep it until unloaded), and how many different models
+# it can hold at once. Jobs needing another model wait while that many are in use.
+_keep_alive = os.getenv("KG_KEEP_ALIVE", "30m")
+MODEL_KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+MAX_LOADED_MODELS = int(os.getenv("KG_MAX_LOADED_MODELS", os.getenv("OLLAMA_MAX_LOADED_MODELS", "1")))
@@ -0,0 +1,205 @@
+import json
+import asyncio
+from contextlib import nullcontext
+from typing import List
+from pydantic import Field, create_model
+from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate
+from langchain_community.graphs.graph_document import GraphDocument
+from langchain_experimental.graph_transformers.llm import (
+    _convert_to_graph_document, _parse_and_clean_json, _format_nodes, _format_relationships
+)
+from src.config.pipeline_con import BATCH_WAIT
+
+SECTION_HEADER = "### Section {number}"
+
+# Follows the transformer's own system prompt, so every request (single or batched) starts
+# with the same tokens and Ollama can reuse the cached prompt prefix; only sections vary
+BATCH_INSTRUCTIONS = (
+    " Tip: Make sure to answer in the correct format and do not include any explanations."
+    " The input is split into sections, each starting with a '### Section <number>' line."
+    " Extract a separate knowledge graph from every section: return one entry per section in"
+    " `sections`, with the section number and only the nodes and relationships found in that"
+    " section's text. Input:\n"
+)
+
+
+def batch_schema(graph):
+    """
+    Structured output for a batched request: a list of per-section graphs, each the
+    single-chunk graph model (see ExtractionSchema.graph_model) plus the section number
+    (asked for first).
+    """
+    section = create_model(
+        "GraphSection",
+        section=(int, Field(..., description="Number of the section the graph was extracted from")),
+        **{name: (field.annotation, field) for name, field in graph.model_fields.items()},
+    )
+    return create_model(
+        "SectionGraphs",
+        sections=(List[section], Field(..., description="One knowledge graph per input section")),
+    )
+
+
+def build_batch_chain(graph_transformer, llm, graph_model, instructions: str = ""):
+    """
+    Prompt | structured LLM for batched requests, sharing the transformer's system prompt
+    (and the schema instructions, which precede the sections like they precede a chunk).
+    """
+    system = graph_transformer.chain.first.messages[0]
+    prompt = ChatPromptTemplate.from_messages([
+        system, HumanMessagePromptTemplate.from_template(instructions + BATCH_INSTRUCTIONS + "{input}")
+    ])
+    return prompt | llm.with_structured_output(batch_schema(graph_model), include_raw=True)
+
+
+def format_sections(docs) -> str:
+    return "\n\n".join(f"{SECTION_HEADER.format(number=i + 1)}\n{doc.page_content}" for i, doc in enumerate(docs))
+
+
+def parse_sections(response, docs):
+    """
+    GraphDocument per doc from a batched response, or None for sections that are missing,
+    duplicated, out of range or empty (those are re-extracted on their own).
+    """
+    results = [None] * len(docs)
+    parsed = response.get("parsed") if isinstance(response, dict) else None
+    sections = parsed.sections if parsed is not None else _raw_sections(response)
+    for section in sections or []:
+        number = section.get("section") if isinstance(section, dict) else section.section
+        i = number - 1 if isinstance(number, int) else -1
+        if not 0 <= i < len(docs) or results[i] is not None:
+            continue
+        nodes, relationships = _section_graph(section)
+        if nodes:
+            results[i] = GraphDocument(nodes=nodes, relationships=relationships, source=docs[i])
+    return results
+
+
+def _raw_sections(response):
+    """
+    Sections from the raw message when the whole response failed validation (e.g. one label
+    outside the schema), so the valid sections are still used.
+    """
+    raw = response.get("raw") if isinstance(response, dict) else None
+    try:
+        if getattr(raw, "tool_calls", None):
+            args = raw.tool_calls[0]["args"]
+        else:
+            args = json.loads(raw.content)
+        sections = args["sections"]
+        return [s for s in sections if isinstance(s, dict)] if isinstance(sections, list) else None
+    except Exception:
+        return None
+
+
+def _section_graph(section):
+    if not isinstance(section, dict):
+        return _convert_to_graph_document({"parsed": section, "raw": None})
+    try:
+        nodes, relationships = _parse_and_clean_json({"nodes": section.get("nodes") or [],
+                                                      "relationships": section.get("relationships") or []})
+    except Exception:
+        return [], []
+    return _format_nodes(nodes), _format_relationships(relationships)
+
+
+class BatchExtractor:
+    """
+    Coalesces concurrent single-chunk extract calls into batched requests.
+
+    Callers await one chunk each, as with the plain extract call, so the scheduler, cache,
+    retries and dedup are unchanged. Only chunks of at most half of `max_tokens` (the section
+    text one batched request has room for) are held back; longer ones are extracted on their
+    own right away. Held chunks are sent together once `batch_size` are waiting or the next
+    one would not fit, or after `max_wait` seconds for a partial batch. At most `max_requests`
+    requests (batched or single) run at once. extract_batch(docs) returns one
+    GraphDocument or None per doc; None (a section the model did not answer usably) falls
+    back to extract_single(doc). Errors of the batched request itself are raised for every
+    chunk in it, so the scheduler retries them (in new batches).
+    """
+
+    def __init__(self, extract_batch, extract_single, batch_size: int, max_tokens: int, count_tokens,
+                 max_requests: int = None, max_wait: float = BATCH_WAIT):
+        self.extract_batch = extract_batch
+        self.extract_single = extract_single
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.max_requests = max_requests
+        self.max_wait = max_wait
+        self._pending = []
+        self._pending_tokens = 0
+        self._timer = None
+        self._tasks = set()
+        self._semaphore = None
+        self._limit = None
+
+    def _request(self):
+        if self.max_requests is None:
+            return nullcontext()
+        if self._semaphore is None or self._limit != self.max_requests:
+            self._semaphore, self._limit = asyncio.Semaphore(self.max_requests), self.max_requests
+        return self._semaphore
+
+    async def __call__(self, doc):
+        tokens = self.count_tokens(doc.page_content)
+        if tokens > self.max_tokens // 2:
+            # No other chunk of this size fits in the same request
+            async with self._request():
+                return await self.extract_single(doc)
+        if self._pending_tokens + tokens > self.max_tokens:
+            self._send()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((doc, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.batch_size:
+            self._send()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._send)
+        return await future
+
+    def _send(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        self._pending_tokens = 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        batch = [(doc, future) for doc, future in batch if not future.done()]
+        if not batch:
+            return
+        if len(batch) == 1:
+            results = [None]
+        else:
+            try:
+                async with self._request():
+                    results = await self.extract_batch([doc for doc, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        fallbacks = []
+        for (doc, future), result in zip(batch, results):
+            if result is None:
+                fallbacks.append(self._single(doc, future))
+            elif not future.done():
+                future.set_result(result)
+        await asyncio.gather(*fallbacks)
+
+    async def _single(self, doc, future):
+        try:
+            async with self._request():
+                result = await self.extract_single(doc)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,316 @@
+import os
+import io
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.graph.graph_store import GraphData, load_graph_data, load_manifest
+from src.graph.graph_query import _csr, _gather
+from src.config.pipeline_con import COMMUNITY_TOP_MAX
+from src.utils.tracing import traced
+
+COMMUNITY_FORMAT_VERSION = 1
+# Stored next to the graph as <name>.communities.npz
+COMMUNITY_SUFFIX = ".communities"
+# Members listed per community (highest degree first)
+KEY_MEMBERS = 5
+
+
+def _local_moving(n, src, dst, weight, loops, max_iter=30, seed=0):
+    """
+    Modularity label propagation (the local moving phase of Louvain, run for all nodes at once).
+
+    Every iteration scores, for each node, the communities of its neighbors with the Louvain
+    gain w(node, community) - degree(node) * total_degree(community) / 2m, from one sort of
+    the node's edges, and a random half of the nodes that gain by moving join their best
+    community. Updating only half avoids the oscillation of fully synchronous moves. After the
+    first pass only nodes next to a move (or still wanting to move) are scored again.
+    Edges are undirected without self-loops; loops holds the self-loop weight of every node
+    (the internal weight of aggregated communities). Returns a label per node.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    degree = np.bincount(src, weights=weight, minlength=n) + np.bincount(dst, weights=weight, minlength=n)
+    degree = degree + 2 * loops
+    m2 = degree.sum()
+    if m2 == 0 or len(src) == 0:
+        return labels
+    rng = np.random.default_rng(seed)
+    # Random priority per label breaks ties between equally good communities
+    priority = rng.random(n) * 1e-9
+    edge_ids = np.arange(2 * len(src), dtype=np.int64)
+    indptr, neighbors, order = _csr(n, np.concatenate([src, dst]), np.concatenate([dst, src]), edge_ids)
+    w = np.concatenate([weight, weight])[order]
+    total = np.bincount(labels, weights=degree, minlength=n)
+    active = np.flatnonzero(np.diff(indptr) > 0)
+    tol = max(1, n // 1000)
+    for _ in range(max_iter):
+        pos, owner = _gather(indptr, neighbors, active)
+        key = owner * n + labels[neighbors[pos]]
+        sort = np.argsort(key)
+        key = key[sort]
+        starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+        w_ic = np.add.reduceat(w[pos[sort]], starts)
+        run_node, run_label = key[starts] // n, key[starts] % n
+        own = run_label == labels[run_node]
+        # The node leaves its own community before choosing
+        gain = w_ic - degree[run_node] * (total[run_label] - np.where(own, degree[run_node], 0)) / m2
+        stay = -degree[active] * (total[labels[active]] - degree[active]) / m2
+        stay_of = np.zeros(n)
+        stay_of[active] = stay
+        stay_of[run_node[own]] = gain[own]
+
+        node_starts = np.flatnonzero(np.r_[True, run_node[1:] != run_node[:-1]])
+        scored = gain + priority[run_label]
+        best = np.maximum.reduceat(scored, node_starts)
+        segment = np.repeat(np.arange(len(node_starts)), np.diff(np.r_[node_starts, len(run_node)]))
+        hits = np.flatnonzero(scored == best[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        choice = hits[first]
+        node, target = run_node[choice], run_label[choice]
+        wants = (target != labels[node]) & (gain[choice] > stay_of[node] + 1e-12)
+        move = wants & (rng.random(len(node)) < 0.5)
+        moved, target = node[move], target[move]
+        if len(moved) < tol:
+            break
+        np.subtract.at(total, labels[moved], degree[moved])
+        np.add.at(total, target, degree[moved])
+        labels[moved] = target
+        # Next pass: neighbors of moved nodes, and nodes that lost the coin flip
+        pos, _ = _gather(indptr, neighbors, moved)
+        touched = np.zeros(n, dtype=bool)
+        touched[neighbors[pos]] = True
+        touched[node[wants & ~move]] = True
+        active = np.flatnonzero(touched)
+    return labels
+
+
+def _aggregate(labels, count, src, dst, weight, loops):
+    """
+    Collapse each community into one node: summed internal weight (as a self-loop) and one
+    undirected edge per pair of communities with the summed weight between them.
+    """
+    cs, cd = labels[src], labels[dst]
+    internal = cs == cd
+    new_loops = np.bincount(labels, weights=loops, minlength=count)
+    new_loops += np.bincount(cs[internal], weights=weight[internal], minlength=count)
+    lo = np.minimum(cs[~internal], cd[~internal])
+    hi = np.maximum(cs[~internal], cd[~internal])
+    pairs, inverse = np.unique(lo * count + hi, return_inverse=True)
+    summed = np.bincount(inverse, weights=weight[~internal], minlength=len(pairs))
+    return pairs // count, pairs % count, summed, new_loops
+
+
+def _modularity(loops, degree, m2):
+    if m2 == 0:
+        return 0.0
+    return float((2 * loops / m2 - (degree / m2) ** 2).sum())
+
+
+class CommunityHierarchy:
+    """
+    Nested communities of a graph. Level 0 groups nodes; level l groups the communities of
+    level l - 1, up to a top level small enough to show at once. Per level and community:
+    size (number of nodes), key members (highest degree nodes), most common node type and
+    internal weight, plus the weighted edges between the level's communities.
+    """
+
+    def __init__(self, levels, graph_created=None, modularity=None):
+        # One dict of arrays per level: parent (community of the level below -> community of
+        # this level), size, key_members, main_type, internal, edge_src, edge_dst, edge_weight
+        self.levels = levels
+        self.graph_created = graph_created
+        self.modularity = list(modularity or [])
+        self._membership = {}
+
+    @property
+    def num_levels(self):
+        return len(self.levels)
+
+    @property
+    def top_level(self):
+        return len(self.levels) - 1
+
+    def count(self, level: int) -> int:
+        return len(self.levels[level]["size"])
+
+    def membership(self, level: int):
+        """
+        Community at `level` of every node.
+        """
+        if level not in self._membership:
+            labels = self.levels[0]["parent"]
+            for l in range(1, level + 1):
+                labels = self.levels[l]["parent"][labels]
+            self._membership[level] = labels
+        return self._membership[level]
+
+    def children(self, level: int, community: int):
+        """
+        Communities of level - 1 inside a community (node indices for level 0), largest first.
+        """
+        members = np.flatnonzero(self.levels[level]["parent"] == community)
+        if level == 0:
+            return members
+        return members[np.argsort(-self.levels[level - 1]["size"][members], kind="stable")]
+
+    def contents(self, level: int = None, community: int = None):
+        """
+        What a view of `community` (at `level`) shows, as (level, communities), largest first:
+        all communities of the level when community is None, else its sub-communities, or
+        (-1, node indices) for a community of level 0. level defaults to the top level.
+        """
+        level = self.top_level if level is None else level
+        if community is None:
+            return level, np.argsort(-self.levels[level]["size"], kind="stable")
+        return level - 1, self.children(level, community)
+
+    def label(self, level: int, community: int, node_ids) -> str:
+        level_data = self.levels[level]
+        size = int(level_data["size"][community])
+        name = node_ids[level_data["key_members"][community, 0]]
+        return name if size == 1 else f"{name} +{size - 1}"
+
+    def describe(self, level: int, communities, graph_data: GraphData) -> list:
+        """
+        Rows for a table of communities: label, size, main type and key members.
+        """
+        level_data = self.levels[level]
+        rows = []
+        for c in communities:
+            members = [graph_data.node_ids[i] for i in level_data["key_members"][c] if i >= 0]
+            rows.append({
+                "community": self.label(level, c, graph_data.node_ids),
+                "size": int(level_data["size"][c]),
+                "type": graph_data.node_types[level_data["main_type"][c]],
+                "key members": ", ".join(members),
+            })
+        return rows
+
+    def save(self, path: str) -> str:
+        manifest = {"format_version": COMMUNITY_FORMAT_VERSION, "graph_created": self.graph_created,
+                    "levels": self.num_levels, "modularity": self.modularity}
+        arrays = {f"{name}_{l}": values for l, level in enumerate(self.levels) for name, values in level.items()}
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, manifest=np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8),
+                            **arrays)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            manifest = json.loads(data["manifest"].tobytes())
+            if manifest.get("format_version") != COMMUNITY_FORMAT_VERSION:
+                return None
+            levels = []
+            for l in range(manifest["levels"]):
+                suffix = f"_{l}"
+                levels.append({name[:-len(suffix)]: data[name] for name in data.files if name.endswith(suffix)})
+        return cls(levels, manifest.get("graph_created"), manifest.get("modularity"))
+
+
+def _level_stats(membership, count, graph_data: GraphData, degree):
+    """
+    Size, key members and main node type of every community, from node membership.
+    """
+    size = np.bincount(membership, minlength=count)
+    # Nodes sorted by community, then by degree (highest first)
+    order = np.lexsort((-degree, membership))
+    starts = np.cumsum(size) - size
+    key_members = np.full((count, KEY_MEMBERS), -1, dtype=np.int64)
+    for k in range(KEY_MEMBERS):
+        has = size > k
+        key_members[has, k] = order[starts[has] + k]
+    num_types = max(len(graph_data.node_types), 1)
+    type_counts = np.bincount(membership * num_types + graph_data.node_type, minlength=count * num_types)
+    main_type = type_counts.reshape(count, num_types).argmax(axis=1)
+    return size, key_members, main_type
+
+
+@traced("communities")
+def detect_communities(graph_data: GraphData, top_max: int = COMMUNITY_TOP_MAX, max_levels: int = 8,
+                       seed: int = 0) -> CommunityHierarchy:
+    """
+    Build a CommunityHierarchy: modularity label propagation on the graph (directions ignored,
+    parallel edges summed), then on the graph of its communities, and so on (Louvain's
+    aggregation), until a level has at most top_max communities or stops shrinking.
+    Each pass is a few sorts of the edge arrays, so a million edges take seconds.
+    """
+    n = graph_data.num_nodes
+    degree = graph_data.degrees()
+    src = graph_data.edge_src.astype(np.int64)
+    dst = graph_data.edge_dst.astype(np.int64)
+    weight = graph_data.edge_weight.astype(np.float64)
+    loop = src == dst
+    loops = np.bincount(src[loop], weights=weight[loop], minlength=n)
+    src, dst, weight, _ = _aggregate(np.arange(n, dtype=np.int64), n, src[~loop], dst[~loop], weight[~loop],
+                                     np.zeros(n))
+    m2 = 2 * (weight.sum() + loops.sum())
+
+    levels, modularity = [], []
+    membership = np.arange(n, dtype=np.int64)
+    current = n
+    while True:
+        labels = _local_moving(current, src, dst, weight, loops, seed=seed + len(levels))
+        _, labels = np.unique(labels, return_inverse=True)
+        count = int(labels.max()) + 1 if current else 0
+        if levels and count >= current:
+            break
+        membership = labels[membership]
+        esrc, edst, eweight, internal = _aggregate(labels, count, src, dst, weight, loops)
+        size, key_members, main_type = _level_stats(membership, count, graph_data, degree)
+        levels.append({
+            "parent": labels, "size": size, "key_members": key_members, "main_type": main_type,
+            "internal": internal, "edge_src": esrc, "edge_dst": edst, "edge_weight": eweight,
+        })
+        # bincount of no edges is int64, so the sum is built as float
+        community_degree = np.bincount(esrc, weights=eweight, minlength=count).astype(np.float64)
+        community_degree += np.bincount(edst, weights=eweight, minlength=count) + 2 * internal
+        modularity.append(round(_modularity(internal, community_degree, m2), 4))
+        if count <= top_max or len(levels) >= max_levels or count > 0.95 * current:
+            break
+        src, dst, weight, loops, current = esrc, edst, eweight, internal, count
+    return CommunityHierarchy(levels, modularity=modularity)
+
+
+def community_path(graph_path: str) -> str:
+    return os.path.splitext(graph_path)[0] + COMMUNITY_SUFFIX + ".npz"
+
+
+# Hierarchies of recently viewed graphs, keyed by (graph path, mtime)
+_CACHE_SIZE = 4
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_communities(graph_path: str, graph_data: GraphData = None) -> CommunityHierarchy:
+    """
+    Communities of a stored graph: read from its sidecar file if that was computed for the
+    current version of the graph, otherwise detected (graph_data, if given, saves loading it)
+    and written next to it.
+    """
+    key = (graph_path, os.path.getmtime(graph_path))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    created = load_manifest(graph_path).get("created")
+    sidecar = community_path(graph_path)
+    hierarchy = None
+    if os.path.exists(sidecar):
+        try:
+            hierarchy = CommunityHierarchy.load(sidecar)
+        except Exception as e:
+            print(f"[Warning] Ignoring unreadable communities file '{sidecar}': {e}")
+    if hierarchy is None or hierarchy.graph_created != created:
+        hierarchy = detect_communities(graph_data if graph_data is not None else load_graph_data(graph_path))
+        hierarchy.graph_created = created
+        hierarchy.save(sidecar)
+    with _cache_lock:
+        _cache[key] = hierarchy
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return hierarchy
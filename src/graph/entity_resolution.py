@@ -0,0 +1,243 @@
+import re
+import unicodedata
+import numpy as np
+
+# Leading/trailing words that don't change which entity a name refers to
+_PREFIXES = {"the", "a", "an", "mr", "mrs", "ms", "dr", "prof", "sir"}
+_SUFFIXES = {"inc", "ltd", "llc", "corp", "co", "plc", "gmbh", "jr", "sr"}
+_NON_WORD_RE = re.compile(r"[^\w\s]|_")
+_POSSESSIVE_RE = re.compile(r"['’]s\b")
+_DIGITS_RE = re.compile(r"\D")
+
+# MinHash / LSH parameters for fuzzy (typo-level) matching on character 3-grams
+_NUM_HASHES = 32
+_BANDS = 8
+_ROWS = _NUM_HASHES // _BANDS
+_MAX_KEY_BYTES = 64
+_MIN_FUZZY_LEN = 5
+_FUZZY_THRESHOLD = 0.75
+
+
+def canonical_key(name: str) -> str:
+    """
+    Normalized matching key: NFKD without accents, casefolded, punctuation and
+    possessives removed, leading articles/titles and trailing company suffixes dropped.
+    """
+    text = str(name)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold()
+    text = _NON_WORD_RE.sub(" ", _POSSESSIVE_RE.sub("", text))
+    tokens = text.split()
+    while len(tokens) > 1 and tokens[0] in _PREFIXES:
+        tokens.pop(0)
+    while len(tokens) > 1 and tokens[-1] in _SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def connected_components(n: int, a, b):
+    """
+    Component label (smallest member index) for n items linked by pairs (a[i], b[i]).
+    Vectorized label propagation with pointer jumping instead of a Python union-find.
+    """
+    labels = np.arange(n, dtype=np.int64)
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    if len(a) == 0:
+        return labels
+    while True:
+        la, lb = labels[a], labels[b]
+        low = np.minimum(la, lb)
+        new = labels.copy()
+        np.minimum.at(new, la, low)
+        np.minimum.at(new, lb, low)
+        # Pointer jumping: follow labels until every item points at a root
+        while True:
+            jumped = new[new]
+            if np.array_equal(jumped, new):
+                break
+            new = jumped
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def _containment_pairs(keys):
+    """
+    Link single-token keys ("musk") to the one multi-token key ending or starting with
+    that token ("elon musk"). Ambiguous tokens (several candidates) are left alone.
+    """
+    tokens = [k.split() for k in keys]
+    n_tokens = np.array([len(t) for t in tokens])
+    multi = np.flatnonzero(n_tokens > 1)
+    single = np.flatnonzero(n_tokens == 1)
+    if len(multi) == 0 or len(single) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    # Candidate anchors: last token (surnames, "Musk") and first token ("Acme" in "Acme Robotics")
+    anchor_tokens = np.array([tokens[i][-1] for i in multi] + [tokens[i][0] for i in multi])
+    anchor_owner = np.concatenate([multi, multi])
+    uniq, first_idx, counts = np.unique(anchor_tokens, return_index=True, return_counts=True)
+    owners = anchor_owner[first_idx]
+    # A token anchored by several different names is ambiguous
+    ambiguous = np.zeros(len(uniq), dtype=bool)
+    ambiguous[counts > 1] = True
+    if np.any(counts > 1):
+        order = np.argsort(anchor_tokens, kind="stable")
+        sorted_owner = anchor_owner[order]
+        starts = np.r_[0, np.cumsum(counts)[:-1]]
+        for u in np.flatnonzero(counts > 1):
+            ambiguous[u] = len(set(sorted_owner[starts[u]:starts[u] + counts[u]].tolist())) > 1
+
+    single_tokens = np.array([keys[i] for i in single])
+    pos = np.searchsorted(uniq, single_tokens)
+    pos = np.clip(pos, 0, len(uniq) - 1)
+    hit = (uniq[pos] == single_tokens) & ~ambiguous[pos]
+    return single[hit], owners[pos[hit]]
+
+
+def _minhash_signatures(keys, seed=0):
+    """
+    MinHash signatures of character 3-grams, computed on a padded byte matrix in row blocks.
+    Uses multiply-shift hashing (uint64 wrap-around) to avoid a modulo per gram.
+    """
+    n = len(keys)
+    encoded = [(" " + k + " ").encode("utf-8")[:_MAX_KEY_BYTES + 2] for k in keys]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=n)
+    width = int(lengths.max())
+    buf = np.zeros((n, width), dtype=np.uint64)
+    for i, b in enumerate(encoded):
+        buf[i, :len(b)] = np.frombuffer(b, dtype=np.uint8)
+
+    grams = (buf[:, :-2] << np.uint64(16)) | (buf[:, 1:-1] << np.uint64(8)) | buf[:, 2:]
+    # Pad short rows with their own first gram so padding never changes the minimum
+    invalid = np.arange(width - 2)[None, :] >= (lengths[:, None] - 2)
+    grams = np.where(invalid, grams[:, :1], grams)
+
+    rng = np.random.default_rng(seed)
+    coef_a = rng.integers(1, 2 ** 63, size=_NUM_HASHES, dtype=np.uint64) | np.uint64(1)
+    coef_b = rng.integers(0, 2 ** 63, size=_NUM_HASHES, dtype=np.uint64)
+
+    sig = np.empty((n, _NUM_HASHES), dtype=np.uint32)
+    block = 4096
+    for start in range(0, n, block):
+        h = (grams[start:start + block, :, None] * coef_a + coef_b) >> np.uint64(32)
+        sig[start:start + block] = h.min(axis=1)
+    return sig
+
+
+def _fuzzy_pairs(keys):
+    """
+    Near-duplicate keys (typos, spacing) found by LSH banding over MinHash signatures,
+    confirmed by estimated Jaccard similarity. Only bucket members are compared.
+    """
+    candidates = np.array([i for i, k in enumerate(keys) if len(k) >= _MIN_FUZZY_LEN], dtype=np.int64)
+    if len(candidates) < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    sig = _minhash_signatures([keys[i] for i in candidates])
+
+    pair_a, pair_b = [], []
+    mix = np.random.default_rng(1).integers(1, 2 ** 63, size=_ROWS, dtype=np.uint64)
+    for band in range(_BANDS):
+        band_sig = sig[:, band * _ROWS:(band + 1) * _ROWS].astype(np.uint64)
+        bucket = (band_sig * mix).sum(axis=1)
+        order = np.argsort(bucket, kind="stable")
+        sorted_bucket = bucket[order]
+        # Link every bucket member to the first member of its bucket
+        new_bucket = np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]]
+        head = order[np.maximum.accumulate(np.where(new_bucket, np.arange(len(order)), 0))]
+        members = ~new_bucket
+        pair_a.append(head[members])
+        pair_b.append(order[members])
+
+    a = np.concatenate(pair_a)
+    b = np.concatenate(pair_b)
+    if len(a) == 0:
+        return a, b
+    similarity = (sig[a] == sig[b]).mean(axis=1)
+    a, b = candidates[a[similarity >= _FUZZY_THRESHOLD]], candidates[b[similarity >= _FUZZY_THRESHOLD]]
+    # Numbers are identifiers, not typos ("Apollo 11" vs "Apollo 13")
+    digits = [_DIGITS_RE.sub("", k) for k in keys]
+    same_digits = np.array([digits[i] == digits[j] for i, j in zip(a.tolist(), b.tolist())], dtype=bool)
+    return a[same_digits], b[same_digits]
+
+
+def _vote(group, mention_type, num_groups, num_types, generic_type=None):
+    """
+    Most frequent type per group (mention-weighted); the generic type only wins when it is the
+    group's only type.
+    """
+    votes = group * num_types + mention_type
+    pair, count = np.unique(votes, return_counts=True)
+    pair_group, pair_type = pair // num_types, pair % num_types
+    count = count.astype(np.float64)
+    if generic_type is not None:
+        count[pair_type == generic_type] = 0.0
+    order = np.lexsort((-count, pair_group))
+    first = np.r_[True, pair_group[order][1:] != pair_group[order][:-1]]
+    group_type = np.zeros(num_groups, dtype=np.int32)
+    group_type[pair_group[order][first]] = pair_type[order][first]
+    return group_type
+
+
+def _compatible(a, b, key_type, generic_type):
+    """
+    Keep only pairs whose dominant types agree (or where one side is untyped).
+    """
+    ta, tb = key_type[a], key_type[b]
+    keep = ta == tb
+    if generic_type is not None:
+        keep |= (ta == generic_type) | (tb == generic_type)
+    return a[keep], b[keep]
+
+
+def resolve_entities(names, mention_name, mention_type, num_types, generic_type=None):
+    """
+    Cluster surface names that refer to the same entity and vote each cluster's type.
+
+    Args:
+        names (list[str]): Distinct raw node ids.
+        mention_name (array): Index into `names` for every node mention.
+        mention_type (array): Type index for every node mention.
+        num_types (int): Size of the type vocabulary.
+        generic_type (int, optional): Type index that only wins a vote when no other type was
+            seen (e.g. the transformer's fallback "Node" type).
+
+    Returns:
+        tuple: (cluster index per name, canonical name per cluster, voted type per cluster)
+    """
+    mention_name = np.asarray(mention_name, dtype=np.int64)
+    mention_type = np.asarray(mention_type, dtype=np.int64)
+    n = len(names)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), [], np.empty(0, dtype=np.int32)
+
+    # 1. Exact match on canonical keys
+    keys = [canonical_key(name) or str(name).casefold() for name in names]
+    uniq_keys, key_of_name = np.unique(np.array(keys), return_inverse=True)
+    uniq_keys = uniq_keys.tolist()
+
+    # 2. Blocked candidate pairs between keys: name containment and MinHash near-duplicates,
+    #    kept only when the keys' dominant types agree ("Paris" the city vs "Paris Hilton")
+    key_type = _vote(key_of_name[mention_name], mention_type, len(uniq_keys), num_types, generic_type)
+    ca, cb = _compatible(*_containment_pairs(uniq_keys), key_type, generic_type)
+    fa, fb = _compatible(*_fuzzy_pairs(uniq_keys), key_type, generic_type)
+    key_cluster = connected_components(len(uniq_keys), np.r_[ca, fa], np.r_[cb, fb])
+    _, cluster = np.unique(key_cluster[key_of_name], return_inverse=True)
+    num_clusters = int(cluster.max()) + 1
+
+    # 3. Type voting, weighted by mentions
+    cluster_type = _vote(cluster[mention_name], mention_type, num_clusters, num_types, generic_type)
+
+    # 4. Canonical display name: most complete form (most words), then most mentioned
+    name_mentions = np.bincount(mention_name, minlength=n)
+    word_count = np.array([len(str(name).split()) for name in names])
+    order = np.lexsort((-name_mentions, -word_count, cluster))
+    first = np.r_[True, cluster[order][1:] != cluster[order][:-1]]
+    canonical = [None] * num_clusters
+    for idx in order[first]:
+        canonical[cluster[idx]] = names[idx]
+
+    return cluster, canonical, cluster_type
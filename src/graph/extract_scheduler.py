@@ -0,0 +1,161 @@
+import asyncio
+import random
+import time
+
+
+class ExtractionStats:
+    """
+    Counters collected while a document's chunks are extracted.
+    """
+
+    def __init__(self):
+        self.chunks_total = 0
+        self.chunks_ok = 0
+        self.chunks_failed = 0
+        self.retries = 0
+        self.tokens = 0
+        # Estimated number of chunks when the input is streamed and the real count is not known yet
+        self.chunks_expected = None
+        self.started = time.perf_counter()
+        self.finished = None
+        # Seconds until the first chunk was extracted (model load and queueing included)
+        self.first_chunk = None
+        # DedupStats of the document, set by the caller when a dedup stage ran
+        self.dedup = None
+        # Prompt tokens saved by batched requests, set by the caller when batching is on
+        self.prompt_tokens_saved = 0
+
+    @property
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    @property
+    def chunks_per_s(self):
+        return self.chunks_ok / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tokens_per_s(self):
+        return self.tokens / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def chunks_done(self):
+        return self.chunks_ok + self.chunks_failed
+
+    @property
+    def eta(self):
+        """
+        Seconds left at the current rate, or None while there is nothing to extrapolate from.
+        """
+        expected = max(self.chunks_expected or 0, self.chunks_total)
+        if self.chunks_done == 0 or expected == 0:
+            return None
+        return self.elapsed / self.chunks_done * max(expected - self.chunks_done, 0)
+
+    def summary(self):
+        return (
+            f"{self.chunks_ok}/{self.chunks_total} chunks ok, {self.chunks_failed} failed, "
+            f"{self.retries} retries in {self.elapsed:.1f}s "
+            f"({self.chunks_per_s:.2f} chunks/s, {self.tokens_per_s:.0f} tokens/s"
+            + (f", first chunk after {self.first_chunk:.1f}s" if self.first_chunk is not None else "") + ")"
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (~4 characters per token) used for throughput reporting.
+    """
+    return max(1, len(text) // 4)
+
+
+async def _extract_with_retry(extract, doc, index, stats, max_retries, backoff, tracer=None):
+    """
+    Run one chunk extraction, retrying with exponential backoff and jitter.
+    Returns None once all attempts have failed.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await extract(doc)
+        except Exception as e:
+            if tracer is not None:
+                tracer.count("chunk_errors", error=type(e).__name__)
+            if attempt == max_retries:
+                print(f"[Chunk Error] chunk {index} failed after {attempt + 1} attempts: {e}")
+                return None
+            stats.retries += 1
+            delay = backoff * (2 ** attempt) * (0.5 + random.random())
+            print(f"[Chunk Retry] chunk {index} attempt {attempt + 1} failed: {e}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+def _record_chunk(tracer, span, result, retries):
+    nodes = len(result.nodes) if result is not None else 0
+    edges = len(result.relationships) if result is not None else 0
+    span.update(retries=retries, ok=result is not None, nodes=nodes, edges=edges)
+    tracer.count("chunks", status="ok" if result is not None else "failed")
+    tracer.count("retries", retries)
+    tracer.count("nodes", nodes)
+    tracer.count("edges", edges)
+
+
+async def run_extraction(documents, extract, max_concurrency=4, max_retries=2, backoff=1.0,
+                         count_tokens=None, on_progress=None, expected_chunks=None, tracer=None,
+                         on_result=None):
+    """
+    Extract graph documents from chunks with a bounded number of calls in flight.
+
+    Workers pull chunks from a shared iterator, so ``documents`` may be any iterable
+    (including a lazy generator). Results are reassembled in chunk order; chunks
+    that fail every attempt are dropped without affecting the others.
+
+    Args:
+        documents (iterable): Document chunks to extract.
+        extract (callable): Coroutine function taking one Document and returning a GraphDocument.
+        max_concurrency (int): Maximum number of extractions in flight.
+        max_retries (int): Retries per chunk after the first failure.
+        backoff (float): Base delay in seconds for exponential backoff.
+        count_tokens (callable, optional): Token counter for throughput reporting.
+        on_progress (callable, optional): Called with the ExtractionStats after every chunk.
+        expected_chunks (int, optional): Estimated chunk count, used for the ETA.
+        tracer (Tracer, optional): Records a "chunk" span per chunk (retries, nodes, edges)
+            and the chunk counters.
+        on_result (callable, optional): Called with (chunk index, GraphDocument, ExtractionStats)
+            as soon as a chunk succeeds, in completion order.
+
+    Returns:
+        tuple: (list of GraphDocument in chunk order, ExtractionStats)
+    """
+    count_tokens = count_tokens or estimate_tokens
+    stats = ExtractionStats()
+    stats.chunks_expected = expected_chunks
+    results = {}
+    doc_iter = enumerate(documents)
+
+    async def worker():
+        for index, doc in doc_iter:
+            stats.chunks_total += 1
+            retries = stats.retries
+            if tracer is None:
+                result = await _extract_with_retry(extract, doc, index, stats, max_retries, backoff)
+            else:
+                with tracer.span("chunk", chunk=index) as span:
+                    result = await _extract_with_retry(extract, doc, index, stats, max_retries, backoff, tracer)
+                    _record_chunk(tracer, span, result, stats.retries - retries)
+            if result is None:
+                stats.chunks_failed += 1
+            else:
+                stats.chunks_ok += 1
+                if stats.first_chunk is None:
+                    stats.first_chunk = stats.elapsed
+                stats.tokens += count_tokens(doc.page_content)
+                results[index] = result
+                if on_result is not None:
+                    on_result(index, result, stats)
+            if on_progress is not None:
+                on_progress(stats)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, max_concurrency))]
+    await asyncio.gather(*workers)
+    stats.finished = time.perf_counter()
+
+    return [results[i] for i in sorted(results)], stats
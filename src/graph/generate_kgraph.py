@@ -1,121 +1,609 @@
+import os
+import time
 import asyncio
-from langchain_experimental.graph_transformers import LLMGraphTransformer
+from contextlib import asynccontextmanager
 from langchain_core.documents import Document
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_ollama import ChatOllama
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from src.graph.visulization import visualize_graph
-from src.model.model_info import get_context_length
-from src.utils.text_clean import clean_text
+from src.graph.visulization import render_graph
+from src.graph.graph_store import build_graph_data, load_graph_data, merge_graph_data
+from src.model.model_info import get_context_length, get_model_lifecycle
+from src.model.backend_pool import get_backend_pool
+from src.graph.batch_extract import BatchExtractor, build_batch_chain, format_sections, parse_sections, SECTION_HEADER
+from src.graph.schemas import get_schema
+from src.utils.text_clean import iter_clean_paragraphs
+from src.utils.ingest import iter_lines
+from src.graph.extract_scheduler import run_extraction, estimate_tokens
+from src.config.pipeline_con import (
+    MAX_CONCURRENCY, MAX_RETRIES, RETRY_BACKOFF, EXTRACTION_PROMPT_VERSION, MAX_NUM_CTX, OUTPUT_TOKEN_RATIO,
+    RENDER_MAX_NODES, SNAPSHOT_INTERVAL, DEDUP_ENABLED, DEDUP_MAX_DISTANCE, BATCH_CHUNKS, MODEL_KEEP_ALIVE
+)
+from src.utils.tokenizer import get_token_counter
+from src.utils.chunker import compute_chunk_budget, iter_chunks
+from src.utils.chunk_cache import cached_extract, get_chunk_cache
+from src.utils.file_op import graph_data_path, discard_graph_html, save_graph
+from src.utils.tracing import get_tracer, TimedIterator
+from src.utils.dedup import ChunkDeduper, OverlapDeduper, DedupStats, shared_prefix
 
 # #host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 
 # -------------------
-# 1️⃣ Async batch processor for large datasets
+# 1️⃣ Chunk size computation
 # -------------------
-async def process_batches(documents, graph_transformer, batch_size=5):
+def estimate_prompt_tokens(graph_transformer, count_tokens) -> int:
     """
-    Process documents in batches asynchronously to minimize memory footprint.
+    Tokens the extraction prompt adds to every call (system + instructions, without the chunk).
     """
-    results = []
-    batch = []
+    return _count_prompt_tokens(graph_transformer.chain.first, count_tokens)
 
-    for doc in documents:
-        batch.append(doc)
-        if len(batch) >= batch_size:
-            try:
-                batch_result = await graph_transformer.aconvert_to_graph_documents(batch)
-                results.extend(batch_result)
-            except Exception as e:
-                print(f"[Batch Error] {e}")
-            finally:
-                batch.clear()
 
-    if batch:  # process leftover batch
-        try:
-            batch_result = await graph_transformer.aconvert_to_graph_documents(batch)
-            results.extend(batch_result)
-        except Exception as e:
-            print(f"[Final Batch Processing Error] Skipping final batch due to: {e}")
-    return results
+def _count_prompt_tokens(prompt, count_tokens) -> int:
+    messages = prompt.format_messages(input="")
+    return sum(count_tokens(m.content) for m in messages)
 
 
-# -------------------
-# 2️⃣ Chunk size computation
-# -------------------
-def compute_chunk_size_tokens(context_length: int, safety_factor: float = 0.8, max_chunk: int = 2000) -> int:
+def get_num_ctx(context_length: int, max_num_ctx: int = MAX_NUM_CTX) -> int:
     """
-    Compute chunk size based on model context length with a safety margin.
+    Context window to request from Ollama: the model's trained length, capped by config.
     """
-    chunk_size = int(context_length * safety_factor)
-    return min(chunk_size, max_chunk)
+    return min(context_length, max_num_ctx)
 
 
 # -------------------
-# 3️⃣ Knowledge graph generator
+# 2️⃣ Knowledge graph generator
 # -------------------
-def generate_knowledge_graph(text: str, selected_model: str = None, batch_size: int = 5):
+def extraction_settings(llm, batch_chunks: int = 1, schema=None) -> dict:
+    """
+    Settings that change what the extractor returns; part of the chunk cache key.
     """
-    Generates a knowledge graph from text with cleaning, chunking, and async batch processing.
+    settings = {
+        "prompt_version": EXTRACTION_PROMPT_VERSION,
+        "transformer": "LLMGraphTransformer",
+        "temperature": llm.temperature,
+    }
+    if batch_chunks > 1:
+        settings["batch_chunks"] = batch_chunks
+    if schema is not None:
+        settings.update(schema.settings())
+    return settings
+
+
+def generate_knowledge_graph(text: str, selected_model: str = None, max_concurrency: int = MAX_CONCURRENCY,
+                             use_cache: bool = True, graph_name: str = None,
+                             max_nodes: int = RENDER_MAX_NODES, lod: bool = False, on_snapshot=None):
+    """
+    Generates a knowledge graph from text with cleaning, chunking, and concurrent chunk extraction.
+    Chunks are sized in model tokens so each call uses as much of the context window as the
+    extraction prompt and expected output leave free.
+    Chunks already extracted with the same model and settings are served from the chunk cache.
+    If graph_name is given, the merged graph data is stored as DATA_DIR/<graph_name>.npz so the
+    HTML view can be regenerated later without re-running extraction.
+    max_nodes and lod are passed to render_graph; large graphs get a precomputed static layout.
+    on_snapshot(graph_data, stats) receives the partial graph while chunks are still running
+    (see GraphExtractor.aextract); the final graph is that same merged state.
     """
 
     if not text or not text.strip():
         raise ValueError("Input text cannot be empty")
 
-    # Clean text
-    text = clean_text(text)
-
-    # Select default model if not provided
-    selected_model = selected_model or "gemma3:4b"
-
-    # Get model context length safely
-    try:
-        context_length = get_context_length(selected_model)
-        if not context_length:
-            print(f"[Warning] Could not determine context length for {selected_model}, using 2048")
-            context_length = 2048
-    except Exception as e:
-        print(f"[Error getting context length] {e}, defaulting to 2048")
-        context_length = 2048
-
-    # Defaults for debugging info
-    chunk_size = "full text"
-    chunk_overlap = 0
-
-    # Decide whether to split text
-    if context_length <= len(text):
-        chunk_size = compute_chunk_size_tokens(context_length)
-        chunk_overlap = min(int(chunk_size * 0.05), 256)  # 5% overlap
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ".", " "]
-        )
-        text_chunks = splitter.split_text(text)
-        documents = [Document(page_content=chunk) for chunk in text_chunks]
-    else:
-        documents = [Document(page_content=text)]
+    paragraphs = iter_clean_paragraphs(text.splitlines())
+    return _generate_from_paragraphs(paragraphs, selected_model, max_concurrency, use_cache, graph_name,
+                                     max_nodes, lod, on_snapshot)
+
+
+def generate_knowledge_graph_from_file(source, selected_model: str = None, max_concurrency: int = MAX_CONCURRENCY,
+                                       use_cache: bool = True, graph_name: str = None,
+                                       max_nodes: int = RENDER_MAX_NODES, lod: bool = False, on_snapshot=None):
+    """
+    Same as generate_knowledge_graph, but streams a file path or binary stream (e.g. a Streamlit
+    upload): reading, cleaning and chunking run lazily as the scheduler pulls chunks, so the
+    first chunks reach the model while the rest is still being read.
+    """
+    paragraphs = iter_clean_paragraphs(iter_lines(source))
+    return _generate_from_paragraphs(paragraphs, selected_model, max_concurrency, use_cache, graph_name,
+                                     max_nodes, lod, on_snapshot)
+
+
+def _normalized(extract, schema, tracer):
+    """
+    Collapse node and relationship labels onto the schema's types (see ExtractionSchema.normalize).
+    Runs on cached chunks too, so synonym changes apply without re-extracting.
+    """
+    async def _extract(doc):
+        graph_doc = await extract(doc)
+        renamed, dropped = schema.normalize(graph_doc)
+        tracer.count("relationships_renamed", renamed, schema=schema.name)
+        tracer.count("relationships_dropped", dropped, schema=schema.name)
+        return graph_doc
+
+    return _extract
+
+
+def _without_source_text(extract):
+    """
+    Drop the chunk text from extracted GraphDocuments so finished chunks don't stay in memory.
+    """
+    async def _extract(doc):
+        graph_doc = await extract(doc)
+        graph_doc.source = Document(page_content="", metadata=doc.metadata)
+        return graph_doc
 
-    # Initialize LLM and Graph Transformer
-    llm = ChatOllama(model=selected_model, temperature=0)
-    graph_transformer = LLMGraphTransformer(llm=llm)
+    return _extract
 
-    # Simpler, cleaner, and standard way to run a coroutine
-    graph_documents = asyncio.run(
-        process_batches(documents, graph_transformer, batch_size)
-    )
 
-    net = visualize_graph(graph_documents)
+class _UsageCallback(BaseCallbackHandler):
+    """
+    Collects the token usage Ollama reports for one LLM call (prompt_eval_count/eval_count)
+    and the time it spent loading the model first (load_duration).
+    """
 
-    # Debug info
-    print(f"Context length: {context_length}")
-    print(f"Chunk size: {chunk_size}")
-    print(f"Chunk overlap: {chunk_overlap}")
-    print(f"Total chunks: {len(documents)}")
+    run_inline = True
 
+    def __init__(self):
+        self.input_tokens = None
+        self.output_tokens = None
+        self.load_seconds = 0.0
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.input_tokens = (self.input_tokens or 0) + usage.get("input_tokens", 0)
+                    self.output_tokens = (self.output_tokens or 0) + usage.get("output_tokens", 0)
+                load_duration = (getattr(message, "response_metadata", None) or {}).get("load_duration")
+                if load_duration:
+                    self.load_seconds += load_duration / 1e9
+
+
+class _SnapshotMerger:
+    """
+    Folds finished chunks into one GraphData as they arrive and hands it to a callback at most
+    every `interval` seconds (the first chunk is shown right away). Each snapshot only merges
+    the chunks finished since the previous one. Incremental merges match entities by canonical
+    key only, so snapshots are previews: the returned graph is built from all chunks at the end.
+    """
+
+    def __init__(self, callback, interval: float = SNAPSHOT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.graph = None
+        self.snapshots = 0
+        self._pending = []
+        self._last = None
+
+    def add(self, index, graph_doc, stats):
+        self._pending.append(graph_doc)
+        now = time.monotonic()
+        if self._last is None or now - self._last >= self.interval:
+            self._last = now
+            self._merge()
+            self.snapshots += 1
+            self.callback(self.graph, stats)
+
+    def _merge(self):
+        if not self._pending:
+            return
+        new = build_graph_data(self._pending, meta={})
+        self._pending = []
+        self.graph = new if self.graph is None else merge_graph_data(self.graph, new)
+
+
+def _iter_documents(chunks, deduper=None):
+    """
+    Chunk Documents, skipping near-duplicate chunks when a deduper is given. Each Document
+    carries the text it shares with the previous chunk ("overlap") for the overlap dedup.
+    """
+    previous = None
+    for i, chunk in enumerate(chunks):
+        if deduper is not None and deduper.is_duplicate(chunk):
+            # The next chunk's overlap is with a chunk that is not extracted
+            previous = None
+            continue
+        overlap = shared_prefix(previous, chunk) if deduper is not None else ""
+        previous = chunk
+        yield Document(page_content=chunk, metadata={"chunk": i, "overlap": overlap})
+
+
+def _generate_from_paragraphs(paragraphs, selected_model, max_concurrency, use_cache, graph_name,
+                              max_nodes=RENDER_MAX_NODES, lod=False, on_snapshot=None):
+    graph_data = extract_graph_data(paragraphs, selected_model, max_concurrency, use_cache, on_snapshot=on_snapshot)
+    if graph_name:
+        save_graph(graph_data, graph_name)
+    net = render_graph(graph_data, max_nodes=max_nodes or None, lod=lod)
+    get_tracer().flush()
     return net
 
 
+def append_to_graph(graph_name: str, text: str = None, source=None, selected_model: str = None,
+                    document_id: str = None, max_concurrency: int = MAX_CONCURRENCY,
+                    use_cache: bool = True, render: bool = False, on_progress=None, size_hint: int = None,
+                    on_snapshot=None):
+    """
+    Extract one new document (text or file path/stream) and merge it into the stored graph
+    DATA_DIR/<graph_name>.npz, creating it if needed. Only the new document goes through the
+    LLM; existing degrees and edge multiplicities are updated in place. Documents already
+    merged (by document_id, e.g. the content hash) are skipped.
+
+    The HTML view is not rebuilt here: the stale one is removed and re-rendered on demand,
+    or immediately when render=True (the PyVis network is returned instead of the GraphData).
+    on_snapshot receives partial graphs of the new document while it is extracted.
+    """
+    path = graph_data_path(graph_name)
+    base = load_graph_data(path) if os.path.exists(path) else None
+    if base is not None and document_id and document_id in base.meta.get("documents", []):
+        print(f"[Info] Document {document_id} already merged into '{graph_name}'")
+        return render_graph(base) if render else base
+
+    if text is not None:
+        if not text.strip():
+            raise ValueError("Input text cannot be empty")
+        paragraphs = iter_clean_paragraphs(text.splitlines())
+    else:
+        paragraphs = iter_clean_paragraphs(iter_lines(source))
+    new = extract_graph_data(paragraphs, selected_model, max_concurrency, use_cache, on_progress, size_hint,
+                             on_snapshot)
+    base = merge_into_graph(graph_name, new, document_id, base)
+    return render_graph(base) if render else base
+
+
+def merge_into_graph(graph_name: str, new, document_id: str = None, base=None):
+    """
+    Merge extracted GraphData into the stored graph DATA_DIR/<graph_name>.npz (created if
+    missing), record the document and drop the stale HTML view. Returns the merged GraphData.
+    """
+    path = graph_data_path(graph_name)
+    if base is None and os.path.exists(path):
+        base = load_graph_data(path)
+    new_meta = new.meta
+
+    if base is None:
+        base = new
+        base.meta = {"documents": [], "models": [], "chunks": 0}
+    else:
+        merge_graph_data(base, new)
+    base.meta.setdefault("documents", []).append(document_id)
+    if new_meta["model"] not in base.meta.setdefault("models", []):
+        base.meta["models"].append(new_meta["model"])
+    base.meta["chunks"] = base.meta.get("chunks", 0) + new_meta["chunks"]
+
+    save_graph(base, graph_name)
+    discard_graph_html(graph_name)
+    print(f"Merged into '{graph_name}': {base.num_nodes} nodes, {base.num_edges} edges")
+    return base
+
+
+class _HostChains:
+    """
+    LLM, graph transformer and (built on first use) batched-request chain for one Ollama host.
+    """
+
+    def __init__(self, llm, schema, graph_transformer=None):
+        self.llm = llm
+        self.schema = schema
+        self.graph_transformer = graph_transformer or schema.build_transformer(llm)
+        self._batch_chain = None
+
+    @property
+    def batch_chain(self):
+        if self._batch_chain is None:
+            graph_model = self.schema.graph_model(getattr(self.llm, "_llm_type", None))
+            self._batch_chain = build_batch_chain(self.graph_transformer, self.llm, graph_model,
+                                                  self.schema.instructions())
+        return self._batch_chain
+
+
+class GraphExtractor:
+    """
+    Everything needed to extract graphs with one model, built once and reused across documents:
+    the ChatOllama clients, the LLMGraphTransformer, the token budget and the cached extract call.
+
+    Requests are spread over the Ollama hosts of the backend pool (OLLAMA_HOSTS), each call
+    going to the least loaded healthy host that has the model; a client is built per host.
+
+    Reuse one extractor within one event loop: the Ollama async client keeps its connection
+    pool, so batch callers run all documents through aextract on a single loop.
+    """
+
+    def __init__(self, selected_model: str = None, use_cache: bool = True, max_in_flight: int = None,
+                 llm=None, context_length: int = None, count_tokens=None, batch_chunks: int = BATCH_CHUNKS,
+                 schema=None):
+        """
+        llm, context_length and count_tokens replace the Ollama-backed defaults (e.g. a fake chat
+        model in benchmarks); without them everything is looked up from Ollama.
+        batch_chunks > 1 sends up to that many short chunks per request (see _llm_extract_batch);
+        chunks keep their single-request size, so only those short enough to share one context
+        window (e.g. the last chunk of each document) are batched.
+        schema is an ExtractionSchema or a name for get_schema (default: KG_SCHEMA).
+        """
+        # Select default model if not provided
+        self.model = selected_model or "gemma3:4b"
+        self.schema = get_schema(schema)
+        if llm is None:
+            # Loads the model while the token budget is worked out (and refreshes its keep-alive)
+            get_model_lifecycle().preload(self.model)
+
+        # Get model context length safely
+        if context_length is None:
+            try:
+                context_length = get_context_length(self.model)
+                if not context_length:
+                    print(f"[Warning] Could not determine context length for {self.model}, using 2048")
+                    context_length = 2048
+            except Exception as e:
+                print(f"[Error getting context length] {e}, defaulting to 2048")
+                context_length = 2048
+        self.context_length = context_length
+
+        # Initialize LLM and Graph Transformer (Ollama defaults num_ctx to 2048 unless told otherwise)
+        self.num_ctx = get_num_ctx(context_length)
+        self.pool = get_backend_pool() if llm is None else None
+        first_host = self.pool.backends[0].host if self.pool is not None else None
+        self.llm = llm if llm is not None else self._make_llm(first_host)
+        self.graph_transformer = self.schema.build_transformer(self.llm)
+        self._hosts = {first_host: _HostChains(self.llm, self.schema, self.graph_transformer)}
+
+        # Token budget per chunk
+        self.count_tokens = count_tokens or get_token_counter(self.model)
+        self.prompt_tokens = estimate_prompt_tokens(self.graph_transformer, self.count_tokens)
+        self.chunk_tokens = compute_chunk_budget(self.num_ctx, self.prompt_tokens, OUTPUT_TOKEN_RATIO)
+        self.batch_chunks = max(1, batch_chunks)
+        self.batch_prompt_tokens = None
+        self.batch_tokens = None
+        if self.batch_chunks > 1:
+            self._size_batches()
+
+        self.tracer = get_tracer()
+        extract = self._llm_extract
+        self._batcher = None
+        if self.batch_chunks > 1:
+            extract = self._batcher = BatchExtractor(self._llm_extract_batch, self._llm_extract, self.batch_chunks,
+                                                     self.batch_tokens, self.count_tokens,
+                                                     max_in_flight or MAX_CONCURRENCY)
+        self.cache = get_chunk_cache() if use_cache else None
+        if self.cache is not None:
+            extract = cached_extract(extract, self.cache, self.model,
+                                     extraction_settings(self.llm, self.batch_chunks, self.schema))
+        self._extract = _without_source_text(_normalized(extract, self.schema, self.tracer))
+        # Optional bound on LLM calls in flight across every document sharing this extractor
+        self.max_in_flight = max_in_flight
+        self._semaphore = None
+        self.tracer.count("extractors", model=self.model)
+        self.settings = {"model": self.model, "context_length": context_length, "num_ctx": self.num_ctx,
+                         "prompt_tokens": self.prompt_tokens, "chunk_tokens": self.chunk_tokens,
+                         "batch_chunks": self.batch_chunks, "schema": self.schema.name,
+                         "hosts": len(self.pool.backends) if self.pool is not None else 1}
+
+    def _make_llm(self, host):
+        return ChatOllama(model=self.model, temperature=0, num_ctx=self.num_ctx, base_url=host,
+                          keep_alive=MODEL_KEEP_ALIVE)
+
+    def _size_batches(self):
+        """
+        Section text one batched request has room for: the batch prompt, batch_chunks section
+        headers, the sections and their output must fit the context window. Chunks keep the
+        single-request size; a chunk is batched only if at least two of its size fit.
+        """
+        batch_chain = self._hosts[next(iter(self._hosts))].batch_chain
+        self.batch_prompt_tokens = _count_prompt_tokens(batch_chain.first, self.count_tokens)
+        headers = self.batch_chunks * self.count_tokens(SECTION_HEADER.format(number=self.batch_chunks) + "\n\n")
+        try:
+            self.batch_tokens = compute_chunk_budget(self.num_ctx, self.batch_prompt_tokens + headers,
+                                                     OUTPUT_TOKEN_RATIO)
+        except ValueError:
+            self.batch_tokens = 0
+        if self.batch_tokens // 2 < 64:
+            print(f"[Warning] Context window of {self.num_ctx} tokens is too small for {self.batch_chunks} "
+                  f"chunks per request; batching disabled")
+            self.batch_chunks = 1
+            self.batch_tokens = None
+
+    @asynccontextmanager
+    async def _lease(self, docs):
+        """
+        (host, _HostChains) to run one request for `docs` with: the least loaded pool host
+        serving the model, or the injected llm (host None). Errors raised inside count against
+        the host, which is noted in the chunks' metadata so their retries go elsewhere.
+        """
+        if self.pool is None:
+            yield None, self._hosts[None]
+            return
+        avoid = {host for doc in docs for host in doc.metadata.get("failed_hosts", ())}
+        async with self.pool.lease(self.model, avoid) as backend:
+            chains = self._hosts.get(backend.host)
+            if chains is None:
+                chains = self._hosts[backend.host] = _HostChains(self._make_llm(backend.host), self.schema)
+            try:
+                yield backend.host, chains
+            except Exception:
+                for doc in docs:
+                    doc.metadata["failed_hosts"] = doc.metadata.get("failed_hosts", []) + [backend.host]
+                raise
+
+    async def _llm_extract(self, doc):
+        """
+        One LLM call for one chunk, traced as an "llm_call" span with the token usage reported
+        by the server (estimated when it reports none). A response that yields no nodes for a
+        non-empty chunk counts as a parse failure: the model's output did not fit the schema.
+        """
+        usage = _UsageCallback()
+        with self.tracer.span("llm_call", chunk=doc.metadata.get("chunk")) as span:
+            async with self._lease([doc]) as (host, chains):
+                if host is not None:
+                    span.update(host=host)
+                graph_doc = await chains.graph_transformer.aprocess_response(doc, config={"callbacks": [usage]})
+            prompt_tokens = usage.input_tokens
+            if prompt_tokens is None:
+                prompt_tokens = self.prompt_tokens + estimate_tokens(doc.page_content)
+            output_tokens = usage.output_tokens or 0
+            parse_failure = not graph_doc.nodes and bool(doc.page_content.strip())
+            span.update(prompt_tokens=prompt_tokens, output_tokens=output_tokens, parse_failure=parse_failure,
+                        load_s=round(usage.load_seconds, 3))
+        self.tracer.count("llm_calls", model=self.model)
+        self.tracer.count("model_load_seconds", usage.load_seconds, model=self.model)
+        self.tracer.count("prompt_tokens", prompt_tokens, model=self.model)
+        self.tracer.count("output_tokens", output_tokens, model=self.model)
+        self.tracer.count("parse_failures", int(parse_failure), model=self.model)
+        return graph_doc
+
+    async def _llm_extract_batch(self, docs):
+        """
+        One LLM call for several chunks sent as numbered sections (see BatchExtractor), traced
+        as an "llm_call" span. Returns a GraphDocument or None (re-extracted alone) per chunk.
+
+        Prompt tokens saved are what the parsed sections cost as single calls (chunks are the
+        same with batching off) minus what the batched call cost. They are shared out over the
+        chunks' metadata so each document can report its part; a batch that has to be redone
+        chunk by chunk saves less than nothing.
+        """
+        usage = _UsageCallback()
+        text = format_sections(docs)
+        with self.tracer.span("llm_call", chunk=docs[0].metadata.get("chunk"), sections=len(docs)) as span:
+            async with self._lease(docs) as (host, chains):
+                if host is not None:
+                    span.update(host=host)
+                response = await chains.batch_chain.ainvoke({"input": text}, config={"callbacks": [usage]})
+            results = parse_sections(response, docs)
+            parsed = [doc for doc, result in zip(docs, results) if result is not None]
+            # Both sides are estimated with the same counter, then scaled to the server's count
+            estimated = self.batch_prompt_tokens + self.count_tokens(text)
+            single = sum(self.prompt_tokens + self.count_tokens(doc.page_content) for doc in parsed)
+            prompt_tokens = usage.input_tokens or estimated
+            saved = round((single - estimated) * prompt_tokens / estimated)
+            output_tokens = usage.output_tokens or 0
+            span.update(prompt_tokens=prompt_tokens, output_tokens=output_tokens, sections_parsed=len(parsed),
+                        prompt_tokens_saved=saved, load_s=round(usage.load_seconds, 3))
+        for doc in docs:
+            doc.metadata["prompt_tokens_saved"] = saved / len(docs)
+        self.tracer.count("llm_calls", model=self.model)
+        self.tracer.count("prompt_tokens", prompt_tokens, model=self.model)
+        self.tracer.count("output_tokens", output_tokens, model=self.model)
+        self.tracer.count("batched_chunks", len(parsed), model=self.model)
+        self.tracer.count("batch_fallbacks", len(docs) - len(parsed), model=self.model)
+        self.tracer.count("prompt_tokens_saved", saved, model=self.model)
+        self.tracer.count("model_load_seconds", usage.load_seconds, model=self.model)
+        return results
+
+    async def _bounded_extract(self, doc):
+        if self._semaphore is None:
+            # Bounds requests, and a batched request carries up to batch_chunks chunks
+            self._semaphore = asyncio.Semaphore(self.max_in_flight * self.batch_chunks)
+        async with self._semaphore:
+            return await self._extract(doc)
+
+    async def aextract(self, paragraphs, max_concurrency: int = MAX_CONCURRENCY, on_progress=None,
+                       size_hint: int = None, on_snapshot=None, snapshot_interval: float = SNAPSHOT_INTERVAL,
+                       dedup: bool = DEDUP_ENABLED):
+        """
+        Chunk a stream of cleaned paragraphs, extract every chunk and merge the results into GraphData.
+        Returns (GraphData, ExtractionStats); raises RuntimeError when every chunk failed.
+
+        With on_snapshot, chunks are merged incrementally as they finish and on_snapshot(graph_data,
+        stats) is called with the partial graph after the first chunk and then at most every
+        snapshot_interval seconds. It runs on the event loop, so it should hand the graph off
+        (render, save) rather than keep it: the object keeps growing until extraction ends. The
+        returned graph is built from all chunks with full entity resolution, as without on_snapshot.
+
+        With dedup, repeated paragraphs and near-duplicate chunks of this document are not sent
+        to the model, and relationships extracted twice from a chunk overlap are counted once
+        (see src.utils.dedup); the counts are in stats.dedup.
+
+        max_concurrency bounds LLM requests; with batching, max_concurrency * batch_chunks chunks
+        are in flight so full batches of short chunks can form. stats.prompt_tokens_saved is this
+        document's share of the prompt tokens batching saved.
+        """
+        merger = _SnapshotMerger(on_snapshot, snapshot_interval) if on_snapshot is not None else None
+        dedup_stats = DedupStats()
+        chunk_deduper = ChunkDeduper(DEDUP_MAX_DISTANCE, dedup_stats) if dedup else None
+        overlap_deduper = OverlapDeduper(dedup_stats) if dedup else None
+        batched = self.batch_chunks > 1
+        if batched and not self.max_in_flight:
+            self._batcher.max_requests = max_concurrency
+        saved_tokens = [0.0]
+
+        def on_result(index, graph_doc, stats):
+            if batched:
+                saved_tokens[0] += graph_doc.source.metadata.get("prompt_tokens_saved", 0)
+            if overlap_deduper is not None:
+                overlap_deduper.add(index, graph_doc, graph_doc.source.metadata.get("overlap", ""))
+            if merger is not None:
+                merger.add(index, graph_doc, stats)
+
+        with self.tracer.span("document", **self.settings) as span:
+            # Lazy pipeline: chunks are produced only as the scheduler asks for them
+            paragraphs = TimedIterator(paragraphs)
+            unique = chunk_deduper.paragraphs(paragraphs) if chunk_deduper is not None else paragraphs
+            chunks = TimedIterator(iter_chunks(unique, self.chunk_tokens, self.count_tokens))
+            documents = _iter_documents(chunks, chunk_deduper)
+            extract = self._bounded_extract if self.max_in_flight else self._extract
+
+            # ~4 characters per token; only used to estimate progress of streamed input
+            expected_chunks = -(-size_hint // (4 * self.chunk_tokens)) if size_hint else None
+            graph_documents, stats = await run_extraction(
+                documents,
+                extract,
+                max_concurrency=max_concurrency * self.batch_chunks,
+                max_retries=MAX_RETRIES,
+                backoff=RETRY_BACKOFF,
+                count_tokens=self.count_tokens,
+                on_progress=on_progress,
+                expected_chunks=expected_chunks,
+                tracer=self.tracer,
+                on_result=on_result if dedup or batched or merger is not None else None,
+            )
+            stats.dedup = dedup_stats
+            stats.prompt_tokens_saved = round(saved_tokens[0])
+            if stats.first_chunk is not None:
+                self.tracer.record("first_chunk", stats.first_chunk, model=self.model)
+            # Cleaning and splitting run lazily inside extraction; their time is taken out of it
+            self.tracer.record("clean", paragraphs.seconds, paragraphs=paragraphs.items)
+            self.tracer.record("split", chunks.seconds - paragraphs.seconds, chunks=chunks.items)
+            self.tracer.record("extract", stats.elapsed - chunks.seconds, chunks=stats.chunks_total)
+            if stats.chunks_total == 0:
+                raise ValueError("Input text cannot be empty")
+            if stats.chunks_failed == stats.chunks_total:
+                # Nothing was extracted: no graph, so it is not stored or cached as a result
+                raise RuntimeError(f"Extraction failed for all {stats.chunks_total} chunks")
+
+            meta = {"model": self.model, "chunks": stats.chunks_total, "chunks_failed": stats.chunks_failed,
+                    "schema": self.schema.name}
+            with self.tracer.span("merge", snapshots=merger.snapshots if merger is not None else 0):
+                graph_data = build_graph_data(graph_documents, meta=meta)
+            span.update(chunks=stats.chunks_total, chunks_failed=stats.chunks_failed, retries=stats.retries,
+                        nodes=graph_data.num_nodes, edges=graph_data.num_edges, concurrency=max_concurrency,
+                        paragraphs_dropped=dedup_stats.paragraphs_dropped, calls_saved=dedup_stats.calls_saved,
+                        relationships_dropped=dedup_stats.relationships_dropped,
+                        prompt_tokens_saved=stats.prompt_tokens_saved, first_chunk_s=stats.first_chunk)
+        self.tracer.count("paragraphs_dropped", dedup_stats.paragraphs_dropped)
+        self.tracer.count("llm_calls_saved", dedup_stats.calls_saved, reason="dedup")
+        self.tracer.count("overlap_relationships_dropped", dedup_stats.relationships_dropped)
+
+        self.tracer.flush()
+        print(f"Extraction: {stats.summary()} [concurrency={max_concurrency}]")
+        if dedup:
+            print(f"Dedup: {dedup_stats.summary()}")
+        if batched:
+            print(f"Batching: up to {self.batch_chunks} chunks per request, "
+                  f"{stats.prompt_tokens_saved} prompt tokens saved")
+        if self.cache is not None:
+            print(f"Chunk cache: {self.cache.summary()}")
+        return graph_data, stats
+
+
+def extract_graph_data(paragraphs, selected_model: str = None, max_concurrency: int = MAX_CONCURRENCY,
+                       use_cache: bool = True, on_progress=None, size_hint: int = None, on_snapshot=None):
+    """
+    Chunk a stream of cleaned paragraphs, extract every chunk and merge the results into GraphData.
+    on_progress is called with the ExtractionStats after every chunk; size_hint (input size in
+    characters or bytes) gives it an estimated chunk count for the ETA. on_snapshot receives
+    throttled partial graphs while extraction runs (see GraphExtractor.aextract).
+    """
+    extractor = GraphExtractor(selected_model, use_cache)
+    graph_data, _ = asyncio.run(extractor.aextract(paragraphs, max_concurrency, on_progress, size_hint,
+                                                   on_snapshot))
+    return graph_data
+
 # import asyncio
 # import threading
 # from langchain_experimental.graph_transformers import LLMGraphTransformer
@@ -0,0 +1,306 @@
+import os
+import numpy as np
+from functools import lru_cache
+from src.graph.graph_store import GraphData, load_graph_data
+from src.graph.entity_resolution import canonical_key
+
+
+def _csr(n, rows, cols, edge_ids):
+    """
+    Compressed sparse rows: neighbors of node i are cols[indptr[i]:indptr[i + 1]].
+    Also returns the edge index of every entry so edge attributes can be filtered.
+    """
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order].astype(np.int64), edge_ids[order]
+
+
+def _gather(indptr, indices, nodes):
+    """
+    Concatenated CSR rows of `nodes` in one vectorized step.
+    Returns (position into indices, owning node) for every neighbor entry.
+    """
+    starts, ends = indptr[nodes], indptr[nodes + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owner = np.repeat(nodes, lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets, owner
+
+
+class GraphIndex:
+    """
+    Read-only query engine over a GraphData: CSR adjacency in both directions, an id lookup
+    (exact and by canonical key) and a type index. Built in O(edges) and shared between
+    queries; all traversals expand whole BFS frontiers with array operations.
+    """
+
+    def __init__(self, graph_data: GraphData):
+        self.graph = graph_data
+        n = graph_data.num_nodes
+        src = graph_data.edge_src.astype(np.int64)
+        dst = graph_data.edge_dst.astype(np.int64)
+        edge_ids = np.arange(graph_data.num_edges, dtype=np.int64)
+        self.out_indptr, self.out_indices, self.out_edges = _csr(n, src, dst, edge_ids)
+        self.in_indptr, self.in_indices, self.in_edges = _csr(n, dst, src, edge_ids)
+
+        self._id_index = {name: i for i, name in enumerate(graph_data.node_ids)}
+        self._key_index = {}
+        for i, name in enumerate(graph_data.node_ids):
+            self._key_index.setdefault(canonical_key(name), i)
+
+        # Nodes grouped by type: type_nodes[type_indptr[t]:type_indptr[t + 1]]
+        self.type_nodes = np.argsort(graph_data.node_type, kind="stable")
+        self.type_indptr = np.zeros(len(graph_data.node_types) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(graph_data.node_type, minlength=len(graph_data.node_types)), out=self.type_indptr[1:])
+        self._pagerank = None
+
+    # --- lookups ---
+
+    def find(self, name: str):
+        """
+        Node index for a name: exact id first, then the same canonical key ("the Musk's" -> "musk").
+        Returns None when unknown.
+        """
+        idx = self._id_index.get(name)
+        if idx is None:
+            idx = self._key_index.get(canonical_key(name))
+        return idx
+
+    def resolve(self, names):
+        """
+        Node indices for names (or indices); unknown names raise KeyError.
+        """
+        result = []
+        for name in ([names] if isinstance(names, (str, int, np.integer)) else names):
+            idx = int(name) if isinstance(name, (int, np.integer)) else self.find(name)
+            if idx is None:
+                raise KeyError(f"Unknown node '{name}'")
+            result.append(idx)
+        return np.asarray(result, dtype=np.int64)
+
+    def nodes_of_type(self, type_name: str):
+        if type_name not in self.graph.node_types:
+            return np.empty(0, dtype=np.int64)
+        t = self.graph.node_types.index(type_name)
+        return self.type_nodes[self.type_indptr[t]:self.type_indptr[t + 1]]
+
+    def _type_ids(self, vocab, names):
+        if names is None:
+            return None
+        return np.array([vocab.index(name) for name in names if name in vocab], dtype=np.int64)
+
+    # --- traversal ---
+
+    def _expand(self, frontier, direction, edge_filter):
+        """
+        All neighbors of a frontier: (neighbor, predecessor) pairs over the chosen directions.
+        """
+        neighbors, owners = [], []
+        for indptr, indices, edges, wanted in (
+            (self.out_indptr, self.out_indices, self.out_edges, direction in ("out", "both")),
+            (self.in_indptr, self.in_indices, self.in_edges, direction in ("in", "both")),
+        ):
+            if not wanted:
+                continue
+            pos, owner = _gather(indptr, indices, frontier)
+            if edge_filter is not None:
+                keep = edge_filter[edges[pos]]
+                pos, owner = pos[keep], owner[keep]
+            neighbors.append(indices[pos])
+            owners.append(owner)
+        return np.concatenate(neighbors), np.concatenate(owners)
+
+    def _edge_filter(self, edge_types):
+        type_ids = self._type_ids(self.graph.edge_types, edge_types)
+        return None if type_ids is None else np.isin(self.graph.edge_type, type_ids)
+
+    def k_hop(self, seeds, k: int = 2, direction: str = "both", edge_types=None, node_types=None,
+              max_nodes: int = None):
+        """
+        Nodes within k hops of the seed nodes (names or indices), seeds included, in BFS order.
+
+        Args:
+            direction (str): "out", "in" or "both".
+            edge_types (list[str], optional): Only traverse these relationship types.
+            node_types (list[str], optional): Only visit (and pass through) nodes of these types.
+            max_nodes (int, optional): Stop once this many nodes were reached.
+
+        Returns:
+            tuple: (node indices, hop distance per node)
+        """
+        seeds = self.resolve(seeds)
+        n = self.graph.num_nodes
+        dist = np.full(n, -1, dtype=np.int64)
+        dist[seeds] = 0
+        allowed = None
+        type_ids = self._type_ids(self.graph.node_types, node_types)
+        if type_ids is not None:
+            allowed = np.isin(self.graph.node_type, type_ids)
+        edge_filter = self._edge_filter(edge_types)
+
+        order = [seeds]
+        frontier = seeds
+        reached = len(seeds)
+        for hop in range(1, k + 1):
+            if len(frontier) == 0 or (max_nodes and reached >= max_nodes):
+                break
+            neighbors, _ = self._expand(frontier, direction, edge_filter)
+            neighbors = np.unique(neighbors)
+            new = neighbors[dist[neighbors] < 0]
+            if allowed is not None:
+                new = new[allowed[new]]
+            if max_nodes:
+                new = new[:max_nodes - reached]
+            dist[new] = hop
+            order.append(new)
+            reached += len(new)
+            frontier = new
+        nodes = np.concatenate(order)
+        return nodes, dist[nodes]
+
+    def shortest_path(self, source, target, direction: str = "both", edge_types=None, max_hops: int = None):
+        """
+        Fewest-hop path between two nodes as a list of node indices (empty if unreachable).
+        Level-synchronous BFS from the source, one vectorized frontier expansion per hop.
+        """
+        s, t = self.resolve([source, target])
+        if s == t:
+            return [int(s)]
+        n = self.graph.num_nodes
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[s] = s
+        edge_filter = self._edge_filter(edge_types)
+        frontier = np.array([s], dtype=np.int64)
+        hops = 0
+        while len(frontier) and parent[t] < 0 and (max_hops is None or hops < max_hops):
+            neighbors, owners = self._expand(frontier, direction, edge_filter)
+            fresh = parent[neighbors] < 0
+            neighbors, owners = neighbors[fresh], owners[fresh]
+            # First predecessor wins for nodes reached several times in this hop
+            neighbors, first = np.unique(neighbors, return_index=True)
+            parent[neighbors] = owners[first]
+            frontier = neighbors
+            hops += 1
+        if parent[t] < 0:
+            return []
+        path = [int(t)]
+        while path[-1] != s:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
+
+    # --- ranking ---
+
+    def pagerank(self, damping: float = 0.85, iters: int = 100, tol: float = 1e-9):
+        """
+        Weighted PageRank along edge direction (power iteration over the edge list, dangling
+        mass spread uniformly). Cached after the first call.
+        """
+        if self._pagerank is not None:
+            return self._pagerank
+        g = self.graph
+        n = g.num_nodes
+        if n == 0:
+            return np.zeros(0)
+        weight = g.edge_weight.astype(np.float64)
+        out_weight = np.bincount(g.edge_src, weights=weight, minlength=n)
+        dangling = out_weight == 0
+        share = weight / np.maximum(out_weight[g.edge_src], 1e-12)
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iters):
+            incoming = np.bincount(g.edge_dst, weights=rank[g.edge_src] * share, minlength=n)
+            new = (1 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+            done = np.abs(new - rank).sum() < tol
+            rank = new
+            if done:
+                break
+        self._pagerank = rank
+        return rank
+
+    def top_nodes(self, k: int = 10, by: str = "degree", node_type: str = None):
+        """
+        The k highest ranked nodes by "degree" or "pagerank", optionally of one type.
+        Returns a list of (node id, type, score).
+        """
+        scores = self.graph.degrees() if by == "degree" else self.pagerank()
+        candidates = self.nodes_of_type(node_type) if node_type else np.arange(self.graph.num_nodes)
+        if len(candidates) > k:
+            top = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        else:
+            top = candidates
+        top = top[np.argsort(-scores[top], kind="stable")]
+        types = self.graph.node_types
+        return [(self.graph.node_ids[i], types[self.graph.node_type[i]], float(scores[i])) for i in top]
+
+    # --- export ---
+
+    def subgraph(self, nodes, edge_types=None, node_types=None) -> GraphData:
+        """
+        Induced subgraph on the given nodes (names or indices) as a new GraphData, optionally
+        restricted to some relationship/node types. Vocabularies are kept so type indices match.
+        """
+        g = self.graph
+        keep = np.zeros(g.num_nodes, dtype=bool)
+        keep[self.resolve(nodes)] = True
+        type_ids = self._type_ids(g.node_types, node_types)
+        if type_ids is not None:
+            keep &= np.isin(g.node_type, type_ids)
+        keep_edge = keep[g.edge_src] & keep[g.edge_dst]
+        edge_filter = self._edge_filter(edge_types)
+        if edge_filter is not None:
+            keep_edge &= edge_filter
+
+        index = np.full(g.num_nodes, -1, dtype=np.int64)
+        kept = np.flatnonzero(keep)
+        index[kept] = np.arange(len(kept))
+        # Edges stay sorted by (src, dst, type): the renumbering preserves node order
+        return GraphData(
+            node_ids=[g.node_ids[i] for i in kept],
+            node_type=g.node_type[kept],
+            node_types=g.node_types,
+            edge_src=index[g.edge_src[keep_edge]],
+            edge_dst=index[g.edge_dst[keep_edge]],
+            edge_type=g.edge_type[keep_edge],
+            edge_types=g.edge_types,
+            edge_weight=g.edge_weight[keep_edge],
+            meta=g.meta,
+        )
+
+    def neighborhood(self, seeds, k: int = 2, **filters) -> GraphData:
+        """
+        k-hop neighborhood of the seeds as a GraphData (see k_hop for the filters).
+        """
+        nodes, _ = self.k_hop(seeds, k, **filters)
+        return self.subgraph(nodes, edge_types=filters.get("edge_types"))
+
+    def path_subgraph(self, source, target, **options) -> GraphData:
+        """
+        The shortest path between two nodes as a GraphData (empty if unreachable).
+        Only the edges along the path are kept.
+        """
+        path = self.shortest_path(source, target, **options)
+        sub = self.subgraph(path, edge_types=options.get("edge_types"))
+        if len(path) > 1:
+            position = {name: i for i, name in enumerate(self.graph.node_ids[p] for p in path)}
+            step = np.array([position[sub.node_ids[s]] - position[sub.node_ids[d]] for s, d in
+                             zip(sub.edge_src, sub.edge_dst)], dtype=np.int64)
+            on_path = np.abs(step) == 1
+            sub.edge_src, sub.edge_dst = sub.edge_src[on_path], sub.edge_dst[on_path]
+            sub.edge_type, sub.edge_weight = sub.edge_type[on_path], sub.edge_weight[on_path]
+            sub._degree = None
+        return sub
+
+
+@lru_cache(maxsize=8)
+def _load_index(path, mtime):
+    return GraphIndex(load_graph_data(path))
+
+
+def load_graph_index(path: str) -> GraphIndex:
+    """
+    GraphIndex for a stored graph (.npz), cached until the file changes.
+    """
+    return _load_index(path, os.path.getmtime(path))
@@ -0,0 +1,564 @@
+import io
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from src.graph.entity_resolution import resolve_entities, canonical_key
+from src.config.pipeline_con import VERSION_KEYFRAME_INTERVAL
+
+FORMAT_VERSION = 1
+# Version files holding only the changes against their parent version
+DELTA_FORMAT_VERSION = 2
+
+
+class GraphData:
+    """
+    Compact, array-backed knowledge graph.
+
+    Node ids and type names are interned: nodes and edges refer to them by integer
+    index, so the whole graph is a handful of flat arrays plus two small vocabularies.
+    Parallel edges with the same (source, target, type) are stored once with a weight,
+    and edges are kept sorted by (source, target, type) so they can be looked up with
+    a binary search.
+    """
+
+    def __init__(self, node_ids, node_type, node_types, edge_src, edge_dst, edge_type,
+                 edge_types, edge_weight=None, meta=None, degree=None):
+        self.node_ids = list(node_ids)
+        self.node_type = np.asarray(node_type, dtype=np.int32)
+        self.node_types = list(node_types)
+        self.edge_src = np.asarray(edge_src, dtype=np.int32)
+        self.edge_dst = np.asarray(edge_dst, dtype=np.int32)
+        self.edge_type = np.asarray(edge_type, dtype=np.int32)
+        self.edge_types = list(edge_types)
+        if edge_weight is None:
+            edge_weight = np.ones(len(self.edge_src), dtype=np.int32)
+        self.edge_weight = np.asarray(edge_weight, dtype=np.int32)
+        self.meta = dict(meta or {})
+        self._degree = None if degree is None else np.asarray(degree, dtype=np.int64)
+        self._id_index = None
+        self._key_index = None
+
+    @property
+    def num_nodes(self):
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_src)
+
+    def degrees(self):
+        """
+        Weighted degree (in + out) of every node. Computed once, then kept up to date by merges.
+        """
+        if self._degree is None:
+            deg = np.bincount(self.edge_src, weights=self.edge_weight, minlength=self.num_nodes)
+            deg += np.bincount(self.edge_dst, weights=self.edge_weight, minlength=self.num_nodes)
+            self._degree = deg.astype(np.int64)
+        return self._degree
+
+    def node_type_names(self):
+        return [self.node_types[t] for t in self.node_type]
+
+
+def _intern(vocab, value):
+    idx = vocab.get(value)
+    if idx is None:
+        idx = vocab[value] = len(vocab)
+    return idx
+
+
+def build_graph_data(graph_documents, meta=None, resolve=True) -> GraphData:
+    """
+    Merge GraphDocument objects into a single GraphData.
+
+    With resolve=True, surface names of the same entity ("Elon Musk", "elon musk", "Musk")
+    are merged by entity resolution and each entity's type is decided by mention vote.
+    Otherwise duplicate node ids keep the last type seen. Edges whose endpoints were not
+    extracted as nodes are dropped; parallel edges are counted in edge_weight.
+    """
+    raw_index = {}
+    type_index = {}
+    rel_index = {}
+    mention_name, mention_type = [], []
+    rel_src, rel_dst, rel_type = [], [], []
+
+    for doc in graph_documents:
+        for node in doc.nodes:
+            mention_name.append(_intern(raw_index, str(node.id)))
+            mention_type.append(_intern(type_index, node.type))
+
+    for doc in graph_documents:
+        for rel in doc.relationships:
+            src = raw_index.get(str(rel.source.id))
+            dst = raw_index.get(str(rel.target.id))
+            if src is None or dst is None:
+                continue
+            rel_src.append(src)
+            rel_dst.append(dst)
+            rel_type.append(_intern(rel_index, rel.type))
+
+    names = list(raw_index)
+    mention_name = np.asarray(mention_name, dtype=np.int64)
+    mention_type = np.asarray(mention_type, dtype=np.int64)
+    if resolve and names:
+        cluster, node_ids, node_type = resolve_entities(
+            names, mention_name, mention_type, len(type_index), generic_type=type_index.get("Node")
+        )
+    else:
+        cluster = np.arange(len(names), dtype=np.int64)
+        node_ids = names
+        node_type = np.zeros(len(names), dtype=np.int32)
+        node_type[mention_name] = mention_type  # last type seen wins
+
+    rel_src = np.asarray(rel_src, dtype=np.int64)
+    rel_dst = np.asarray(rel_dst, dtype=np.int64)
+    rel_type = np.asarray(rel_type, dtype=np.int64)
+    src, dst = cluster[rel_src], cluster[rel_dst]
+    # Self-loops that only exist because two names were merged are dropped
+    keep = (src != dst) | (rel_src == rel_dst)
+    edge_src, edge_dst, edge_type, edge_weight = _dedupe_edges(
+        src[keep], dst[keep], rel_type[keep], len(node_ids), len(rel_index)
+    )
+
+    return GraphData(
+        node_ids=node_ids,
+        node_type=node_type,
+        node_types=list(type_index),
+        edge_src=edge_src,
+        edge_dst=edge_dst,
+        edge_type=edge_type,
+        edge_types=list(rel_index),
+        edge_weight=edge_weight,
+        meta=meta,
+    )
+
+
+def _dedupe_edges(src, dst, etype, num_nodes, num_types, weight=None):
+    """
+    Collapse parallel (src, dst, type) edges into one edge with summed weight.
+    """
+    if weight is None:
+        weight = np.ones(len(src), dtype=np.int64)
+    key = (np.asarray(src, dtype=np.int64) * max(num_nodes, 1) + dst) * max(num_types, 1) + etype
+    uniq, inverse = np.unique(key, return_inverse=True)
+    summed = np.bincount(inverse, weights=weight, minlength=len(uniq)).astype(np.int32)
+    edge_type = uniq % max(num_types, 1)
+    pair = uniq // max(num_types, 1)
+    return pair // max(num_nodes, 1), pair % max(num_nodes, 1), edge_type, summed
+
+
+# -------------------
+# Incremental merge
+# -------------------
+_SRC_SHIFT = np.int64(39)
+_DST_SHIFT = np.int64(15)
+_MAX_NODES = 1 << 24
+_MAX_EDGE_TYPES = 1 << 15
+
+
+def _edge_keys(src, dst, etype):
+    """
+    Order-preserving int64 key for (src, dst, type): sorting keys sorts edges lexicographically.
+    """
+    return (np.asarray(src, dtype=np.int64) << _SRC_SHIFT) | (np.asarray(dst, dtype=np.int64) << _DST_SHIFT) | etype
+
+
+def merge_graph_data(base: GraphData, new: GraphData) -> GraphData:
+    """
+    Merge `new` into `base` in place and return base.
+
+    New nodes are matched to existing ones by exact id or canonical key; unmatched nodes
+    are appended. Edges already present get their multiplicity increased, others are
+    inserted at their sorted position, and degrees are updated only for touched nodes.
+    """
+    # Nodes: match by id, then by canonical key, otherwise append
+    id_index, key_index = base._id_index, base._key_index
+    if id_index is None or key_index is None:
+        id_index = {n: i for i, n in enumerate(base.node_ids)}
+        key_index = {}
+        for i, n in enumerate(base.node_ids):
+            key_index.setdefault(canonical_key(n), i)
+    type_index = {t: i for i, t in enumerate(base.node_types)}
+    generic = type_index.get("Node")
+    new_types = np.array([_intern(type_index, t) for t in new.node_types] or [0], dtype=np.int32)
+
+    degree = base.degrees()
+    node_map = np.empty(new.num_nodes, dtype=np.int64)
+    appended_ids, appended_types = [], []
+    for i, node_id in enumerate(new.node_ids):
+        key = canonical_key(node_id)
+        idx = id_index.get(node_id)
+        if idx is None:
+            idx = key_index.get(key)
+        node_t = new_types[new.node_type[i]]
+        if idx is None:
+            idx = id_index[node_id] = key_index[key] = base.num_nodes + len(appended_ids)
+            appended_ids.append(node_id)
+            appended_types.append(node_t)
+        elif idx < base.num_nodes and base.node_type[idx] == generic:
+            base.node_type[idx] = node_t  # a typed mention beats the fallback type
+        node_map[i] = idx
+
+    if appended_ids:
+        base.node_ids.extend(appended_ids)
+        base.node_type = np.concatenate([base.node_type, np.asarray(appended_types, dtype=np.int32)])
+        degree = np.concatenate([degree, np.zeros(len(appended_ids), dtype=np.int64)])
+    base.node_types = list(type_index)
+    if base.num_nodes >= _MAX_NODES:
+        raise ValueError(f"Graph too large to merge ({base.num_nodes} nodes)")
+
+    # Edges: bump multiplicity of known edges, insert unknown ones in sorted position
+    rel_index = {t: i for i, t in enumerate(base.edge_types)}
+    new_rel = np.array([_intern(rel_index, t) for t in new.edge_types] or [0], dtype=np.int64)
+    base.edge_types = list(rel_index)
+    if len(rel_index) >= _MAX_EDGE_TYPES:
+        raise ValueError(f"Too many relationship types to merge ({len(rel_index)})")
+
+    src, dst = node_map[new.edge_src], node_map[new.edge_dst]
+    keep = (src != dst) | (new.edge_src == new.edge_dst)
+    src, dst, etype, weight = _dedupe_edges(
+        src[keep], dst[keep], new_rel[new.edge_type[keep]], base.num_nodes, len(rel_index),
+        new.edge_weight[keep],
+    )
+    base_keys = _edge_keys(base.edge_src, base.edge_dst, base.edge_type)
+    new_keys = _edge_keys(src, dst, etype)
+    pos = np.searchsorted(base_keys, new_keys)
+    found = pos < len(base_keys)
+    found[found] = base_keys[pos[found]] == new_keys[found]
+
+    np.add.at(base.edge_weight, pos[found], weight[found].astype(np.int32))
+    insert = pos[~found]
+    base.edge_src = np.insert(base.edge_src, insert, src[~found].astype(np.int32))
+    base.edge_dst = np.insert(base.edge_dst, insert, dst[~found].astype(np.int32))
+    base.edge_type = np.insert(base.edge_type, insert, etype[~found].astype(np.int32))
+    base.edge_weight = np.insert(base.edge_weight, insert, weight[~found].astype(np.int32))
+
+    np.add.at(degree, src, weight)
+    np.add.at(degree, dst, weight)
+    base._degree = degree
+    base._id_index = id_index
+    base._key_index = key_index
+    return base
+
+
+# -------------------
+# Versions
+# -------------------
+# Node and edge status in a GraphDiff
+UNCHANGED, ADDED, REMOVED, CHANGED = 0, 1, 2, 3
+
+# A version changing more than this share of its nodes and edges is stored in full, and so
+# is a small graph (below this many nodes + edges a delta file is not smaller than a full one)
+_MAX_DELTA_SHARE = 0.5
+_MIN_DELTA_SIZE = 500
+
+
+def _vocab_map(old_vocab, new_vocab):
+    """
+    Index in new_vocab of every entry of old_vocab (-1 if absent), as a lookup array.
+    """
+    index = {value: i for i, value in enumerate(new_vocab)}
+    return np.array([index.get(value, -1) for value in old_vocab] or [-1], dtype=np.int64)
+
+
+def _align(parent: GraphData, new: GraphData) -> dict:
+    """
+    Match `new` against `parent`: nodes by id, types by name, edges by (source, target, type).
+
+    Node indices are given in the child order used by version deltas: the parent's nodes that
+    are kept, in parent order, then the added nodes in `new` order. Types use new's vocabularies.
+    """
+    parent_pos = {node_id: i for i, node_id in enumerate(parent.node_ids)}
+    match = np.fromiter((parent_pos.get(node_id, -1) for node_id in new.node_ids), dtype=np.int64,
+                        count=new.num_nodes)
+    common = np.flatnonzero(match >= 0)
+    added_nodes = np.flatnonzero(match < 0)
+    kept = np.zeros(parent.num_nodes, dtype=bool)
+    kept[match[common]] = True
+    parent_to_child = np.where(kept, np.cumsum(kept) - 1, -1)
+    new_to_child = np.empty(new.num_nodes, dtype=np.int64)
+    new_to_child[common] = parent_to_child[match[common]]
+    new_to_child[added_nodes] = int(kept.sum()) + np.arange(len(added_nodes))
+
+    parent_node_type = _vocab_map(parent.node_types, new.node_types)[parent.node_type]
+    retyped = common[parent_node_type[match[common]] != new.node_type[common]]
+
+    parent_edge_type = _vocab_map(parent.edge_types, new.edge_types)[parent.edge_type]
+    src, dst = parent_to_child[parent.edge_src], parent_to_child[parent.edge_dst]
+    valid = (src >= 0) & (dst >= 0) & (parent_edge_type >= 0)
+    parent_keys = np.full(parent.num_edges, -1, dtype=np.int64)
+    parent_keys[valid] = _edge_keys(src[valid], dst[valid], parent_edge_type[valid])
+    new_keys = _edge_keys(new_to_child[new.edge_src], new_to_child[new.edge_dst], new.edge_type)
+    order = np.argsort(new_keys, kind="stable")
+    pos = np.minimum(np.searchsorted(new_keys[order], parent_keys), max(new.num_edges - 1, 0))
+    found = valid & (new_keys[order][pos] == parent_keys) if new.num_edges else np.zeros(parent.num_edges, bool)
+    parent_to_new_edge = np.where(found, order[pos] if new.num_edges else -1, -1)
+    matched = np.zeros(new.num_edges, dtype=bool)
+    matched[parent_to_new_edge[found]] = True
+    same = np.flatnonzero(found)
+    reweighted = same[parent.edge_weight[same] != new.edge_weight[parent_to_new_edge[same]]]
+    return {
+        "kept": kept, "parent_to_child": parent_to_child, "new_to_child": new_to_child,
+        "added_nodes": added_nodes, "retyped": retyped,
+        "removed_edges": np.flatnonzero(~found), "reweighted": reweighted,
+        "parent_to_new_edge": parent_to_new_edge, "added_edges": np.flatnonzero(~matched),
+    }
+
+
+class GraphDiff:
+    """
+    Changes from an older to a newer graph. `graph` holds both (the newer graph plus removed
+    nodes and edges); node_status and edge_status say which of its parts were ADDED, REMOVED,
+    CHANGED (node type or edge multiplicity) or UNCHANGED.
+    """
+
+    def __init__(self, graph: GraphData, node_status, edge_status):
+        self.graph = graph
+        self.node_status = node_status
+        self.edge_status = edge_status
+
+    def summary(self) -> dict:
+        nodes = np.bincount(self.node_status, minlength=4)
+        edges = np.bincount(self.edge_status, minlength=4)
+        return {"nodes_added": int(nodes[ADDED]), "nodes_removed": int(nodes[REMOVED]),
+                "nodes_retyped": int(nodes[CHANGED]), "edges_added": int(edges[ADDED]),
+                "edges_removed": int(edges[REMOVED]), "edges_reweighted": int(edges[CHANGED])}
+
+
+def diff_graphs(old: GraphData, new: GraphData) -> GraphDiff:
+    """
+    Compare two versions of a graph by node id and (source, target, type) edge.
+    """
+    a = _align(old, new)
+    num_child = new.num_nodes
+    removed_nodes = np.flatnonzero(~a["kept"])
+    # Union: the newer graph in child order, then the removed nodes
+    old_to_union = a["parent_to_child"].copy()
+    old_to_union[removed_nodes] = num_child + np.arange(len(removed_nodes))
+    node_ids = [None] * num_child
+    for i, c in enumerate(a["new_to_child"].tolist()):
+        node_ids[c] = new.node_ids[i]
+    node_ids += [old.node_ids[i] for i in removed_nodes]
+    node_types = list(new.node_types) + [t for t in old.node_types if t not in set(new.node_types)]
+    edge_types = list(new.edge_types) + [t for t in old.edge_types if t not in set(new.edge_types)]
+    old_node_type = _vocab_map(old.node_types, node_types)[old.node_type]
+    node_type = np.empty(num_child + len(removed_nodes), dtype=np.int32)
+    node_type[a["new_to_child"]] = new.node_type
+    node_type[num_child:] = old_node_type[removed_nodes]
+
+    node_status = np.full(len(node_ids), UNCHANGED, dtype=np.int8)
+    node_status[a["new_to_child"][a["added_nodes"]]] = ADDED
+    node_status[a["new_to_child"][a["retyped"]]] = CHANGED
+    node_status[num_child:] = REMOVED
+
+    removed = a["removed_edges"]
+    src = np.concatenate([a["new_to_child"][new.edge_src], old_to_union[old.edge_src[removed]]])
+    dst = np.concatenate([a["new_to_child"][new.edge_dst], old_to_union[old.edge_dst[removed]]])
+    etype = np.concatenate([new.edge_type, _vocab_map(old.edge_types, edge_types)[old.edge_type[removed]]])
+    weight = np.concatenate([new.edge_weight, old.edge_weight[removed]])
+    edge_status = np.full(len(src), UNCHANGED, dtype=np.int8)
+    edge_status[a["added_edges"]] = ADDED
+    edge_status[a["parent_to_new_edge"][a["reweighted"]]] = CHANGED
+    edge_status[new.num_edges:] = REMOVED
+
+    order = np.argsort(_edge_keys(src, dst, etype), kind="stable")
+    graph = GraphData(node_ids, node_type, node_types, src[order], dst[order], etype[order], edge_types,
+                      weight[order], meta=new.meta)
+    return GraphDiff(graph, node_status, edge_status[order])
+
+
+def _delta_arrays(parent: GraphData, new: GraphData, a: dict) -> dict:
+    """
+    The arrays of a version delta (see _apply_delta); node indices are in child order.
+    """
+    ids_blob, ids_offsets = _pack_strings([new.node_ids[i] for i in a["added_nodes"]])
+    added_edges = a["added_edges"]
+    return {
+        "removed_nodes": np.flatnonzero(~a["kept"]).astype(np.int32),
+        "added_ids_blob": ids_blob,
+        "added_ids_offsets": ids_offsets,
+        "added_node_type": new.node_type[a["added_nodes"]],
+        "retyped_nodes": a["new_to_child"][a["retyped"]].astype(np.int32),
+        "retyped_type": new.node_type[a["retyped"]],
+        "removed_edges": a["removed_edges"].astype(np.int32),
+        "reweighted_edges": a["reweighted"].astype(np.int32),
+        "reweighted_weight": new.edge_weight[a["parent_to_new_edge"][a["reweighted"]]],
+        "added_src": a["new_to_child"][new.edge_src[added_edges]].astype(np.int32),
+        "added_dst": a["new_to_child"][new.edge_dst[added_edges]].astype(np.int32),
+        "added_type": new.edge_type[added_edges],
+        "added_weight": new.edge_weight[added_edges],
+    }
+
+
+def _apply_delta(parent: GraphData, data, manifest: dict) -> GraphData:
+    """
+    Rebuild a version from its parent and the delta arrays: kept parent nodes in parent order,
+    then added nodes; edges re-sorted by (source, target, type).
+    """
+    node_types, edge_types = manifest["node_types"], manifest["edge_types"]
+    kept = np.ones(parent.num_nodes, dtype=bool)
+    kept[data["removed_nodes"]] = False
+    parent_to_child = np.where(kept, np.cumsum(kept) - 1, -1)
+    node_ids = [node_id for node_id, keep in zip(parent.node_ids, kept.tolist()) if keep]
+    node_ids += _unpack_strings(data["added_ids_blob"], data["added_ids_offsets"])
+    node_type = np.concatenate([_vocab_map(parent.node_types, node_types)[parent.node_type[kept]],
+                                data["added_node_type"]])
+    node_type[data["retyped_nodes"]] = data["retyped_type"]
+
+    keep_edge = np.ones(parent.num_edges, dtype=bool)
+    keep_edge[data["removed_edges"]] = False
+    weight = parent.edge_weight.copy()
+    weight[data["reweighted_edges"]] = data["reweighted_weight"]
+    src = np.concatenate([parent_to_child[parent.edge_src[keep_edge]], data["added_src"]])
+    dst = np.concatenate([parent_to_child[parent.edge_dst[keep_edge]], data["added_dst"]])
+    etype = np.concatenate([_vocab_map(parent.edge_types, edge_types)[parent.edge_type[keep_edge]],
+                            data["added_type"]])
+    weight = np.concatenate([weight[keep_edge], data["added_weight"]])
+    order = np.argsort(_edge_keys(src, dst, etype), kind="stable")
+    return GraphData(node_ids, node_type, node_types, src[order], dst[order], etype[order], edge_types,
+                     weight[order], meta=manifest.get("meta"))
+
+
+# -------------------
+# On-disk format
+# -------------------
+def _pack_strings(values):
+    """
+    Encode a list of strings as one utf-8 blob plus an offsets array (Arrow-style).
+    """
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob, offsets):
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def save_graph_data(graph_data: GraphData, path: str, parent_path: str = None,
+                    keyframe_interval: int = VERSION_KEYFRAME_INTERVAL) -> str:
+    """
+    Write a GraphData to a compressed .npz (arrays + JSON manifest).
+    The file is written to a temporary name and renamed, so readers never see a partial graph.
+
+    With parent_path (the stored previous version of the same document), only the changes
+    against it are written, unless the parent is the end of a chain of keyframe_interval - 1
+    deltas, most of the graph changed or the graph is small; then the version is stored in
+    full (a keyframe).
+    Delta files name their parent, which must stay next to them in the same directory.
+    """
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created": time.time(),
+        "num_nodes": graph_data.num_nodes,
+        "num_edges": graph_data.num_edges,
+        "node_types": graph_data.node_types,
+        "edge_types": graph_data.edge_types,
+        "meta": graph_data.meta,
+    }
+    arrays = None
+    if parent_path is not None and os.path.exists(parent_path):
+        parent, parent_manifest = _load_parent(parent_path)
+        depth = parent_manifest.get("depth", 0) + 1
+        if depth < keyframe_interval and graph_data.num_nodes + graph_data.num_edges >= _MIN_DELTA_SIZE:
+            a = _align(parent, graph_data)
+            changes = (len(a["added_nodes"]) + (parent.num_nodes - int(a["kept"].sum())) + len(a["added_edges"])
+                       + len(a["removed_edges"]))
+            if changes <= _MAX_DELTA_SHARE * max(graph_data.num_nodes + graph_data.num_edges, 1):
+                arrays = _delta_arrays(parent, graph_data, a)
+                manifest.update(format_version=DELTA_FORMAT_VERSION, parent=os.path.basename(parent_path),
+                                parent_created=parent_manifest["created"], depth=depth)
+    if arrays is None:
+        ids_blob, ids_offsets = _pack_strings(graph_data.node_ids)
+        arrays = dict(
+            node_ids_blob=ids_blob,
+            node_ids_offsets=ids_offsets,
+            node_type=graph_data.node_type,
+            edge_src=graph_data.edge_src,
+            edge_dst=graph_data.edge_dst,
+            edge_type=graph_data.edge_type,
+            edge_weight=graph_data.edge_weight,
+            node_degree=graph_data.degrees(),
+        )
+    buffer = io.BytesIO()
+    np.savez_compressed(
+        buffer,
+        manifest=np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8),
+        **arrays,
+    )
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Read only the manifest (counts, vocabularies, metadata) of a stored graph.
+    """
+    with np.load(path) as data:
+        return json.loads(data["manifest"].tobytes())
+
+
+def load_graph_data(path: str) -> GraphData:
+    """
+    Load a stored graph; versions stored as deltas are rebuilt from their parent chain.
+    """
+    return _load(path)[0]
+
+
+def _load(path: str):
+    with np.load(path) as data:
+        manifest = json.loads(data["manifest"].tobytes())
+        if manifest.get("format_version", 0) > DELTA_FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph format version {manifest['format_version']} in '{path}'")
+        if manifest.get("parent"):
+            parent_path = os.path.join(os.path.dirname(path), manifest["parent"])
+            if not os.path.exists(parent_path):
+                raise FileNotFoundError(f"Graph '{path}' is stored as changes to '{parent_path}', which is missing")
+            parent, parent_manifest = _load_parent(parent_path)
+            if parent_manifest["created"] != manifest["parent_created"]:
+                raise ValueError(f"Graph '{path}' is stored as changes to '{parent_path}', which was overwritten")
+            return _apply_delta(parent, data, manifest), manifest
+        graph_data = GraphData(
+            node_ids=_unpack_strings(data["node_ids_blob"], data["node_ids_offsets"]),
+            node_type=data["node_type"],
+            node_types=manifest["node_types"],
+            edge_src=data["edge_src"],
+            edge_dst=data["edge_dst"],
+            edge_type=data["edge_type"],
+            edge_types=manifest["edge_types"],
+            edge_weight=data["edge_weight"],
+            meta=manifest.get("meta"),
+            degree=data["node_degree"] if "node_degree" in data.files else None,
+        )
+        return graph_data, manifest
+
+
+# Recently loaded parent versions, so loading neighbouring versions (or a diff of two)
+# doesn't re-read the shared part of their chain. Only read by _apply_delta, never modified.
+_PARENT_CACHE_SIZE = 4
+_parent_cache = OrderedDict()
+_parent_lock = threading.Lock()
+
+
+def _load_parent(path: str):
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    with _parent_lock:
+        if key in _parent_cache:
+            _parent_cache.move_to_end(key)
+            return _parent_cache[key]
+    loaded = _load(path)
+    with _parent_lock:
+        _parent_cache[key] = loaded
+        while len(_parent_cache) > _PARENT_CACHE_SIZE:
+            _parent_cache.popitem(last=False)
+    return loaded
@@ -0,0 +1,203 @@
+import os
+import json
+import shutil
+import pyvis
+
+# vis-network files shipped with pyvis, served from disk instead of a CDN
+ASSET_DIR = "assets"
+_VIS_LIB = os.path.join(os.path.dirname(pyvis.__file__), "lib", "vis-9.1.2")
+_ASSET_FILES = ("vis-network.min.js", "vis-network.css")
+
+# The view spec of a compact HTML file sits in this script tag, so viewers can read it back
+_SPEC_OPEN = '<script id="kg-view" type="application/json">'
+_SPEC_CLOSE = "</script>"
+
+# Collapses nodes carrying a `cid` into one cluster per cid; double-click opens a cluster
+COLLAPSE_CLUSTERS_JS = """
+function collapseClusters(network) {
+  var cids = {};
+  network.body.data.nodes.forEach(function (node) {
+    if (node.cid !== undefined) { cids[node.cid] = (cids[node.cid] || 0) + 1; }
+  });
+  Object.keys(cids).forEach(function (cid) {
+    network.cluster({
+      joinCondition: function (node) { return String(node.cid) === cid; },
+      clusterNodeProperties: {
+        id: "cluster:" + cid, label: "+" + cids[cid], title: cids[cid] + " nodes (double-click to expand)",
+        shape: "database", color: "#555555", font: {color: "white"}, borderWidth: 2
+      }
+    });
+  });
+  network.on("doubleClick", function (params) {
+    if (params.nodes.length === 1 && network.isCluster(params.nodes[0])) {
+      network.openCluster(params.nodes[0]);
+    }
+  });
+}
+"""
+
+# Builds the network from a view spec: gzip+base64 column data is decoded by the browser
+# after the page is shown, and per-item styles are derived here instead of being stored
+VIEWER_JS = COLLAPSE_CLUSTERS_JS + """
+async function renderGraph(spec, root) {
+  root.innerHTML = '<div class="kg-bar"><select class="kg-type"><option value="">All types</option></select>' +
+    ' <span class="kg-status">Loading graph...</span></div><div class="kg-graph"></div>';
+  var status = root.querySelector(".kg-status");
+  var container = root.querySelector(".kg-graph");
+  container.style.height = spec.height;
+  container.style.background = spec.bgcolor;
+
+  var blob = await (await fetch("data:application/octet-stream;base64," + spec.data)).blob();
+  var text = await new Response(blob.stream().pipeThrough(new DecompressionStream("gzip"))).text();
+  var data = JSON.parse(text);
+
+  var n = data.ids.length, nodes = new Array(n);
+  for (var i = 0; i < n; i++) {
+    var id = data.ids[i], group = data.groups[data.group[i]], degree = data.degree[i];
+    var node = {
+      id: i, label: id.length > 30 ? id.slice(0, 30) + "..." : id, group: group,
+      title: "ID: " + id + "\\nType: " + group + "\\nDegree: " + degree, size: 15 + Math.min(degree * 2, 40)
+    };
+    if (data.x) { node.x = data.x[i]; node.y = data.y[i]; }
+    if (data.cid && data.cid[i] >= 0) { node.cid = data.cid[i]; }
+    if (data.label) { node.label = data.label[i]; }
+    if (data.title) { node.title = data.title[i]; }
+    if (data.size) { node.size = data.size[i]; }
+    if (data.nodeStyle && data.nodeStyle[i] >= 0) { Object.assign(node, data.styles[data.nodeStyle[i]]); }
+    nodes[i] = node;
+  }
+  var m = data.src.length, edges = new Array(m);
+  for (var j = 0; j < m; j++) {
+    var style = data.edgeTypes[data.type[j]];
+    var edge = {from: data.src[j], to: data.dst[j], label: style.label};
+    if (style.color) { edge.color = style.color; edge.width = style.width; }
+    if (data.edgeTitle) { edge.title = data.edgeTitle[j]; }
+    if (data.edgeWidth) { edge.width = data.edgeWidth[j]; }
+    if (data.edgeStyle && data.edgeStyle[j] >= 0) { Object.assign(edge, data.styles[data.edgeStyle[j]]); }
+    edges[j] = edge;
+  }
+
+  var nodeSet = new vis.DataSet(nodes);
+  var network = new vis.Network(container, {nodes: nodeSet, edges: new vis.DataSet(edges)}, spec.options);
+  if (data.cid) { collapseClusters(network); }
+
+  var select = root.querySelector(".kg-type");
+  data.groups.forEach(function (group) { select.add(new Option(group, group)); });
+  select.onchange = function () {
+    var wanted = select.value;
+    nodeSet.update(nodes.map(function (node) { return {id: node.id, hidden: !!wanted && node.group !== wanted}; }));
+  };
+  status.textContent = n + " nodes, " + m + " edges";
+  return network;
+}
+"""
+
+_STYLE = """
+<style>
+  body { margin: 0; font-family: sans-serif; }
+  .kg-bar { padding: 4px 8px; font-size: 13px; color: #ccc; background: #2a2a2a; }
+  .kg-graph { width: 100%; }
+  div.vis-tooltip { white-space: pre-line; }
+</style>
+"""
+
+_STANDALONE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="{assets}/vis-network.css">
+<script src="{assets}/vis-network.min.js"></script>
+{style}
+</head>
+<body>
+<div id="kg-root"></div>
+{spec_open}{spec}{spec_close}
+<script>
+{viewer}
+renderGraph(JSON.parse(document.getElementById("kg-view").textContent), document.getElementById("kg-root"));
+</script>
+</body>
+</html>
+"""
+
+# Streamlit component page: the spec arrives as a component argument, so the page and the
+# vis-network files are loaded once and cached by the browser instead of re-sent per view
+_COMPONENT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="vis-network.css">
+<script src="vis-network.min.js"></script>
+{style}
+</head>
+<body>
+<div id="kg-root"></div>
+<script>
+{viewer}
+function sendMessage(type, data) {{
+  window.parent.postMessage(Object.assign({{isStreamlitMessage: true, type: type}}, data), "*");
+}}
+var shown = null;
+window.addEventListener("message", function (event) {{
+  if (!event.data || event.data.type !== "streamlit:render") {{ return; }}
+  var spec = event.data.args.spec;
+  if (!spec || (shown && shown.data === spec.data)) {{ return; }}
+  shown = spec;
+  sendMessage("streamlit:setFrameHeight", {{height: parseInt(spec.height, 10) + 40}});
+  renderGraph(spec, document.getElementById("kg-root"));
+}});
+sendMessage("streamlit:componentReady", {{apiVersion: 1}});
+</script>
+</body>
+</html>
+"""
+
+
+def install_assets(dest_dir: str) -> str:
+    """
+    Copy the vis-network files into dest_dir (once; they never change for a pyvis version).
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    for name in _ASSET_FILES:
+        target = os.path.join(dest_dir, name)
+        if not os.path.exists(target):
+            shutil.copyfile(os.path.join(_VIS_LIB, name), target + ".tmp")
+            os.replace(target + ".tmp", target)
+    return dest_dir
+
+
+def standalone_html(spec: dict) -> str:
+    """
+    Self-contained page for a view spec, loading vis-network from ./assets next to the file.
+    """
+    # "</" cannot appear inside the script tag; the base64 data never contains it
+    spec_json = json.dumps(spec, separators=(",", ":")).replace("</", "<\\/")
+    return _STANDALONE_TEMPLATE.format(assets=ASSET_DIR, style=_STYLE, spec_open=_SPEC_OPEN, spec=spec_json,
+                                       spec_close=_SPEC_CLOSE, viewer=VIEWER_JS)
+
+
+def read_view_spec(html: str):
+    """
+    View spec embedded in a compact HTML page, or None for pages in the classic pyvis format.
+    """
+    start = html.find(_SPEC_OPEN)
+    if start < 0:
+        return None
+    start += len(_SPEC_OPEN)
+    return json.loads(html[start:html.index(_SPEC_CLOSE, start)])
+
+
+def build_viewer_component(dest_dir: str) -> str:
+    """
+    Write the Streamlit viewer component (index.html plus vis-network files) to dest_dir.
+    """
+    install_assets(dest_dir)
+    page = _COMPONENT_TEMPLATE.format(style=_STYLE, viewer=VIEWER_JS)
+    path = os.path.join(dest_dir, "index.html")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == page:
+                return dest_dir
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return dest_dir
@@ -0,0 +1,156 @@
+import numpy as np
+
+# Above this many nodes, exact O(n^2) repulsion is replaced by a grid mean-field approximation
+_EXACT_REPULSION_MAX = 400
+_GRID = 24
+
+
+def _scatter_add(n, index, values):
+    """
+    Row-wise sum of `values` (m, 2) into n slots; bincount is much faster than np.add.at.
+    """
+    return np.c_[
+        np.bincount(index, weights=values[:, 0], minlength=n),
+        np.bincount(index, weights=values[:, 1], minlength=n),
+    ]
+
+
+def _spmv(n, src, dst, weight, x):
+    """
+    (A + A^T) @ x for an edge list, without building a matrix.
+    """
+    w = weight[:, None]
+    return _scatter_add(n, src, w * x[dst]) + _scatter_add(n, dst, w * x[src])
+
+
+def spectral_layout(n, src, dst, weight=None, iters=60, seed=0):
+    """
+    2D positions from the leading non-trivial eigenvectors of the random-walk matrix,
+    found by power iteration on the edge list (O(edges) per step).
+    Returns an (n, 2) array scaled to [-1, 1].
+    """
+    rng = np.random.default_rng(seed)
+    if n == 0:
+        return np.zeros((0, 2))
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    weight = np.ones(len(src)) if weight is None else np.asarray(weight, dtype=np.float64)
+
+    degree = np.bincount(src, weights=weight, minlength=n) + np.bincount(dst, weights=weight, minlength=n)
+    inv_degree = np.where(degree > 0, 1.0 / np.maximum(degree, 1e-12), 0.0)
+    x = rng.standard_normal((n, 2))
+    ones = np.ones(n) / np.sqrt(n)
+    for _ in range(iters):
+        # Lazy random walk keeps the iteration from oscillating on bipartite structure
+        x = 0.5 * x + 0.5 * inv_degree[:, None] * _spmv(n, src, dst, weight, x)
+        x -= np.outer(ones, ones @ x)
+        x, _ = np.linalg.qr(x)
+    # Isolated nodes have no spectral signal; scatter them on the periphery
+    isolated = degree == 0
+    if isolated.any():
+        angle = rng.uniform(0, 2 * np.pi, isolated.sum())
+        x[isolated] = np.c_[np.cos(angle), np.sin(angle)] * np.abs(x).max() * 1.2
+    return _normalize(x)
+
+
+def _normalize(pos):
+    pos = pos - pos.mean(axis=0)
+    scale = np.abs(pos).max()
+    return pos / scale if scale > 0 else pos
+
+
+def _repulsion_exact(pos, k2):
+    disp = np.zeros_like(pos)
+    block = 1024
+    for start in range(0, len(pos), block):
+        delta = pos[start:start + block, None, :] - pos[None, :, :]
+        dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-6)
+        disp[start:start + block] = (delta * (k2 / dist2)[:, :, None]).sum(axis=1)
+    return disp
+
+
+def _repulsion_grid(pos, k2):
+    """
+    Repulsion from grid cell centers of mass (one-level Barnes-Hut), plus a push away from
+    the node's own cell center so nodes sharing a cell spread out.
+    """
+    lo, hi = pos.min(axis=0), pos.max(axis=0)
+    cell = np.minimum(((pos - lo) / np.maximum(hi - lo, 1e-9) * _GRID).astype(np.int64), _GRID - 1)
+    cell_id = cell[:, 0] * _GRID + cell[:, 1]
+    mass = np.bincount(cell_id, minlength=_GRID * _GRID).astype(np.float64)
+    cx = np.bincount(cell_id, weights=pos[:, 0], minlength=_GRID * _GRID)
+    cy = np.bincount(cell_id, weights=pos[:, 1], minlength=_GRID * _GRID)
+    occupied = np.flatnonzero(mass)
+    centers = np.c_[cx[occupied], cy[occupied]] / mass[occupied, None]
+    cmass = mass[occupied]
+    own = np.searchsorted(occupied, cell_id)
+
+    disp = np.zeros_like(pos)
+    block = 4096
+    for start in range(0, len(pos), block):
+        p = pos[start:start + block]
+        delta = p[:, None, :] - centers[None, :, :]
+        dist2 = np.maximum((delta ** 2).sum(axis=2), 1e-6)
+        force = k2 * cmass[None, :] / dist2
+        force[np.arange(len(p)), own[start:start + block]] = 0.0
+        disp[start:start + block] = (delta * force[:, :, None]).sum(axis=1)
+    local = pos - centers[own]
+    disp += local * (k2 * cmass[own] / np.maximum((local ** 2).sum(axis=1), 1e-6))[:, None]
+    return disp
+
+
+def force_layout(n, src, dst, weight=None, init=None, iters=50, seed=0):
+    """
+    Fruchterman-Reingold refinement, fully vectorized: attraction along edges via bincount,
+    repulsion exact for small graphs and grid-approximated for large ones.
+    Returns an (n, 2) array scaled to [-1, 1].
+    """
+    if n == 0:
+        return np.zeros((0, 2))
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    weight = np.ones(len(src)) if weight is None else np.asarray(weight, dtype=np.float64)
+    pos = spectral_layout(n, src, dst, weight, seed=seed) if init is None else _normalize(np.asarray(init, dtype=np.float64))
+    pos = pos + np.random.default_rng(seed).normal(scale=1e-3, size=pos.shape)
+
+    k = 2.0 / np.sqrt(n)
+    k2 = k * k
+    repulsion = _repulsion_exact if n <= _EXACT_REPULSION_MAX else _repulsion_grid
+    w = np.log1p(weight)[:, None]
+    temperature = 0.1
+    for _ in range(iters):
+        disp = repulsion(pos, k2)
+        delta = pos[src] - pos[dst]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-6)[:, None]
+        pull = delta * dist / k * w
+        disp += _scatter_add(n, dst, pull) - _scatter_add(n, src, pull)
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-9)[:, None]
+        pos += disp / length * np.minimum(length, temperature)
+        temperature *= 0.93
+    return _normalize(pos)
+
+
+def assign_to_hubs(n, src, dst, hubs):
+    """
+    Multi-source BFS: the index (into `hubs`) of the nearest hub for every node, -1 if unreachable.
+    Each BFS level is one vectorized pass over the edge list.
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    owner = np.full(n, -1, dtype=np.int64)
+    owner[hubs] = np.arange(len(hubs))
+    a = np.r_[src, dst]
+    b = np.r_[dst, src]
+    while True:
+        grow = (owner[a] >= 0) & (owner[b] < 0)
+        if not grow.any():
+            return owner
+        owner[b[grow]] = owner[a[grow]]
+
+
+def ring_positions(center, count, radius):
+    """
+    Evenly spaced points on a circle, used to place the members of a collapsed cluster.
+    """
+    angle = np.linspace(0, 2 * np.pi, count, endpoint=False)
+    return np.c_[center[0] + radius * np.cos(angle), center[1] + radius * np.sin(angle)]
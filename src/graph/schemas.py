@@ -0,0 +1,321 @@
+import os
+import re
+import json
+import hashlib
+from typing import List, Literal, Optional
+from pydantic import Field, create_model
+from langchain_experimental.graph_transformers import LLMGraphTransformer
+from langchain_core.runnables import RunnableLambda
+from langchain_experimental.graph_transformers.llm import create_simple_model
+from src.config.pipeline_con import EXTRACTION_SCHEMA
+
+# Canonical relationship type -> synonyms collapsed into it by schemas with allowed types. A
+# synonym listed under several canonical types maps to the first one the schema allows (e.g.
+# WROTE is CREATED in the general schema and AUTHORED in the science schema); an allowed type
+# always maps to itself. Inverse relations and labels with several readings are not synonyms.
+RELATIONSHIP_SYNONYMS = {
+    "WORKS_FOR": ["WORKS_AT", "WORKED_FOR", "WORKED_AT", "EMPLOYED_BY", "EMPLOYED_AT", "EMPLOYEE_OF", "STAFF_OF",
+                  "WORKS_IN"],
+    "AFFILIATED_WITH": ["WORKS_FOR", "WORKS_AT", "WORKED_AT", "EMPLOYED_BY", "RESEARCHER_AT",
+                        "PROFESSOR_AT", "AFFILIATION"],
+    "LEADS": ["LED", "HEADS", "HEAD_OF", "CEO_OF", "CHAIR_OF", "CHAIRMAN_OF", "PRESIDENT_OF", "DIRECTOR_OF",
+              "DIRECTS", "MANAGES", "LEADER_OF", "RUNS"],
+    "FOUNDED": ["FOUNDER_OF", "CO_FOUNDED", "COFOUNDED", "CO_FOUNDER_OF", "ESTABLISHED", "STARTED"],
+    "OWNS": ["OWNER_OF", "OWNED", "POSSESSES", "HOLDS"],
+    "SUBSIDIARY_OF": ["DIVISION_OF", "UNIT_OF"],
+    "MEMBER_OF": ["BELONGS_TO", "AFFILIATED_WITH", "PLAYS_FOR", "SERVES_ON"],
+    "PART_OF": ["COMPONENT_OF", "DIVISION_OF", "BELONGS_TO", "SECTION_OF", "INCLUDED_IN"],
+    "LOCATED_IN": ["BASED_IN", "HEADQUARTERED_IN", "HQ_IN", "SITUATED_IN", "LOCATED_AT", "FOUND_IN"],
+    "LIVES_IN": ["RESIDES_IN", "RESIDENT_OF", "LIVED_IN"],
+    "BORN_IN": ["BIRTHPLACE", "BIRTH_PLACE", "NATIVE_OF"],
+    "PARENT_OF": ["PARENT", "FATHER_OF", "MOTHER_OF", "HAS_CHILD"],
+    "CHILD_OF": ["SON_OF", "DAUGHTER_OF", "CHILD"],
+    "SPOUSE_OF": ["MARRIED_TO", "MARRIED", "WIFE_OF", "HUSBAND_OF", "SPOUSE"],
+    "COLLABORATES_WITH": ["COLLABORATED_WITH", "WORKED_WITH", "WORKS_WITH", "CO_AUTHOR_WITH", "PARTNERED_WITH"],
+    "KNOWS": ["FRIEND_OF", "FRIENDS_WITH", "ACQUAINTED_WITH", "COLLEAGUE_OF", "WORKED_WITH", "WORKS_WITH", "MET"],
+    "PARTICIPATED_IN": ["ATTENDED", "TOOK_PART_IN", "INVOLVED_IN", "PARTICIPANT_IN", "PARTICIPATES_IN", "PRESENTED_AT"],
+    "OCCURRED_IN": ["HAPPENED_IN", "TOOK_PLACE_IN", "HELD_IN", "OCCURRED_AT"],
+    "AUTHORED": ["WROTE", "AUTHOR_OF", "CO_AUTHORED", "PUBLISHED"],
+    "CREATED": ["WROTE", "DEVELOPED", "INVENTED", "DESIGNED", "BUILT", "CREATOR_OF", "MADE"],
+    "PRODUCES": ["MANUFACTURES", "MAKES", "SELLS", "OFFERS", "DEVELOPS", "PRODUCED"],
+    "ACQUIRED": ["BOUGHT", "PURCHASED", "TOOK_OVER", "ACQUIRES"],
+    "INVESTED_IN": ["FUNDED", "FUNDS", "INVESTS_IN", "BACKED", "FINANCED"],
+    "PARTNERS_WITH": ["PARTNERED_WITH", "PARTNER_OF", "ALLIED_WITH", "COLLABORATES_WITH"],
+    "COMPETES_WITH": ["COMPETITOR_OF", "RIVAL_OF", "COMPETES_AGAINST"],
+    "DISCOVERED": ["IDENTIFIED", "DETECTED", "DISCOVERER_OF"],
+    "STUDIES": ["STUDIED", "RESEARCHES", "RESEARCHED", "INVESTIGATES", "ANALYZES", "EXAMINES", "WORKS_ON"],
+    "USES": ["USED", "UTILIZES", "APPLIES", "BASED_ON", "RELIES_ON"],
+    "CITES": ["CITED", "REFERENCES", "REFERENCED"],
+    "RECEIVED": ["AWARDED", "WON", "RECEIVED_AWARD", "GRANTED", "RECIPIENT_OF", "WINNER_OF"],
+    "RELATED_TO": ["RELATED", "ASSOCIATED_WITH", "ASSOCIATED", "CONNECTED_TO", "LINKED_TO", "RELATES_TO"],
+}
+
+# Canonical node type -> synonyms (compared case-insensitively)
+NODE_TYPE_SYNONYMS = {
+    "Person": ["People", "Human", "Individual", "Author", "Scientist", "Researcher", "Founder", "Ceo", "Employee",
+               "Politician", "Artist", "Character"],
+    "Organization": ["Organisation", "Company", "Corporation", "Business", "Firm", "Institution", "Agency",
+                     "University", "Startup", "Team", "Government", "Lab", "Laboratory", "Org"],
+    "Location": ["Place", "City", "Country", "Region", "State", "Town", "Continent", "Area", "Address", "Site", "Gpe"],
+    "Event": ["Meeting", "Conference", "Incident", "Occurrence", "War", "Election", "Ceremony"],
+    "Product": ["Software", "Device", "Service", "Brand", "Application", "App", "Platform"],
+    "Money": ["Amount", "Currency", "Price", "Funding", "Revenue", "Investment"],
+    "Method": ["Technique", "Algorithm", "Approach", "Procedure", "Tool", "Technology"],
+    "Publication": ["Paper", "Article", "Book", "Journal", "Study", "Report", "Thesis"],
+    "Award": ["Prize", "Honor", "Honour", "Medal"],
+    "Concept": ["Idea", "Topic", "Theory", "Field", "Subject", "Term", "Notion", "Discipline"],
+}
+
+_KEY_RE = re.compile(r"[^A-Z0-9]+")
+# Auxiliary prefixes models put in front of a relation ("IS_LOCATED_IN", "WAS_BORN_IN")
+_AUX_RE = re.compile(r"^(?:IS|WAS|ARE|WERE|HAS_BEEN|HAD_BEEN|HAS|HAD)_(?=.)")
+
+
+def _rel_key(rel_type: str) -> str:
+    return _KEY_RE.sub("_", str(rel_type).upper()).strip("_")
+
+
+class ExtractionSchema:
+    """
+    What one domain extracts: allowed node and relationship types (empty = free-form) and
+    the synonym index that collapses the model's labels onto them before the graph is built.
+    A free-form schema only normalizes case and separators of relationship types, unless it
+    brings its own synonyms.
+
+    With allowed types, the extractor asks Ollama for JSON constrained to those labels, so the
+    model cannot invent new ones and spends fewer tokens on them. Relationship types that
+    still don't match after normalization become `fallback_relationship`, or are dropped
+    when it is None.
+    """
+
+    def __init__(self, name: str, node_types=(), relationship_types=(), relationship_synonyms=None,
+                 node_synonyms=None, fallback_relationship: str = "RELATED_TO", description: str = ""):
+        self.name = name
+        self.description = description
+        self.node_types = [str(t).capitalize() for t in node_types]
+        self.relationship_types = [_rel_key(t) for t in relationship_types]
+        self.fallback_relationship = _rel_key(fallback_relationship) if fallback_relationship else None
+        if self.relationship_types and self.fallback_relationship not in self.relationship_types:
+            self.fallback_relationship = None
+        self._rel_index = self._build_index(
+            {**(RELATIONSHIP_SYNONYMS if self.relationship_types else {}), **(relationship_synonyms or {})},
+            self.relationship_types, _rel_key
+        )
+        self._node_index = self._build_index(
+            {**(NODE_TYPE_SYNONYMS if self.node_types else {}), **(node_synonyms or {})},
+            self.node_types, lambda t: str(t).lower()
+        )
+
+    @staticmethod
+    def _build_index(synonyms, allowed, key):
+        """
+        normalized label -> canonical type. Allowed types (every canonical type, for a free-form
+        schema) map to themselves first; synonym groups are only used when their canonical type
+        is allowed.
+        """
+        index = {key(t): t for t in (allowed or synonyms)}
+        allowed_keys = set(index)
+        for canonical, names in synonyms.items():
+            canonical_key = key(canonical)
+            if allowed and canonical_key not in allowed_keys:
+                continue
+            target = index.setdefault(canonical_key, canonical)
+            for name in names:
+                index.setdefault(key(name), target)
+        return index
+
+    @property
+    def constrained(self) -> bool:
+        return bool(self.node_types or self.relationship_types)
+
+    def normalize_relationship(self, rel_type: str):
+        """
+        Canonical relationship type for a label, or None if the schema has no place for it.
+        """
+        key = _rel_key(rel_type)
+        canonical = self._rel_index.get(key) or self._rel_index.get(_AUX_RE.sub("", key))
+        if canonical is None:
+            if self.relationship_types:
+                return self.fallback_relationship
+            canonical = key or self.fallback_relationship
+        return canonical
+
+    def normalize_node_type(self, node_type: str) -> str:
+        key = str(node_type).lower()
+        for candidate in (key, key[:-3] + "y" if key.endswith("ies") else key[:-1] if key.endswith("s") else key):
+            if candidate in self._node_index:
+                return self._node_index[candidate]
+        return node_type
+
+    def normalize(self, graph_doc) -> tuple:
+        """
+        Normalize node and relationship types of a GraphDocument in place.
+        Returns (relationships renamed, relationships dropped).
+        """
+        for node in graph_doc.nodes:
+            node.type = self.normalize_node_type(node.type)
+        renamed, kept = 0, []
+        for rel in graph_doc.relationships:
+            rel_type = self.normalize_relationship(rel.type)
+            if rel_type is None:
+                continue
+            renamed += rel_type != rel.type
+            rel.type = rel_type
+            rel.source.type = self.normalize_node_type(rel.source.type)
+            rel.target.type = self.normalize_node_type(rel.target.type)
+            kept.append(rel)
+        dropped = len(graph_doc.relationships) - len(kept)
+        graph_doc.relationships = kept
+        return renamed, dropped
+
+    def instructions(self) -> str:
+        """
+        Extra prompt text listing the allowed labels (placed before the chunk, so it stays
+        part of the shared prompt prefix).
+        """
+        parts = []
+        if self.node_types:
+            parts.append(f"Use only these node types: {', '.join(self.node_types)}.")
+        if self.relationship_types:
+            parts.append(f"Use only these relationship types: {', '.join(self.relationship_types)}.")
+            if self.fallback_relationship:
+                parts.append(f"Use {self.fallback_relationship} when no other type fits.")
+        return " ".join(parts)
+
+    def settings(self) -> dict:
+        """
+        Part of the chunk cache key: the labels the model was allowed to use. Synonyms are
+        applied after the cache, so changing them doesn't invalidate cached chunks.
+        """
+        if not self.constrained:
+            return {}
+        labels = json.dumps([self.node_types, self.relationship_types, self.fallback_relationship])
+        return {"schema": f"{self.name}:{hashlib.sha256(labels.encode('utf-8')).hexdigest()[:12]}"}
+
+    def graph_model(self, llm_type: str = None):
+        """
+        Structured-output model for one graph. With allowed types, node and relationship
+        labels are enums, which Ollama's JSON schema format enforces while generating.
+        """
+        if not self.constrained:
+            return create_simple_model(llm_type=llm_type)
+        node_type = Literal[tuple(self.node_types)] if self.node_types else str
+        rel_type = Literal[tuple(self.relationship_types)] if self.relationship_types else str
+        node = create_model(
+            "SimpleNode",
+            id=(str, Field(..., description="Name or human-readable unique identifier.")),
+            type=(node_type, Field(..., description="The type or label of the node.")),
+        )
+        relationship = create_model(
+            "SimpleRelationship",
+            source_node_id=(str, Field(..., description="Name or human-readable unique identifier of source node")),
+            source_node_type=(node_type, Field(..., description="The type or label of the source node.")),
+            target_node_id=(str, Field(..., description="Name or human-readable unique identifier of target node")),
+            target_node_type=(node_type, Field(..., description="The type or label of the target node.")),
+            type=(rel_type, Field(..., description="The type of the relationship.")),
+        )
+        return create_model(
+            "DynamicGraph",
+            nodes=(Optional[List[node]], Field(None, description="List of nodes")),
+            relationships=(Optional[List[relationship]], Field(None, description="List of relationships")),
+        )
+
+    def build_transformer(self, llm) -> LLMGraphTransformer:
+        """
+        LLMGraphTransformer using this schema's labels, prompt instructions and output model.
+        Its own strict filtering is off: labels are normalized and filtered by normalize().
+        """
+        transformer = LLMGraphTransformer(
+            llm=llm, allowed_nodes=self.node_types, allowed_relationships=self.relationship_types,
+            strict_mode=False, additional_instructions=self.instructions(),
+        )
+        if self.constrained and transformer._function_call:
+            llm_type = getattr(llm, "_llm_type", None)
+            model = self.graph_model(llm_type)
+            transformer.chain = (transformer.chain.first | llm.with_structured_output(model, include_raw=True)
+                                 | RunnableLambda(_lenient_parse(create_simple_model(llm_type=llm_type))))
+        return transformer
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "description": self.description, "node_types": self.node_types,
+                "relationship_types": self.relationship_types, "fallback_relationship": self.fallback_relationship}
+
+
+def _lenient_parse(loose_model):
+    """
+    A JSON answer that fails the enum validation (labels outside the schema, e.g. from a server
+    that ignores the format) is re-read with free-form labels, so normalize() can map them
+    instead of the whole chunk being lost. Tool-call answers are already handled by the transformer.
+    """
+    def parse(response):
+        raw = response.get("raw")
+        if response.get("parsed") is None and isinstance(getattr(raw, "content", None), str) and raw.content:
+            try:
+                response["parsed"] = loose_model.model_validate(json.loads(raw.content))
+            except Exception:
+                pass
+        return response
+
+    return parse
+
+
+SCHEMAS = {
+    "open": ExtractionSchema(
+        "open", description="Free-form labels chosen by the model (only case and separators are normalized)",
+    ),
+    "general": ExtractionSchema(
+        "general",
+        node_types=["Person", "Organization", "Location", "Event", "Concept"],
+        relationship_types=["WORKS_FOR", "LEADS", "FOUNDED", "OWNS", "MEMBER_OF", "PART_OF", "LOCATED_IN",
+                            "LIVES_IN", "BORN_IN", "PARENT_OF", "CHILD_OF", "SPOUSE_OF", "KNOWS",
+                            "PARTICIPATED_IN", "OCCURRED_IN", "CREATED", "RELATED_TO"],
+        description="People, organizations, places, events and concepts",
+    ),
+    "business": ExtractionSchema(
+        "business",
+        node_types=["Person", "Organization", "Product", "Location", "Event", "Money"],
+        relationship_types=["WORKS_FOR", "LEADS", "FOUNDED", "OWNS", "SUBSIDIARY_OF", "ACQUIRED", "INVESTED_IN",
+                            "PARTNERS_WITH", "COMPETES_WITH", "PRODUCES", "LOCATED_IN", "PARTICIPATED_IN",
+                            "RELATED_TO"],
+        description="Companies, people, products, deals and money",
+    ),
+    "science": ExtractionSchema(
+        "science",
+        node_types=["Person", "Organization", "Concept", "Method", "Publication", "Award", "Location"],
+        relationship_types=["AUTHORED", "AFFILIATED_WITH", "COLLABORATES_WITH", "DISCOVERED", "STUDIES", "USES",
+                            "CITES", "RECEIVED", "PART_OF", "LOCATED_IN", "RELATED_TO"],
+        description="Researchers, institutions, findings, methods and publications",
+    ),
+}
+
+
+def load_schema(path: str) -> ExtractionSchema:
+    """
+    Custom schema from a JSON file: {"name", "node_types", "relationship_types",
+    "relationship_synonyms": {canonical: [synonyms]}, "node_synonyms", "fallback_relationship"}.
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    return ExtractionSchema(
+        spec.get("name") or os.path.splitext(os.path.basename(path))[0],
+        node_types=spec.get("node_types", ()),
+        relationship_types=spec.get("relationship_types", ()),
+        relationship_synonyms=spec.get("relationship_synonyms"),
+        node_synonyms=spec.get("node_synonyms"),
+        fallback_relationship=spec.get("fallback_relationship", "RELATED_TO"),
+        description=spec.get("description", ""),
+    )
+
+
+def get_schema(name: str = None) -> ExtractionSchema:
+    """
+    Schema by preset name or JSON file path (default: KG_SCHEMA).
+    """
+    name = name or EXTRACTION_SCHEMA
+    if isinstance(name, ExtractionSchema):
+        return name
+    if name in SCHEMAS:
+        return SCHEMAS[name]
+    if name.endswith(".json") and os.path.exists(name):
+        return load_schema(name)
+    raise ValueError(f"Unknown extraction schema '{name}' (presets: {', '.join(SCHEMAS)}, or a .json file)")
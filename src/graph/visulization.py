@@ -1,145 +1,696 @@
+import json
+import gzip
+import base64
+import numpy as np
 from pyvis.network import Network
-from collections import defaultdict
+from pyvis.node import Node
+from pyvis.edge import Edge
+from src.graph.graph_store import GraphData, build_graph_data, diff_graphs, ADDED, REMOVED, CHANGED
+from src.graph.graph_query import GraphIndex
+from src.graph.schemas import ExtractionSchema
+from src.graph.layout import spectral_layout, force_layout, assign_to_hubs, ring_positions
+from src.graph.graph_viewer import COLLAPSE_CLUSTERS_JS, standalone_html
+from src.config.pipeline_con import STATIC_LAYOUT_MIN_NODES, FORCE_LAYOUT_MAX_NODES, COMPACT_HTML, COMMUNITY_TOP_MAX
+from src.utils.tracing import traced
 
-def visualize_graph(graph_documents, max_nodes=None):
+def visualize_graph(graph_documents, max_nodes=None, focus=None, hops=2, path=None, compare_to=None, **filters):
     """
     Builds a PyVis knowledge graph from one or more GraphDocument objects with enhanced visualization.
     
     Args:
-        graph_documents (list): List of GraphDocument objects.
+        graph_documents (list | GraphData): List of GraphDocument objects, or an already built graph.
         max_nodes (int, optional): If set, limits number of nodes for performance.
+        focus (str | list, optional): Render only the `hops`-hop neighborhood of these nodes.
+        hops (int): Neighborhood radius used with focus.
+        path (tuple, optional): (source, target): render only the shortest path between them.
+        compare_to (GraphData, optional): An earlier version of the graph; entities added and
+            removed since then are highlighted (see render_diff).
+        **filters: edge_types / node_types / direction, passed to the query (see GraphIndex.k_hop).
         
     Returns:
         Network: PyVis Network object.
     """
-    net = Network(
-        height="900px", width="100%", directed=True,
+    if isinstance(graph_documents, GraphData):
+        graph_data = graph_documents
+    elif not graph_documents:
+        print("No graph documents.")
+        return render_graph(None)
+    else:
+        graph_data = build_graph_data(graph_documents)
+
+    if compare_to is not None:
+        return render_diff(diff_graphs(compare_to, graph_data), max_nodes=max_nodes)
+    if focus is not None or path is not None:
+        index = GraphIndex(graph_data)
+        if path is not None:
+            graph_data = index.path_subgraph(*path, edge_types=filters.get("edge_types"),
+                                             direction=filters.get("direction", "both"))
+        else:
+            graph_data = index.neighborhood(focus, hops, **filters)
+    return render_graph(graph_data, max_nodes=max_nodes)
+
+
+class ClusteredNetwork(Network):
+    """
+    Network that collapses level-of-detail clusters on load. Nodes carrying a `cid` option are
+    folded into one node per cid; double-clicking a cluster opens it in place.
+    """
+
+    def generate_html(self, name="index.html", local=True, notebook=False):
+        html = super().generate_html(name, local, notebook)
+        return html.replace("</body>", _CLUSTER_SCRIPT + "</body>", 1)
+
+
+# Runs after pyvis' drawGraph(), where `network` is a page global
+_CLUSTER_SCRIPT = f"""
+<script type="text/javascript">
+{COLLAPSE_CLUSTERS_JS}
+collapseClusters(network);
+</script>
+"""
+
+
+class CompactNetwork(Network):
+    """
+    Network written as a compact view: nodes and edges keep only their data (id, type, degree,
+    position, cluster; endpoints and relationship type), shared styles go to vis.js groups and
+    global options, and the data is stored as gzip-compressed JSON columns that the page
+    decodes after it is shown. vis-network is loaded from local files (see graph_viewer).
+
+    Views that style single items (diffs, communities) give nodes and edges a `style` name
+    from `styles` (vis.js properties), and nodes may carry their own label, title and size,
+    edges their own title and width; these become extra columns only when used.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.edge_styles = {}
+        self.styles = {}
+
+    def view_spec(self) -> dict:
+        """
+        What a viewer needs to draw the graph: vis.js options and the compressed data columns.
+        """
+        options = self.options if isinstance(self.options, dict) else json.loads(self.options.to_json())
+        groups = list(dict.fromkeys(node["group"] for node in self.nodes))
+        group_index = {group: i for i, group in enumerate(groups)}
+        node_index = {node["id"]: i for i, node in enumerate(self.nodes)}
+        edge_types = list(dict.fromkeys(edge["label"] for edge in self.edges))
+        type_index = {label: i for i, label in enumerate(edge_types)}
+        data = {
+            "ids": [node["id"] for node in self.nodes],
+            "groups": groups,
+            "group": [group_index[node["group"]] for node in self.nodes],
+            "degree": [node["degree"] for node in self.nodes],
+            "src": [node_index[edge["from"]] for edge in self.edges],
+            "dst": [node_index[edge["to"]] for edge in self.edges],
+            "type": [type_index[edge["label"]] for edge in self.edges],
+            "edgeTypes": [dict(label=label, **self.edge_styles.get(label, {})) for label in edge_types],
+        }
+        if self.nodes and "x" in self.nodes[0]:
+            data["x"] = [node["x"] for node in self.nodes]
+            data["y"] = [node["y"] for node in self.nodes]
+        if any("cid" in node for node in self.nodes):
+            data["cid"] = [node.get("cid", -1) for node in self.nodes]
+        if self.styles:
+            style_index = {name: i for i, name in enumerate(self.styles)}
+            data["styles"] = list(self.styles.values())
+            data["nodeStyle"] = [style_index.get(node.get("style"), -1) for node in self.nodes]
+            data["edgeStyle"] = [style_index.get(edge.get("style"), -1) for edge in self.edges]
+        for key in ("label", "title", "size"):
+            if any(key in node for node in self.nodes):
+                data[key] = [node.get(key) for node in self.nodes]
+        for key, column in (("title", "edgeTitle"), ("width", "edgeWidth")):
+            if any(key in edge for edge in self.edges):
+                data[column] = [edge.get(key) for edge in self.edges]
+        raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return {
+            "height": self.height,
+            "bgcolor": self.bgcolor,
+            "options": options,
+            "data": base64.b64encode(gzip.compress(raw, 6)).decode("ascii"),
+        }
+
+    def generate_html(self, name="index.html", local=True, notebook=False):
+        return standalone_html(self.view_spec())
+
+
+def _add_node(net, node_id, **options):
+    """
+    Append a node without pyvis' add_node, whose duplicate check scans every node (O(n^2) overall).
+    Ids come from GraphData and are already unique.
+    """
+    node = Node(node_id, options.pop("shape", "dot"), label=options.pop("label", node_id),
+                font_color=net.font_color, **options)
+    net.nodes.append(node.options)
+    net.node_ids.append(node_id)
+    net.node_map[node_id] = node.options
+
+
+def _add_edge(net, source, to, **options):
+    """
+    Append an edge without pyvis' add_edge, which checks both endpoints against the node list.
+    """
+    net.edges.append(Edge(source, to, net.directed, **options).options)
+
+
+def _new_network(compact, lod=False, directed=True):
+    """
+    Empty CompactNetwork (local vis-network files), or the classic pyvis page with CDN assets.
+    """
+    if compact:
+        return CompactNetwork(height="900px", width="100%", directed=directed, bgcolor="#1e1e1e",
+                              font_color="white", notebook=False)
+    return (ClusteredNetwork if lod else Network)(
+        height="900px", width="100%", directed=directed,
         bgcolor="#1e1e1e", font_color="white",
         notebook=False, filter_menu=True, cdn_resources="remote"
     )
 
-    if not graph_documents:
-        print("No graph documents.")
-        return net
 
-    node_color_map = {
-        "Person": "#FFB347",
-        "Organization": "#87CEEB",
-        "Location": "#90EE90",
-        "Concept": "#DA70D6",
-        "Event": "#FF6F61",
-        "Default": "#D3D3D3"
-    }
+def _use_static_layout(layout, num_nodes):
+    if layout == "auto":
+        return num_nodes > STATIC_LAYOUT_MIN_NODES
+    return layout == "static"
+
+
+@traced("render")
+def render_graph(graph_data, max_nodes=None, layout="auto", lod=False, compact=None):
+    """
+    Builds a PyVis network from stored GraphData (see src.graph.graph_store).
+
+    Args:
+        graph_data (GraphData): Merged graph arrays.
+        max_nodes (int, optional): If set, limits number of nodes for performance.
+        layout (str): "physics" lets vis.js lay the graph out in the browser, "static" computes
+            positions here and disables physics, "auto" picks static above
+            STATIC_LAYOUT_MIN_NODES visible nodes.
+        lod (bool): With max_nodes, keep the nodes beyond the limit as collapsed clusters around
+            their nearest shown node (double-click to expand) instead of dropping them.
+        compact (bool, optional): Write a CompactNetwork instead of the classic pyvis page;
+            defaults to KG_COMPACT_HTML.
+
+    Returns:
+        Network: PyVis Network object.
+    """
+    if compact is None:
+        compact = COMPACT_HTML
+    net = _new_network(compact, lod)
+
+    if graph_data is None or graph_data.num_nodes == 0:
+        return net
 
-    # --- Merge nodes and edges from all documents ---
-    node_dict = {}
-    edges = []
-    for doc in graph_documents:
-        for node in doc.nodes:
-            node_dict[node.id] = node  # overwrite duplicates
-        for rel in doc.relationships:
-            edges.append(rel)
+    node_color_map = _NODE_COLORS
 
     # Compute node importance (degree)
-    degree_count = defaultdict(int)
-    for rel in edges:
-        if rel.source.id in node_dict and rel.target.id in node_dict:
-            degree_count[rel.source.id] += 1
-            degree_count[rel.target.id] += 1
+    degree_count = graph_data.degrees()
+    keep_node = np.ones(graph_data.num_nodes, dtype=bool)
+    # Cluster (index of its hub) for nodes shown only inside a collapsed cluster, -1 otherwise
+    cluster_of = np.full(graph_data.num_nodes, -1, dtype=np.int64)
+    hubs = None
 
     # Optional: limit nodes for very large graphs
-    if max_nodes:
+    if max_nodes and max_nodes < graph_data.num_nodes:
         # Keep only top nodes by degree
-        top_nodes = set(sorted(degree_count, key=degree_count.get, reverse=True)[:max_nodes])
-        edges = [e for e in edges if e.source.id in top_nodes and e.target.id in top_nodes]
-        node_dict = {nid: node_dict[nid] for nid in top_nodes}
-        degree_count = {nid: degree_count[nid] for nid in top_nodes}
+        hubs = np.argsort(-degree_count, kind="stable")[:max_nodes]
+        keep_node[:] = False
+        keep_node[hubs] = True
+        if lod:
+            cluster_of = assign_to_hubs(graph_data.num_nodes, graph_data.edge_src, graph_data.edge_dst, hubs)
+            cluster_of[keep_node] = -1
+            keep_node |= cluster_of >= 0
+    hub_node = keep_node & (cluster_of < 0)
+    keep_edge = keep_node[graph_data.edge_src] & keep_node[graph_data.edge_dst]
+
+    static = _use_static_layout(layout, int(hub_node.sum()))
+    positions = _static_positions(graph_data, hub_node, cluster_of, hubs if lod else None) if static else None
+
+    if compact:
+        _fill_compact(net, graph_data, keep_node, keep_edge, degree_count, positions, cluster_of)
+        net.options = _compact_options(net, static)
+        return net
 
     # --- Add nodes ---
     def truncate_label(label, max_len=30):
         return label if len(label) <= max_len else label[:max_len] + "..."
 
-    for node_id, node in node_dict.items():
-        importance = degree_count.get(node_id, 1)
-        net.add_node(
-            node.id,
-            label=truncate_label(node.id),
-            title=f"<b>ID:</b> {node.id}<br><b>Type:</b> {node.type}<br><b>Degree:</b> {importance}",
-            color=node_color_map.get(node.type, node_color_map["Default"]),
+    node_types = graph_data.node_type_names()
+    for idx in np.flatnonzero(keep_node):
+        node_id = graph_data.node_ids[idx]
+        node_type = node_types[idx]
+        importance = int(degree_count[idx]) or 1
+        extra = {}
+        if positions is not None:
+            extra["x"], extra["y"] = float(positions[idx, 0]), float(positions[idx, 1])
+            extra["physics"] = False
+        if cluster_of[idx] >= 0:
+            extra["cid"] = int(cluster_of[idx])
+        _add_node(
+            net,
+            node_id,
+            label=truncate_label(node_id),
+            title=f"<b>ID:</b> {node_id}<br><b>Type:</b> {node_type}<br><b>Degree:</b> {importance}",
+            color=node_color_map.get(node_type, node_color_map["Default"]),
             shape="dot",
             size=15 + min(importance * 2, 40),  # scale size
-            font={
-                "size": 18,       # slightly bigger
-                "color": "#FFFF00",  # bright yellow
-                "face": "Arial",
-                "strokeWidth": 1,
-                "strokeColor": "#000000",
-                "bold": True},  # subtle outline for readability},
-            group=node.type
+            font=_NODE_FONT,
+            group=node_type,
+            **extra
         )
 
     # --- Add edges ---
-    for rel in edges:
-        if rel.source.id in node_dict and rel.target.id in node_dict:
-            # Edge width/color based on type
-            edge_color = "#999999"
-            width = 2
-            if rel.type.lower() in ["parent", "owns", "leads"]:
-                edge_color = "#FF6F61"
-                width = 4
-            elif rel.type.lower() in ["associated", "related"]:
-                edge_color = "#87CEEB"
-                width = 3
-            net.add_edge(
-                rel.source.id,
-                rel.target.id,
-                label=rel.type.title(),
-                arrows="to",
-                color=edge_color,
-                width=width,
-                smooth={"enabled": True, "type": "dynamic"},
-                font={"color": "#FFFFFF", "size": 12}
-            )
+    for e in np.flatnonzero(keep_edge):
+        rel_type = graph_data.edge_types[graph_data.edge_type[e]]
+        style = _edge_style(rel_type)
+        edge_color = style.get("color", "#999999")
+        width = style.get("width", 2)
+        _add_edge(
+            net,
+            graph_data.node_ids[graph_data.edge_src[e]],
+            graph_data.node_ids[graph_data.edge_dst[e]],
+            label=rel_type.title(),
+            arrows="to",
+            color=edge_color,
+            width=width,
+            smooth=False if static else {"enabled": True, "type": "dynamic"},
+            font=_EDGE_FONT
+        )
+
+    if static:
+        net.set_options(_STATIC_OPTIONS)
+        return net
 
     # --- Network options ---
-    net.set_options("""
-    {
-      "layout": {
-        "improvedLayout": true
-      },
-      "nodes": {
-        "borderWidth": 1,
-        "shadow": true
-      },
-      "edges": {
-        "color": {
-          "inherit": false
-        },
-        "smooth": {
-          "enabled": true,
-          "type": "dynamic"
-        }
-      },
-      "interaction": {
-        "hover": true,
-        "navigationButtons": true,
-        "keyboard": {"enabled": true},
-        "tooltipDelay": 200
-      },
-      "physics": {
-        "enabled": true,
-        "solver": "barnesHut",
-        "barnesHut": {
-          "gravitationalConstant": -2500,
-          "centralGravity": 0.2,
-          "springLength": 200,
-          "springConstant": 0.02,
-          "damping": 0.09
-        },
-        "minVelocity": 0.75,
-        "stabilization": {"enabled": true, "iterations": 200}
-      }
-    }
-    """)
+    net.set_options(_PHYSICS_OPTIONS)
+
+    return net
+
+
+_NODE_COLORS = {
+    "Person": "#FFB347",
+    "Organization": "#87CEEB",
+    "Location": "#90EE90",
+    "Concept": "#DA70D6",
+    "Event": "#FF6F61",
+    "Product": "#F0E68C",
+    "Money": "#3CB371",
+    "Method": "#B0C4DE",
+    "Publication": "#F4A460",
+    "Award": "#FFD700",
+    "Default": "#D3D3D3"
+}
+_NODE_FONT = {
+    "size": 18,       # slightly bigger
+    "color": "#FFFF00",  # bright yellow
+    "face": "Arial",
+    "strokeWidth": 1,
+    "strokeColor": "#000000",
+    "bold": True,  # subtle outline for readability
+}
+_EDGE_FONT = {"color": "#FFFFFF", "size": 12}
+# Only the styled relationship types are allowed, so their synonyms from any schema collapse onto them
+_STYLE_SCHEMA = ExtractionSchema("style", relationship_types=["PARENT_OF", "OWNS", "LEADS", "RELATED_TO"],
+                                 fallback_relationship=None)
+
+
+def _edge_style(rel_type):
+    """
+    Color and width for relationship types drawn differently from the default grey edge.
+    Types are compared by their canonical name, so e.g. "Parent", "FATHER_OF" and "OWNER_OF" match.
+    """
+    canonical = _STYLE_SCHEMA.normalize_relationship(rel_type)
+    if canonical in ("PARENT_OF", "OWNS", "LEADS"):
+        return {"color": "#FF6F61", "width": 4}
+    if canonical == "RELATED_TO":
+        return {"color": "#87CEEB", "width": 3}
+    return {}
+
+
+# Diff views: color per change status; unchanged parts keep their usual colors, faded
+_DIFF_COLORS = {ADDED: "#2ECC71", REMOVED: "#E74C3C", CHANGED: "#F1C40F"}
+_DIFF_LABELS = {ADDED: "added", REMOVED: "removed", CHANGED: "changed"}
+
+
+@traced("render_diff")
+def render_diff(diff, max_nodes=None, changes_only=False, layout="auto", compact=None):
+    """
+    Builds a PyVis network of a GraphDiff (see src.graph.graph_store.diff_graphs): added nodes
+    and edges in green, removed ones in red (edges dashed), retyped nodes and edges whose
+    multiplicity changed in yellow, everything else faded.
+
+    Args:
+        diff (GraphDiff): Both versions of the graph with a status per node and edge.
+        max_nodes (int, optional): Node cap; changed nodes are kept first, then by degree.
+        changes_only (bool): Show only changed nodes and the endpoints of changed edges.
+        layout (str): As in render_graph.
+        compact (bool, optional): As in render_graph.
 
+    Returns:
+        Network: PyVis Network object.
+    """
+    graph_data, node_status, edge_status = diff.graph, diff.node_status, diff.edge_status
+    if compact is None:
+        compact = COMPACT_HTML
+    net = _new_network(compact)
+    if graph_data.num_nodes == 0:
+        return net
+
+    degree_count = graph_data.degrees()
+    keep_node = np.ones(graph_data.num_nodes, dtype=bool)
+    if changes_only:
+        changed_edge = edge_status != 0
+        keep_node = node_status != 0
+        keep_node[graph_data.edge_src[changed_edge]] = True
+        keep_node[graph_data.edge_dst[changed_edge]] = True
+    if max_nodes and max_nodes < keep_node.sum():
+        # Changed nodes first, then the best connected ones
+        score = np.where(keep_node, (node_status != 0) * (degree_count.max() + 1) + degree_count, -1)
+        top = np.argsort(-score, kind="stable")[:max_nodes]
+        keep_node[:] = False
+        keep_node[top] = True
+    keep_edge = keep_node[graph_data.edge_src] & keep_node[graph_data.edge_dst]
+    if changes_only:
+        keep_edge &= edge_status != 0
+
+    static = _use_static_layout(layout, int(keep_node.sum()))
+    positions = None
+    if static:
+        positions = _static_positions(graph_data, keep_node, np.full(graph_data.num_nodes, -1, dtype=np.int64))
+
+    if compact:
+        _fill_compact_diff(net, graph_data, node_status, edge_status, keep_node, keep_edge, degree_count, positions)
+        net.options = _compact_options(net, static)
+        return net
+
+    node_types = graph_data.node_type_names()
+    for idx in np.flatnonzero(keep_node):
+        node_id = graph_data.node_ids[idx]
+        node_type = node_types[idx]
+        status = int(node_status[idx])
+        importance = int(degree_count[idx]) or 1
+        extra = {}
+        if positions is not None:
+            extra["x"], extra["y"] = float(positions[idx, 0]), float(positions[idx, 1])
+            extra["physics"] = False
+        if status:
+            extra.update(color=_DIFF_COLORS[status], borderWidth=3)
+        else:
+            extra.update(color=_NODE_COLORS.get(node_type, _NODE_COLORS["Default"]), opacity=0.35)
+        _add_node(
+            net,
+            node_id,
+            label=node_id if len(node_id) <= 30 else node_id[:30] + "...",
+            title=f"<b>ID:</b> {node_id}<br><b>Type:</b> {node_type}<br>"
+                  f"<b>Status:</b> {_DIFF_LABELS.get(status, 'unchanged')}",
+            shape="dot",
+            size=15 + min(importance * 2, 40),
+            font=_NODE_FONT,
+            group=node_type,
+            **extra
+        )
+
+    for e in np.flatnonzero(keep_edge):
+        rel_type = graph_data.edge_types[graph_data.edge_type[e]]
+        status = int(edge_status[e])
+        _add_edge(
+            net,
+            graph_data.node_ids[graph_data.edge_src[e]],
+            graph_data.node_ids[graph_data.edge_dst[e]],
+            label=rel_type.title(),
+            title=_DIFF_LABELS.get(status, "unchanged"),
+            arrows="to",
+            color=_DIFF_COLORS.get(status, "#555555"),
+            width=3 if status else 1,
+            dashes=status == REMOVED,
+            smooth=False if static else {"enabled": True, "type": "dynamic"},
+            font=_EDGE_FONT
+        )
+
+    net.set_options(_STATIC_OPTIONS if static else _PHYSICS_OPTIONS)
     return net
+
+
+def _fill_compact_diff(net, graph_data, node_status, edge_status, keep_node, keep_edge, degree_count, positions):
+    """
+    CompactNetwork nodes and edges of a diff view; the change status is a per-item style.
+    """
+    for status, label in _DIFF_LABELS.items():
+        net.styles[f"node:{label}"] = {"color": _DIFF_COLORS[status], "borderWidth": 3}
+        net.styles[f"edge:{label}"] = {"color": _DIFF_COLORS[status], "width": 3, "dashes": status == REMOVED}
+    net.styles["node:unchanged"] = {"opacity": 0.35}
+    net.styles["edge:unchanged"] = {"color": "#555555", "width": 1}
+    node_types = graph_data.node_type_names()
+    for idx in np.flatnonzero(keep_node):
+        node_id, node_type = graph_data.node_ids[idx], node_types[idx]
+        status = _DIFF_LABELS.get(int(node_status[idx]), "unchanged")
+        node = {"id": node_id, "group": node_type, "degree": int(degree_count[idx]) or 1, "style": f"node:{status}",
+                "title": f"ID: {node_id}\nType: {node_type}\nStatus: {status}"}
+        if positions is not None:
+            node["x"], node["y"] = round(float(positions[idx, 0]), 1), round(float(positions[idx, 1]), 1)
+        net.nodes.append(node)
+    for e in np.flatnonzero(keep_edge):
+        status = _DIFF_LABELS.get(int(edge_status[e]), "unchanged")
+        net.edges.append({"from": graph_data.node_ids[graph_data.edge_src[e]],
+                          "to": graph_data.node_ids[graph_data.edge_dst[e]],
+                          "label": graph_data.edge_types[graph_data.edge_type[e]].title(),
+                          "title": status, "style": f"edge:{status}"})
+
+
+@traced("render_communities")
+def render_communities(hierarchy, graph_data, level=None, community=None, max_nodes=None, layout="auto",
+                       compact=None):
+    """
+    Builds a PyVis network of one level of a CommunityHierarchy (see src.graph.communities):
+    one node per community, sized by its number of entities and colored by its most common
+    type, with edges weighted by the relationships between communities.
+
+    Args:
+        hierarchy (CommunityHierarchy): Communities of graph_data.
+        graph_data (GraphData): The graph the hierarchy was computed for.
+        level (int, optional): Level to show; defaults to the top level.
+        community (int, optional): Show only what is inside this community of `level`: its
+            sub-communities (level - 1), or its entities as a regular graph view for level 0.
+        max_nodes (int, optional): Show only the largest communities (default COMMUNITY_TOP_MAX).
+        layout (str): As in render_graph.
+        compact (bool, optional): As in render_graph.
+
+    Returns:
+        Network: PyVis Network object.
+    """
+    level, shown = hierarchy.contents(level, community)
+    if level < 0:
+        return render_graph(GraphIndex(graph_data).subgraph(shown), max_nodes=max_nodes, compact=compact)
+    shown = shown[:max_nodes or COMMUNITY_TOP_MAX]
+
+    if compact is None:
+        compact = COMPACT_HTML
+    net = _new_network(compact, directed=False)
+    level_data = hierarchy.levels[level]
+    keep = np.zeros(hierarchy.count(level), dtype=bool)
+    keep[shown] = True
+    keep_edge = keep[level_data["edge_src"]] & keep[level_data["edge_dst"]]
+    static = _use_static_layout(layout, len(shown))
+    positions = None
+    if static and len(shown):
+        index = np.full(len(keep), -1, dtype=np.int64)
+        index[shown] = np.arange(len(shown))
+        local = force_layout(len(shown), index[level_data["edge_src"][keep_edge]],
+                             index[level_data["edge_dst"][keep_edge]], level_data["edge_weight"][keep_edge])
+        positions = local * 160.0 * np.sqrt(len(shown))
+
+    largest = max(int(level_data["size"][shown].max()), 1) if len(shown) else 1
+    if compact:
+        for i, c in enumerate(shown):
+            size = int(level_data["size"][c])
+            node_type = graph_data.node_types[level_data["main_type"][c]]
+            members = ", ".join(graph_data.node_ids[m] for m in level_data["key_members"][c] if m >= 0)
+            node = {"id": f"{level}:{c}", "group": node_type, "degree": size,
+                    "label": hierarchy.label(level, c, graph_data.node_ids),
+                    "title": f"Entities: {size}\nMostly: {node_type}\nKey members: {members}",
+                    "size": round(12 + 48 * float(np.sqrt(size / largest)), 1)}
+            if positions is not None:
+                node["x"], node["y"] = round(float(positions[i, 0]), 1), round(float(positions[i, 1]), 1)
+            net.nodes.append(node)
+        for e in np.flatnonzero(keep_edge):
+            weight = float(level_data["edge_weight"][e])
+            net.edges.append({"from": f"{level}:{level_data['edge_src'][e]}", "to": f"{level}:{level_data['edge_dst'][e]}",
+                              "label": "", "title": f"{weight:.0f} relationships",
+                              "width": round(1 + float(np.log1p(weight)), 2)})
+        net.options = _compact_options(net, static, arrows="")
+        net.options["edges"]["color"]["color"] = "#888888"
+        return net
+
+    for i, c in enumerate(shown):
+        size = int(level_data["size"][c])
+        node_type = graph_data.node_types[level_data["main_type"][c]]
+        members = ", ".join(graph_data.node_ids[m] for m in level_data["key_members"][c] if m >= 0)
+        extra = {}
+        if positions is not None:
+            extra["x"], extra["y"] = float(positions[i, 0]), float(positions[i, 1])
+            extra["physics"] = False
+        _add_node(
+            net,
+            f"{level}:{c}",
+            label=hierarchy.label(level, c, graph_data.node_ids),
+            title=f"<b>Entities:</b> {size}<br><b>Mostly:</b> {node_type}<br><b>Key members:</b> {members}",
+            shape="dot",
+            size=12 + 48 * np.sqrt(size / largest),
+            font=_NODE_FONT,
+            color=_NODE_COLORS.get(node_type, _NODE_COLORS["Default"]),
+            group=node_type,
+            **extra
+        )
+    for e in np.flatnonzero(keep_edge):
+        weight = float(level_data["edge_weight"][e])
+        _add_edge(
+            net,
+            f"{level}:{level_data['edge_src'][e]}",
+            f"{level}:{level_data['edge_dst'][e]}",
+            title=f"{weight:.0f} relationships",
+            width=1 + np.log1p(weight),
+            color="#888888",
+            smooth=False if static else {"enabled": True, "type": "dynamic"},
+        )
+
+    net.set_options(_STATIC_OPTIONS if static else _PHYSICS_OPTIONS)
+    return net
+
+
+def _compact_options(net, static, arrows="to"):
+    """
+    vis.js options of a CompactNetwork: shared node/edge styles and one group per node type.
+    """
+    options = json.loads(_STATIC_OPTIONS if static else _PHYSICS_OPTIONS)
+    # One group per node type carries its color (vis.js would otherwise pick palette colors)
+    options["groups"] = {t: {"color": _NODE_COLORS.get(t, _NODE_COLORS["Default"])}
+                         for t in dict.fromkeys(node["group"] for node in net.nodes)}
+    options["nodes"].update(shape="dot", font=_NODE_FONT)
+    options["edges"].update(arrows=arrows, width=2, font=_EDGE_FONT)
+    options["edges"]["color"]["color"] = "#999999"
+    return options
+
+
+def _fill_compact(net, graph_data, keep_node, keep_edge, degree_count, positions, cluster_of):
+    """
+    Data-only nodes and edges for a CompactNetwork; styles come from groups and global options.
+    """
+    node_types = graph_data.node_type_names()
+    for idx in np.flatnonzero(keep_node):
+        node_type = node_types[idx]
+        node = {"id": graph_data.node_ids[idx], "group": node_type, "degree": int(degree_count[idx]) or 1}
+        if positions is not None:
+            node["x"], node["y"] = round(float(positions[idx, 0]), 1), round(float(positions[idx, 1]), 1)
+        if cluster_of[idx] >= 0:
+            node["cid"] = int(cluster_of[idx])
+        net.nodes.append(node)
+    for e in np.flatnonzero(keep_edge):
+        rel_type = graph_data.edge_types[graph_data.edge_type[e]]
+        label = rel_type.title()
+        if label not in net.edge_styles:
+            net.edge_styles[label] = _edge_style(rel_type)
+        net.edges.append({"from": graph_data.node_ids[graph_data.edge_src[e]],
+                          "to": graph_data.node_ids[graph_data.edge_dst[e]], "label": label})
+
+
+def _static_positions(graph_data, hub_node, cluster_of, hubs=None):
+    """
+    Pixel positions for every node, computed here so the browser can skip physics.
+    Shown nodes get a force-directed layout of their induced subgraph (spectral only for very
+    large views); clustered nodes sit on a small ring beside their hub.
+    """
+    shown = np.flatnonzero(hub_node)
+    index = np.full(graph_data.num_nodes, -1, dtype=np.int64)
+    index[shown] = np.arange(len(shown))
+    src, dst = index[graph_data.edge_src], index[graph_data.edge_dst]
+    inside = (src >= 0) & (dst >= 0)
+    weight = graph_data.edge_weight[inside] if graph_data.edge_weight is not None else None
+    if len(shown) <= FORCE_LAYOUT_MAX_NODES:
+        local = force_layout(len(shown), src[inside], dst[inside], weight)
+    else:
+        local = spectral_layout(len(shown), src[inside], dst[inside], weight)
+
+    # Spread roughly 120px per node along each axis of a square canvas
+    scale = 120.0 * np.sqrt(len(shown))
+    positions = np.zeros((graph_data.num_nodes, 2))
+    positions[shown] = local * scale
+    if hubs is not None:
+        clustered = np.flatnonzero(cluster_of >= 0)
+        order = clustered[np.argsort(cluster_of[clustered], kind="stable")]
+        counts = np.bincount(cluster_of[order], minlength=len(hubs))
+        start = 0
+        for h in np.flatnonzero(counts):
+            members = order[start:start + counts[h]]
+            start += counts[h]
+            center = positions[hubs[h]] + 60.0
+            positions[members] = ring_positions(center, len(members), 20.0 + 4.0 * np.sqrt(len(members)))
+    return positions
+
+
+_PHYSICS_OPTIONS = """
+{
+  "layout": {
+    "improvedLayout": true
+  },
+  "nodes": {
+    "borderWidth": 1,
+    "shadow": true
+  },
+  "edges": {
+    "color": {
+      "inherit": false
+    },
+    "smooth": {
+      "enabled": true,
+      "type": "dynamic"
+    }
+  },
+  "interaction": {
+    "hover": true,
+    "navigationButtons": true,
+    "keyboard": {"enabled": true},
+    "tooltipDelay": 200
+  },
+  "physics": {
+    "enabled": true,
+    "solver": "barnesHut",
+    "barnesHut": {
+      "gravitationalConstant": -2500,
+      "centralGravity": 0.2,
+      "springLength": 200,
+      "springConstant": 0.02,
+      "damping": 0.09
+    },
+    "minVelocity": 0.75,
+    "stabilization": {"enabled": true, "iterations": 200}
+  }
+}
+"""
+
+_STATIC_OPTIONS = """
+{
+  "layout": {
+    "improvedLayout": false
+  },
+  "nodes": {
+    "borderWidth": 1,
+    "shadow": false
+  },
+  "edges": {
+    "color": {
+      "inherit": false
+    },
+    "smooth": false
+  },
+  "interaction": {
+    "hover": true,
+    "hideEdgesOnDrag": true,
+    "hideEdgesOnZoom": true,
+    "navigationButtons": true,
+    "keyboard": {"enabled": true},
+    "tooltipDelay": 200
+  },
+  "physics": {
+    "enabled": false
+  }
+}
+"""
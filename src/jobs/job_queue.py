@@ -0,0 +1,285 @@
+import os
+import time
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config.folder_con import DATA_DIR
+from src.config.pipeline_con import JOB_WORKERS, MAX_CONCURRENCY, PREVIEW_MAX_NODES, RENDER_MAX_NODES
+from src.graph.generate_kgraph import extract_graph_data, append_to_graph
+from src.graph.visulization import render_graph
+from src.utils.text_clean import iter_clean_paragraphs
+from src.utils.ingest import iter_lines
+from src.utils.file_op import save_graph, discard_graph_html, ensure_graph_html, file_already_exist
+from src.model.model_info import get_model_lifecycle
+from src.utils.tracing import get_tracer
+
+
+JOBS_PATH = os.path.join(DATA_DIR, "jobs.sqlite")
+SPOOL_DIR = os.path.join(DATA_DIR, "jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Minimum seconds between progress writes to the job table
+_PROGRESS_INTERVAL = 0.5
+
+_COLUMNS = (
+    "id", "kind", "graph_name", "document_id", "model", "status", "chunks_done", "chunks_total",
+    "chunks_expected", "chunks_failed", "eta", "error", "created", "started", "finished", "lineage",
+)
+
+
+def _has_result(record) -> bool:
+    """
+    Whether a done job can be reused: its graph is still stored and at least one chunk was extracted.
+    """
+    return file_already_exist(record["graph_name"]) and (record["chunks_failed"] or 0) < (record["chunks_total"] or 0)
+
+
+def job_id(kind: str, graph_name: str, document_id: str = None) -> str:
+    """
+    Deduplication key: the same document submitted for the same target graph is one job.
+    """
+    return f"{kind}:{graph_name}" + (f":{document_id}" if document_id else "")
+
+
+class JobQueue:
+    """
+    Graph generation jobs run on a bounded thread pool shared by every Streamlit session
+    in the process, outside the script thread, so reruns never abort an extraction.
+
+    Jobs are recorded in a SQLite table with their progress. Inputs are spooled to
+    DATA_DIR/jobs/ first, so jobs left queued or running by a stopped process are resumed
+    on the next start (finished chunks come back from the chunk cache).
+    """
+
+    def __init__(self, path=JOBS_PATH, max_workers=JOB_WORKERS):
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+        self.max_workers = max(1, max_workers)
+        # Ollama slots are split between jobs instead of multiplied by the number of workers
+        self.chunk_concurrency = max(1, MAX_CONCURRENCY // self.max_workers)
+        self._lock = threading.Lock()
+        self._graph_locks = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " graph_name TEXT NOT NULL,"
+            " document_id TEXT,"
+            " model TEXT,"
+            " status TEXT NOT NULL,"
+            " chunks_done INTEGER DEFAULT 0,"
+            " chunks_total INTEGER DEFAULT 0,"
+            " chunks_expected INTEGER,"
+            " chunks_failed INTEGER DEFAULT 0,"
+            " eta REAL,"
+            " error TEXT,"
+            " created REAL NOT NULL,"
+            " started REAL,"
+            " finished REAL,"
+            " lineage TEXT)"
+        )
+        # Job tables created before graphs were versioned
+        if "lineage" not in {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lineage TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="kg-job")
+        self._resume()
+
+    def _spool_path(self, job):
+        return os.path.join(SPOOL_DIR, job.replace(":", "_") + ".txt")
+
+    def preview_path(self, job):
+        """
+        HTML view of the partial graph of a running job (exists once its first chunk finished).
+        """
+        return os.path.join(SPOOL_DIR, job.replace(":", "_") + ".preview.html")
+
+    def _update(self, job, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job))
+            self._conn.commit()
+
+    def submit(self, kind: str, graph_name: str, model: str, text: str = None, source=None,
+               document_id: str = None, lineage: str = None) -> str:
+        """
+        Queue a job and return its id. kind is "generate" (new graph stored as graph_name) or
+        "append" (merge the document into graph_name). A job already queued, running or done
+        for the same input is returned as is; a failed one is retried, and so is a done one whose
+        graph is no longer stored or that extracted no chunk. lineage stores a generated graph as the next version of that
+        document (see save_graph).
+        """
+        if kind not in ("generate", "append"):
+            raise ValueError(f"Unknown job kind '{kind}'")
+        job = job_id(kind, graph_name, document_id)
+        # Checked and claimed in one step, so an identical submit in the meantime joins this job
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job,)).fetchone()
+            existing = dict(zip(_COLUMNS, row)) if row else None
+            if existing is not None and existing["status"] != FAILED:
+                if existing["status"] != DONE or _has_result(existing):
+                    return job
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, graph_name, document_id, model, status, created, lineage)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job, kind, graph_name, document_id, model, QUEUED, time.time(), lineage),
+            )
+            self._conn.commit()
+
+        spool = self._spool_path(job)
+        try:
+            if text is not None:
+                with open(spool, "w", encoding="utf-8") as f:
+                    f.write(text)
+            else:
+                _copy_source(source, spool)
+        except Exception as e:
+            self._update(job, status=FAILED, finished=time.time(), error=str(e))
+            raise
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job: str):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def active(self):
+        """
+        Queued and running jobs, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status IN (?, ?) ORDER BY created",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def _resume(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created", (QUEUED, RUNNING)
+            ).fetchall()
+        for (job,) in rows:
+            if os.path.exists(self._spool_path(job)):
+                self._update(job, status=QUEUED)
+                self._executor.submit(self._run, job)
+            else:
+                self._update(job, status=FAILED, error="Input lost before the job ran", finished=time.time())
+
+    def _graph_lock(self, graph_name):
+        # Appends to one graph load, merge and save it, so they must not overlap
+        with self._lock:
+            return self._graph_locks.setdefault(graph_name, threading.Lock())
+
+    def _run(self, job):
+        record = self.get(job)
+        # A job stays queued while other jobs use every model slot Ollama has (see ModelLifecycle)
+        with get_model_lifecycle().use(record["model"]):
+            self._execute(job, record)
+
+    def _execute(self, job, record):
+        spool = self._spool_path(job)
+        self._update(job, status=RUNNING, started=time.time(), chunks_done=0, chunks_total=0,
+                     chunks_failed=0, eta=None, error=None)
+        last_write = 0.0
+        last_stats = None
+        # Time to first chunk as the user sees it: extractor setup and model load included
+        started = time.perf_counter()
+        first_chunk = False
+
+        def on_progress(stats):
+            nonlocal last_write, last_stats, first_chunk
+            last_stats = stats
+            if not first_chunk and stats.chunks_ok:
+                first_chunk = True
+                get_tracer().record("job_first_chunk", time.perf_counter() - started, model=record["model"])
+            now = time.monotonic()
+            if now - last_write < _PROGRESS_INTERVAL:
+                return
+            last_write = now
+            self._update(job, chunks_done=stats.chunks_done, chunks_total=stats.chunks_total,
+                         chunks_expected=stats.chunks_expected, chunks_failed=stats.chunks_failed,
+                         eta=stats.eta)
+
+        def on_snapshot(graph_data, stats):
+            # Rendered on the extraction loop between chunks; capped so it stays a few milliseconds
+            preview = self.preview_path(job)
+            html = render_graph(graph_data, max_nodes=PREVIEW_MAX_NODES).generate_html()
+            with open(preview + ".tmp", "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(preview + ".tmp", preview)
+
+        try:
+            size_hint = os.path.getsize(spool)
+            with self._graph_lock(record["graph_name"]):
+                if record["kind"] == "append":
+                    append_to_graph(
+                        record["graph_name"], source=spool, selected_model=record["model"],
+                        document_id=record["document_id"], max_concurrency=self.chunk_concurrency,
+                        on_progress=on_progress, size_hint=size_hint, on_snapshot=on_snapshot,
+                    )
+                else:
+                    paragraphs = iter_clean_paragraphs(iter_lines(spool))
+                    graph_data = extract_graph_data(
+                        paragraphs, record["model"], self.chunk_concurrency,
+                        on_progress=on_progress, size_hint=size_hint, on_snapshot=on_snapshot,
+                    )
+                    save_graph(graph_data, record["graph_name"], lineage=record["lineage"])
+                    discard_graph_html(record["graph_name"])
+                    # The default view is rendered from the merged graph still in memory
+                    ensure_graph_html(f"{record['graph_name']}.html", RENDER_MAX_NODES, graph_data=graph_data)
+            fields = dict(status=DONE, finished=time.time(), eta=0.0)
+            if last_stats is not None:
+                fields.update(chunks_done=last_stats.chunks_done, chunks_total=last_stats.chunks_total,
+                              chunks_failed=last_stats.chunks_failed)
+        except Exception as e:
+            print(f"[Job Error] {job}: {e}")
+            get_tracer().count("jobs_failed", kind=record["kind"])
+            fields = dict(status=FAILED, finished=time.time(), error=str(e))
+        finally:
+            get_tracer().flush()
+            for path in (spool, self.preview_path(job)):
+                if os.path.exists(path):
+                    os.remove(path)
+        # Only once the input is gone: a finished job can be submitted again, with a new spool file
+        self._update(job, **fields)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._conn.close()
+
+
+def _copy_source(source, path):
+    """
+    Copy a file path or binary stream (e.g. a Streamlit upload) to path without decoding it.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        shutil.copyfile(source, path)
+        return
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(source, f)
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+_shared_queue = None
+_shared_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Process-wide job queue; Streamlit sessions in one server process share its worker pool.
+    """
+    global _shared_queue
+    if _shared_queue is None:
+        with _shared_lock:
+            if _shared_queue is None:
+                _shared_queue = JobQueue()
+    return _shared_queue
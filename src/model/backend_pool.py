@@ -0,0 +1,231 @@
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+import httpx
+from ollama import Client
+from src.config.pipeline_con import (
+    OLLAMA_HOSTS, OLLAMA_CONNECT_TIMEOUT, BACKEND_HEALTH_INTERVAL, BACKEND_FAILURE_THRESHOLD, BACKEND_COOLDOWN
+)
+from src.model.model_info import _model_names
+from src.utils.tracing import get_tracer
+
+# Circuit breaker states
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class NoBackendAvailable(RuntimeError):
+    """
+    No host is reachable, serves the model and accepts requests (circuit closed or on trial).
+    """
+
+
+class Backend:
+    """
+    One Ollama host: requests in flight, circuit state and the models found by the last health check.
+    """
+
+    def __init__(self, host: str, connect_timeout: float = OLLAMA_CONNECT_TIMEOUT):
+        self.host = host
+        self.client = Client(host=host, timeout=httpx.Timeout(connect_timeout * 4, connect=connect_timeout))
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.trial = False
+        self.busy_seconds = 0.0
+        # None until the first health check
+        self.healthy = None
+        self.models = set()
+        self.error = None
+        self.checked_at = None
+
+    def serves(self, model: str) -> bool:
+        return not self.models.isdisjoint(_model_names(model))
+
+    def status(self) -> dict:
+        return {
+            "host": self.host, "healthy": self.healthy, "circuit": self.state, "outstanding": self.outstanding,
+            "requests": self.requests, "failures": self.failures, "busy_s": round(self.busy_seconds, 1),
+            "models": len(self.models), "error": self.error,
+        }
+
+
+class BackendPool:
+    """
+    Spreads LLM requests over several Ollama hosts.
+
+    A request goes to the host with the fewest requests in flight among those that passed the
+    last health check, list the model and accept requests; ties go to the host that served
+    fewer. After `failure_threshold` consecutive failed requests a host's circuit opens and it
+    gets no traffic for `cooldown` seconds; then one trial request is let through (half-open),
+    which closes the circuit on success and reopens it on failure. Health checks (the host's
+    model list) run when a request finds the last one older than `check_interval` seconds:
+    the first one is awaited, later ones refresh in a background thread.
+    """
+
+    def __init__(self, hosts=OLLAMA_HOSTS, check_interval: float = BACKEND_HEALTH_INTERVAL,
+                 failure_threshold: int = BACKEND_FAILURE_THRESHOLD, cooldown: float = BACKEND_COOLDOWN,
+                 connect_timeout: float = OLLAMA_CONNECT_TIMEOUT):
+        if not hosts:
+            raise ValueError("At least one Ollama host is required")
+        self.backends = [Backend(host, connect_timeout) for host in hosts]
+        self.check_interval = check_interval
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.tracer = get_tracer()
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._checked_at = None
+
+    # -------------------
+    # Health checks
+    # -------------------
+    def check(self):
+        """
+        Check every host now: reachable, and which models it serves.
+        """
+        with self._check_lock:
+            self._check_all()
+
+    def _check_all(self):
+        for backend in self.backends:
+            try:
+                models = {model["model"] for model in backend.client.list()["models"]}
+                error = None
+            except Exception as e:
+                models, error = set(), f"{type(e).__name__}: {e}"
+            with self._lock:
+                was_healthy = backend.healthy
+                backend.healthy = error is None
+                backend.models = models
+                backend.error = error
+                backend.checked_at = time.time()
+            if was_healthy is not False and error is not None:
+                print(f"[Warning] Ollama host {backend.host} failed its health check: {error}")
+        self._checked_at = time.monotonic()
+
+    def _stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def _check_if_stale(self):
+        with self._check_lock:
+            if self._stale():
+                self._check_all()
+
+    async def _refresh(self):
+        if not self._stale():
+            return
+        if self._checked_at is None:
+            await asyncio.to_thread(self._check_if_stale)
+        elif not self._check_lock.locked():
+            threading.Thread(target=self._check_if_stale, daemon=True).start()
+
+    # -------------------
+    # Scheduling
+    # -------------------
+    def acquire(self, model: str, avoid=()):
+        """
+        Reserve the least loaded host able to serve `model`, other than the hosts in `avoid`
+        (e.g. where a retried request already failed) unless no other host can take it.
+        Returns (backend, trial), trial being True for the one request let through a
+        half-open circuit; pair with release().
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for backend in self.backends:
+                if not backend.healthy or not backend.serves(model):
+                    continue
+                if backend.state == OPEN and now - backend.opened_at >= self.cooldown:
+                    backend.state = HALF_OPEN
+                if backend.state == OPEN or (backend.state == HALF_OPEN and backend.trial):
+                    continue
+                candidates.append(backend)
+            if not candidates:
+                raise NoBackendAvailable(self._unavailable_reason(model))
+            candidates = [b for b in candidates if b.host not in avoid] or candidates
+            backend = min(candidates, key=lambda b: (b.outstanding, b.requests))
+            trial = backend.state == HALF_OPEN
+            backend.trial = backend.trial or trial
+            backend.outstanding += 1
+            backend.requests += 1
+        return backend, trial
+
+    def release(self, backend: Backend, ok: bool = True, seconds: float = 0.0, trial: bool = False):
+        """
+        Return a host reserved by acquire(); ok=None for requests that were cancelled.
+        """
+        opened = False
+        with self._lock:
+            backend.outstanding -= 1
+            backend.busy_seconds += seconds
+            if trial:
+                backend.trial = False
+            if ok:
+                backend.consecutive_failures = 0
+                backend.state = CLOSED
+            elif ok is not None:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.state != OPEN and (trial or backend.consecutive_failures >= self.failure_threshold):
+                    backend.state = OPEN
+                    backend.opened_at = time.monotonic()
+                    opened = True
+        self.tracer.count("backend_requests", host=backend.host)
+        if ok is False:
+            self.tracer.count("backend_failures", host=backend.host)
+        if opened:
+            self.tracer.count("backend_circuit_opened", host=backend.host)
+            print(f"[Warning] Ollama host {backend.host} disabled for {self.cooldown:.0f}s after "
+                  f"{backend.consecutive_failures} failed requests")
+
+    def _unavailable_reason(self, model: str) -> str:
+        hosts = ", ".join(b.host for b in self.backends)
+        if not any(b.healthy for b in self.backends):
+            return f"No Ollama host reachable ({hosts})"
+        if not any(b.healthy and b.serves(model) for b in self.backends):
+            return f"Model '{model}' is not available on any reachable Ollama host ({hosts})"
+        return f"All Ollama hosts serving '{model}' are failing; retrying after {self.cooldown:.0f}s"
+
+    @asynccontextmanager
+    async def lease(self, model: str, avoid=()):
+        """
+        async with pool.lease(model) as backend: run one request on backend.host.
+        Exceptions raised inside count as failures of that host.
+        """
+        await self._refresh()
+        backend, trial = self.acquire(model, avoid)
+        start = time.perf_counter()
+        ok = None
+        try:
+            yield backend
+            ok = True
+        except Exception:
+            ok = False
+            raise
+        finally:
+            self.release(backend, ok, time.perf_counter() - start, trial)
+
+    def status(self) -> list:
+        with self._lock:
+            return [backend.status() for backend in self.backends]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_backend_pool() -> BackendPool:
+    """
+    Process-wide pool over OLLAMA_HOSTS, shared by every extractor so load and circuit
+    state are tracked across documents and jobs.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BackendPool()
+    return _pool
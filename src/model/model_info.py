@@ -1,43 +1,308 @@
 from ollama import Client
-import os
+import time
+import threading
+from contextlib import contextmanager
+import httpx
+from src.config.pipeline_con import (
+    MODEL_INFO_TTL, OLLAMA_CONNECT_TIMEOUT, OLLAMA_HOSTS, MODEL_KEEP_ALIVE, MAX_LOADED_MODELS
+)
+from src.utils.tracing import get_tracer
 
-# Connect to Ollama inside Docker
-host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-client = Client(host=host)
+# Connect to Ollama inside Docker (the first host when extraction is spread over several)
+host = OLLAMA_HOSTS[0]
 
+_client = None
+_client_lock = threading.Lock()
 
-def get_ollama_models():
+
+def get_client() -> Client:
+    """
+    Process-wide Ollama client. Its httpx connection pool is reused across Streamlit reruns
+    and threads; only connecting is time-limited so an unreachable server fails fast while
+    slow generations are not cut off.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = Client(host=host, timeout=httpx.Timeout(None, connect=OLLAMA_CONNECT_TIMEOUT))
+    return _client
+
+
+class ModelMetadataCache:
+    """
+    Model list, digests and context lengths from Ollama, kept for `ttl` seconds.
+    A context length is reused as long as the model's digest is unchanged, so a re-pulled
+    model is looked up again. When Ollama is unreachable, the last known values are served.
+    """
+
+    def __init__(self, ttl: float = MODEL_INFO_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._digests = {}
+        self._listed_at = None
+        self._context = {}
+
+    def _refresh_models(self):
+        models = get_client().list()
+        digests = {model['model']: model['digest'] for model in models['models']}
+        with self._lock:
+            self._digests = digests
+            self._listed_at = time.monotonic()
+
+    def _fresh(self) -> bool:
+        return self._listed_at is not None and time.monotonic() - self._listed_at < self.ttl
+
+    def models(self, refresh: bool = False) -> list:
+        if refresh or not self._fresh():
+            try:
+                self._refresh_models()
+            except Exception as e:
+                if self._listed_at is None:
+                    raise
+                print(f"[Warning] Ollama unreachable ({e}), using cached model list")
+        return list(self._digests)
+
+    def digest(self, model: str):
+        return self._digests.get(model)
+
+    def context_length(self, model: str):
+        try:
+            self.models()
+        except Exception as e:
+            print(f"[Warning] Could not list Ollama models: {e}")
+        digest = self._digests.get(model)
+        entry = self._context.get(model)
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+        try:
+            context_length = _fetch_context_length(model)
+        except Exception:
+            # The value cached for an older digest is still better than none
+            if entry is not None:
+                return entry[1]
+            raise
+        with self._lock:
+            self._context[model] = (digest, context_length)
+        return context_length
+
+    def clear(self):
+        with self._lock:
+            self._digests = {}
+            self._listed_at = None
+            self._context = {}
+
+
+_metadata = ModelMetadataCache()
+
+
+def get_model_metadata() -> ModelMetadataCache:
+    return _metadata
+
+
+def get_ollama_models(refresh: bool = False):
+    """
+    Installed model names, cached for MODEL_INFO_TTL seconds. Returns the last known list
+    (or an empty one) instead of raising when Ollama is unreachable.
+    """
     try:
-        models = client.list()
-        model_names = [model['model'] for model in models['models']]
-        return model_names 
+        return _metadata.models(refresh)
     except Exception as e:
         print(f"Error : {e}")
-        raise
+        return []
+
+
+def _fetch_context_length(model: str):
+    info = get_client().show(model)
+    details = info.get("modelinfo", {})
+    family = info.get("details", {}).get("family", "")
+
+    # try exact key first
+    context_search_key = f"{family}.context_length"
+    context_length = details.get(context_search_key)
+
+    # fallback: first key ending with 'context_length'
+    if context_length is None:
+        for k, v in details.items():
+            if k.endswith("context_length"):
+                context_length = v
+                break
+
+    if context_length is None:
+        raise ValueError(f"No context_length found for model '{model}'")
+
+    return context_length
+
 
 def get_context_length(model: str):
+    """
+    Context length of `model`, looked up once per model digest.
+    """
     try:
-        info = client.show(model)
-        details = info.get("modelinfo", {})
-        family = info.get("details", {}).get("family", "")
-        
-        # try exact key first
-        context_search_key = f"{family}.context_length"
-        context_length = details.get(context_search_key)
-        
-        # fallback: first key ending with 'context_length'
-        if context_length is None:
-            for k, v in details.items():
-                if k.endswith("context_length"):
-                    context_length = v
-                    break
-        
-        if context_length is None:
-            raise ValueError(f"No context_length found for model '{model}'")
-        
-        return context_length
-    
+        return _metadata.context_length(model)
     except Exception as e:
         print(f"Error retrieving context_length for '{model}': {e}")
         raise
 
+
+def count_prompt_tokens(model: str, text: str) -> int:
+    """
+    Number of tokens the model's own tokenizer produces for `text`,
+    read from Ollama's prompt_eval_count (raw prompt, one generated token).
+    """
+    try:
+        # Every request sets how long the model stays loaded; without keep_alive it is Ollama's default
+        response = get_client().generate(model=model, prompt=text, raw=True, options={"num_predict": 1},
+                                         keep_alive=MODEL_KEEP_ALIVE)
+        return response["prompt_eval_count"]
+    except Exception as e:
+        print(f"Error counting tokens for '{model}': {e}")
+        raise
+
+
+def _model_names(model: str) -> set:
+    # Ollama lists untagged models as "<name>:latest"
+    return {model} if ":" in model else {model, f"{model}:latest"}
+
+
+# Seconds the list of loaded models (Ollama's ps) is reused
+RESIDENT_TTL = 5.0
+
+
+class ModelLifecycle:
+    """
+    Keeps the models extraction needs loaded in Ollama.
+
+    preload(model) loads a model on every host in a background thread (an empty generate
+    request) with an explicit keep_alive, so the first chunk of the next document does not
+    wait for the load. resident() lists the loaded models per host (Ollama's ps). Jobs hold
+    their model with use(model): while `max_loaded` different models are in use, a job needing
+    another one waits for them to finish instead of making Ollama swap models under a running
+    job; starting a model that is not loaded while the hosts hold `max_loaded` others is
+    counted as a swap.
+    """
+
+    def __init__(self, hosts=OLLAMA_HOSTS, keep_alive=MODEL_KEEP_ALIVE, max_loaded: int = MAX_LOADED_MODELS):
+        self.hosts = list(hosts)
+        self.keep_alive = keep_alive
+        self.max_loaded = max(1, max_loaded)
+        self.tracer = get_tracer()
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._in_use = {}
+        self._released = threading.Condition(self._lock)
+        self._preloading = set()
+        self._resident = []
+        self._resident_at = None
+
+    def _client(self, url) -> Client:
+        if url == host:
+            return get_client()
+        with self._lock:
+            if url not in self._clients:
+                self._clients[url] = Client(host=url, timeout=httpx.Timeout(None, connect=OLLAMA_CONNECT_TIMEOUT))
+            return self._clients[url]
+
+    # -------------------
+    # Residency
+    # -------------------
+    def resident(self, refresh: bool = False) -> list:
+        """
+        Loaded models as dicts (host, model, vram_gb, expires_at), from every reachable host.
+        """
+        if refresh or self._resident_at is None or time.monotonic() - self._resident_at >= RESIDENT_TTL:
+            loaded = []
+            for host in self.hosts:
+                try:
+                    models = self._client(host).ps()["models"]
+                except Exception:
+                    continue
+                loaded.extend({"host": host, "model": m["model"], "vram_gb": round((m["size_vram"] or 0) / 2 ** 30, 1),
+                               "expires_at": m["expires_at"]} for m in models)
+            self._resident, self._resident_at = loaded, time.monotonic()
+        return self._resident
+
+    def is_resident(self, model: str) -> bool:
+        names = _model_names(model)
+        return any(entry["model"] in names for entry in self.resident())
+
+    def preload(self, model: str) -> bool:
+        """
+        Load `model` on every host in the background. Returns False if a preload of it is
+        already running.
+        """
+        with self._lock:
+            if not model or model in self._preloading:
+                return False
+            self._preloading.add(model)
+        threading.Thread(target=self._preload, args=(model,), daemon=True).start()
+        return True
+
+    def _preload(self, model):
+        start = time.perf_counter()
+        try:
+            for host in self.hosts:
+                try:
+                    self._client(host).generate(model=model, prompt="", keep_alive=self.keep_alive)
+                except Exception as e:
+                    print(f"[Warning] Could not preload '{model}' on {host}: {e}")
+        finally:
+            with self._lock:
+                self._preloading.discard(model)
+            self._resident_at = None
+        self.tracer.record("model_preload", time.perf_counter() - start, model=model)
+
+    # -------------------
+    # Jobs
+    # -------------------
+    def _fits(self, model: str) -> bool:
+        return model in self._in_use or len(self._in_use) < self.max_loaded
+
+    def conflicts(self, model: str) -> list:
+        """
+        Models in use that a job with `model` would have to wait for (empty if it can start).
+        """
+        with self._lock:
+            return [] if self._fits(model) else sorted(self._in_use)
+
+    @contextmanager
+    def use(self, model: str):
+        """
+        with lifecycle.use(model): run one job's extraction, after waiting for a free model slot.
+        """
+        with self._released:
+            if not self._fits(model):
+                print(f"[Warning] '{model}' waits for jobs on {', '.join(sorted(self._in_use))} to finish "
+                      f"(KG_MAX_LOADED_MODELS={self.max_loaded})")
+                self.tracer.count("model_swap_waits", model=model)
+                self._released.wait_for(lambda: self._fits(model))
+            self._in_use[model] = self._in_use.get(model, 0) + 1
+        try:
+            others = {entry["model"] for entry in self.resident(refresh=True)} - _model_names(model)
+            if len(others) >= self.max_loaded and not self.is_resident(model):
+                print(f"[Warning] Loading '{model}' while {', '.join(sorted(others))} is loaded; "
+                      f"Ollama may unload it")
+                self.tracer.count("model_swaps", model=model)
+            yield
+        finally:
+            with self._released:
+                self._in_use[model] -= 1
+                if not self._in_use[model]:
+                    del self._in_use[model]
+                self._released.notify_all()
+
+
+_lifecycle = None
+_lifecycle_lock = threading.Lock()
+
+
+def get_model_lifecycle() -> ModelLifecycle:
+    """
+    Process-wide model lifecycle over OLLAMA_HOSTS, shared by the app, jobs and extractors.
+    """
+    global _lifecycle
+    if _lifecycle is None:
+        with _lifecycle_lock:
+            if _lifecycle is None:
+                _lifecycle = ModelLifecycle()
+    return _lifecycle
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from langchain_community.graphs.graph_document import GraphDocument, Node, Relationship
+from src.config.folder_con import DATA_DIR
+from src.config.pipeline_con import CHUNK_CACHE_MAX_MB
+
+
+CACHE_PATH = os.path.join(DATA_DIR, "chunk_cache.sqlite")
+
+
+def chunk_key(chunk: str, model: str, settings: dict) -> str:
+    """
+    Content address of one chunk extraction: cleaned chunk text + model + extraction settings.
+    """
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    h.update(b"\0")
+    h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _node_to_dict(node):
+    return {"id": node.id, "type": node.type, "properties": node.properties or {}}
+
+
+def _graph_doc_to_payload(graph_doc) -> bytes:
+    data = {
+        "nodes": [_node_to_dict(n) for n in graph_doc.nodes],
+        "relationships": [
+            {
+                "source": _node_to_dict(r.source),
+                "target": _node_to_dict(r.target),
+                "type": r.type,
+                "properties": r.properties or {},
+            }
+            for r in graph_doc.relationships
+        ],
+    }
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+
+def _payload_to_graph_doc(payload: bytes, document) -> GraphDocument:
+    data = json.loads(zlib.decompress(payload))
+    return GraphDocument(
+        nodes=[Node(**n) for n in data["nodes"]],
+        relationships=[
+            Relationship(
+                source=Node(**r["source"]),
+                target=Node(**r["target"]),
+                type=r["type"],
+                properties=r["properties"],
+            )
+            for r in data["relationships"]
+        ],
+        source=document,
+    )
+
+
+class ChunkCache:
+    """
+    Persistent SQLite store of per-chunk extraction results with size-bounded LRU eviction.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=int(CHUNK_CACHE_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " payload BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_last_used ON chunks(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM chunks").fetchone()[0]
+
+    def get(self, key, document):
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE chunks SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return _payload_to_graph_doc(row[0], document)
+
+    def put(self, key, model, graph_doc):
+        payload = _graph_doc_to_payload(graph_doc)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM chunks WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunks (key, model, payload, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, payload, len(payload), time.time()),
+            )
+            self._total_bytes += len(payload)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the store fits in max_bytes.
+        """
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM chunks ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM chunks WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self):
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+            f"{self.evictions} evictions, {self._total_bytes / 1024 / 1024:.1f} MB stored"
+        )
+
+    def close(self):
+        self._conn.close()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_chunk_cache() -> ChunkCache:
+    """
+    Process-wide chunk cache, opened on first use. Extractors built on concurrent job threads
+    must share one connection and one set of hit/miss counters.
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = ChunkCache()
+    return _shared_cache
+
+
+def cached_extract(extract, cache: ChunkCache, model: str, settings: dict):
+    """
+    Wrap a chunk extraction coroutine so only uncached chunks reach the LLM.
+    """
+    async def _extract(doc):
+        key = chunk_key(doc.page_content, model, settings)
+        graph_doc = cache.get(key, doc)
+        if graph_doc is not None:
+            return graph_doc
+        graph_doc = await extract(doc)
+        # Empty results are usually parse failures; leave them uncached so they get retried
+        if graph_doc.nodes or graph_doc.relationships:
+            cache.put(key, model, graph_doc)
+        return graph_doc
+
+    return _extract
@@ -0,0 +1,73 @@
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+SEPARATORS = ["\n\n", "\n", ".", " "]
+
+
+def compute_chunk_budget(num_ctx: int, prompt_tokens: int, output_ratio: float = 0.75,
+                         safety_factor: float = 0.9) -> int:
+    """
+    Largest chunk (in tokens) that fits the context window together with the
+    extraction prompt and the JSON output it is expected to produce.
+
+        prompt_tokens + chunk + output_ratio * chunk <= safety_factor * num_ctx
+    """
+    available = int(num_ctx * safety_factor) - prompt_tokens
+    chunk_tokens = int(available / (1 + output_ratio))
+    if chunk_tokens < 64:
+        raise ValueError(
+            f"Context window of {num_ctx} tokens leaves no room for text after a "
+            f"{prompt_tokens}-token extraction prompt"
+        )
+    return chunk_tokens
+
+
+def make_splitter(chunk_tokens: int, count_tokens, overlap_ratio: float = 0.05, max_overlap: int = 64):
+    """
+    Recursive splitter measuring chunk length in model tokens instead of characters.
+    """
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_tokens,
+        chunk_overlap=min(int(chunk_tokens * overlap_ratio), max_overlap),
+        length_function=count_tokens,
+        separators=SEPARATORS,
+    )
+
+
+def split_text(text: str, chunk_tokens: int, count_tokens):
+    """
+    Split text into chunks of at most chunk_tokens tokens; text that fits is returned whole.
+    """
+    if count_tokens(text) <= chunk_tokens:
+        return [text]
+    return make_splitter(chunk_tokens, count_tokens).split_text(text)
+
+
+def iter_chunks(paragraphs, chunk_tokens: int, count_tokens, buffer_chunks: int = 4):
+    """
+    Lazily chunk a stream of paragraphs.
+
+    Paragraphs are buffered until about `buffer_chunks` chunks worth of tokens are
+    available; the buffer is split and every chunk except the last is yielded. The last
+    one is carried into the next buffer so chunk boundaries do not depend on where
+    the stream was cut. Memory stays bounded by a few chunks.
+    """
+    splitter = make_splitter(chunk_tokens, count_tokens)
+    buffer = []
+    buffered_tokens = 0
+
+    for paragraph in paragraphs:
+        buffer.append(paragraph)
+        buffered_tokens += count_tokens(paragraph)
+        if buffered_tokens < chunk_tokens * buffer_chunks:
+            continue
+        chunks = splitter.split_text("\n\n".join(buffer))
+        yield from chunks[:-1]
+        buffer = chunks[-1:]
+        buffered_tokens = count_tokens(buffer[0]) if buffer else 0
+
+    if buffer:
+        text = "\n\n".join(buffer)
+        if count_tokens(text) <= chunk_tokens:
+            yield text
+        else:
+            yield from splitter.split_text(text)
@@ -0,0 +1,157 @@
+import re
+import hashlib
+import numpy as np
+
+_WORD_RE = re.compile(r"\w+")
+
+# Four 16-bit bands: fingerprints within 3 bits of each other share at least one band
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """
+    64-bit SimHash over word shingles (lowercased): texts that share most of their shingles
+    get fingerprints a few bits apart, whatever the whitespace or casing.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= shingle:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    hashes = np.fromiter((_hash64(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes, bitorder="little").tobytes(), "little")
+
+
+class DedupStats:
+    """
+    What the dedup stage removed from one document.
+    """
+
+    def __init__(self):
+        self.paragraphs_dropped = 0
+        self.chunks_skipped = 0
+        self.relationships_dropped = 0
+
+    @property
+    def calls_saved(self):
+        return self.chunks_skipped
+
+    def summary(self):
+        return (
+            f"{self.paragraphs_dropped} repeated paragraphs dropped, {self.chunks_skipped} near-duplicate "
+            f"chunks skipped ({self.calls_saved} LLM calls saved), {self.relationships_dropped} overlap "
+            f"relationships merged"
+        )
+
+
+class ChunkDeduper:
+    """
+    Pre-extraction dedup for one document.
+
+    Paragraphs repeated verbatim (boilerplate, running headers) are dropped before chunking,
+    and chunks whose SimHash is within max_distance bits of an earlier chunk are skipped, since
+    their entities and relationships were already extracted. Fingerprints are indexed by band
+    so each lookup only compares against chunks sharing a band.
+    """
+
+    def __init__(self, max_distance: int = 3, stats: DedupStats = None):
+        if max_distance >= _BANDS:
+            raise ValueError(f"max_distance must be below {_BANDS} for {_BANDS}-band lookup")
+        self.max_distance = max_distance
+        self.stats = stats or DedupStats()
+        self._paragraphs = set()
+        self._bands = [{} for _ in range(_BANDS)]
+
+    def paragraphs(self, paragraphs):
+        """
+        Yield paragraphs, dropping exact repeats (compared case- and whitespace-insensitively).
+        """
+        for paragraph in paragraphs:
+            key = _hash64(" ".join(_WORD_RE.findall(paragraph.lower())))
+            if key in self._paragraphs:
+                self.stats.paragraphs_dropped += 1
+                continue
+            self._paragraphs.add(key)
+            yield paragraph
+
+    def is_duplicate(self, chunk: str) -> bool:
+        """
+        True if a near-identical chunk was seen before; otherwise remember this one.
+        """
+        fingerprint = simhash(chunk)
+        bands = [(fingerprint >> (b * _BAND_BITS)) & _BAND_MASK for b in range(_BANDS)]
+        for b, value in enumerate(bands):
+            for other in self._bands[b].get(value, ()):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    self.stats.chunks_skipped += 1
+                    return True
+        for b, value in enumerate(bands):
+            self._bands[b].setdefault(value, []).append(fingerprint)
+        return False
+
+
+def shared_prefix(previous: str, chunk: str, max_chars: int = 2048) -> str:
+    """
+    Text the splitter repeated from the end of `previous` at the start of `chunk` (its overlap).
+    """
+    if not previous or not chunk:
+        return ""
+    tail = previous[-max_chars:]
+    probe = chunk[:16]
+    start = tail.find(probe)
+    while start >= 0:
+        if chunk.startswith(tail[start:]):
+            return tail[start:]
+        start = tail.find(probe, start + 1)
+    return ""
+
+
+def _rel_key(rel):
+    return (str(rel.source.id).lower(), str(rel.target.id).lower(), rel.type.lower())
+
+
+class OverlapDeduper:
+    """
+    Post-extraction dedup of relationships read twice from the overlap between neighbouring
+    chunks. A relationship found in both chunk i and chunk i + 1 whose two endpoints occur in
+    their shared text is kept once, in the chunk that finished first, so edge weights count
+    mentions instead of splitter overlaps. Works in completion order: each finished chunk is
+    compared with whichever neighbours are already done, and dropped from memory once both are.
+    """
+
+    def __init__(self, stats: DedupStats = None):
+        self.stats = stats or DedupStats()
+        # chunk index -> [overlap with the previous chunk (lowercased), relationship keys]
+        self._done = {}
+
+    def add(self, index: int, graph_doc, overlap: str = ""):
+        keys = {_rel_key(rel) for rel in graph_doc.relationships}
+        self._done[index] = [overlap.lower(), keys]
+        drop = set()
+        previous = self._done.get(index - 1)
+        if previous is not None:
+            drop |= self._shared(self._done[index][0], keys, previous[1])
+        following = self._done.get(index + 1)
+        if following is not None:
+            drop |= self._shared(following[0], keys, following[1])
+        if drop:
+            kept = [rel for rel in graph_doc.relationships if _rel_key(rel) not in drop]
+            self.stats.relationships_dropped += len(graph_doc.relationships) - len(kept)
+            graph_doc.relationships = kept
+        for i in (index - 1, index, index + 1):
+            if i in self._done and i - 1 in self._done and i + 1 in self._done:
+                self._done[i] = ["", None]  # both neighbours compared; only "done" is still needed
+
+    @staticmethod
+    def _shared(overlap, keys, other_keys):
+        if not overlap or not other_keys:
+            return set()
+        return {key for key in keys & other_keys if key[0] in overlap and key[1] in overlap}
@@ -1,21 +1,132 @@
-import os 
+import os
 import hashlib
 from src.config.folder_con import DATA_DIR
+from src.graph.graph_store import load_graph_data, save_graph_data, diff_graphs
+from src.graph.visulization import render_graph, render_diff, CompactNetwork
+from src.graph.graph_viewer import ASSET_DIR, install_assets
+from src.utils.graph_catalog import get_catalog, VIEW_MARKER
+from src.utils.tracing import traced
 
 
 def file_already_exist(hash_of_text):
-    hash_files = [file_hash.replace(".html","") for file_hash in os.listdir(DATA_DIR) if file_hash.endswith('.html')]
-    return  hash_of_text in hash_files
+    return get_catalog().exists(hash_of_text)
 
 
 def hash_text(text):
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-def list_graph_files():
-    return [f for f in os.listdir(DATA_DIR) if f.endswith('.html')]
+def list_graph_files(search="", offset=0, limit=50):
+    """
+    One page of stored graphs from the catalog (newest first), as <name>.html view names.
+    """
+    return [entry["name"] + '.html' for entry in get_catalog().list(search, offset, limit)]
 
 
+def count_graph_files(search=""):
+    return get_catalog().count(search)
+
+
+def graph_data_path(name):
+    return os.path.join(DATA_DIR, f"{name}.npz")
+
+
+@traced("save")
+def save_graph(graph_data, name, lineage=None):
+    """
+    Store a graph's data as DATA_DIR/<name>.npz and record it in the catalog once written.
+
+    lineage (e.g. the document's file name) links graphs of revisions of the same document:
+    the graph becomes its next version and is stored as the changes against the previous one
+    (see save_graph_data).
+    """
+    catalog = get_catalog()
+    parent_path = None
+    if lineage:
+        latest = catalog.latest_version(lineage)
+        version, parent = 1, None
+        if latest is not None and latest["name"] == name:
+            version, parent = latest["version"], latest["parent"]
+        elif latest is not None:
+            version, parent = latest["version"] + 1, latest["name"]
+        if parent is not None and os.path.exists(graph_data_path(parent)):
+            parent_path = graph_data_path(parent)
+        graph_data.meta.update(lineage=lineage, version=version, parent=parent)
+    path = save_graph_data(graph_data, graph_data_path(name), parent_path)
+    catalog.register_data(name, graph_data, path)
+    return path
+
+
+@traced("save_html")
 def save_graph_html(net, filename):
+    """
+    Write a PyVis network's HTML atomically (temporary file + rename), so a crash mid-write
+    never leaves a truncated view behind.
+    """
+    path = os.path.join(DATA_DIR, filename)
+    if isinstance(net, CompactNetwork):
+        # Compact pages load vis-network from DATA_DIR/assets, so they also open offline
+        install_assets(os.path.join(DATA_DIR, ASSET_DIR))
+    html = net.generate_html(name=path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+    name = os.path.splitext(filename)[0]
+    if VIEW_MARKER in name:
+        get_catalog().add_view(name.split(VIEW_MARKER)[0], path)
+    else:
+        get_catalog().register_html(name, path)
+    return path
+
+
+def discard_graph_html(name):
+    """
+    Remove a graph's rendered HTML (and view variants) after its data changed; it is
+    re-rendered on next view.
+    """
+    for path in get_catalog().pop_views(name):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def ensure_graph_html(filename, max_nodes=None, lod=False, graph_data=None):
+    """
+    Return the HTML view of a stored graph, rendering it from the graph data if it is missing.
+    A node cap or clustering renders a separate view file next to the default one.
+    graph_data, when the caller still holds the stored graph in memory, is rendered instead of
+    loading it back from disk.
+    """
+    name = os.path.splitext(filename)[0]
+    if max_nodes:
+        filename = f"{name}{VIEW_MARKER}{int(max_nodes)}{'-lod' if lod else ''}.html"
+    path = os.path.join(DATA_DIR, filename)
+    if os.path.exists(path):
+        return path
+    if graph_data is None:
+        data_path = graph_data_path(name)
+        if not os.path.exists(data_path):
+            # Graphs saved before graph data was stored only exist as their default view
+            return os.path.join(DATA_DIR, f"{name}.html")
+        graph_data = load_graph_data(data_path)
+    return save_graph_html(render_graph(graph_data, max_nodes=max_nodes, lod=lod), filename)
+
+
+def ensure_diff_html(name, base_name=None, changes_only=False, max_nodes=None):
+    """
+    HTML view of a stored graph with the changes since base_name (default: its previous
+    version) highlighted. Cached like other views and dropped when the graph changes.
+    Returns (path, diff summary), or (None, None) when there is no earlier version to compare.
+    """
+    if base_name is None:
+        version = get_catalog().version_of(name)
+        base_name = version and version["parent"]
+    if not base_name or not os.path.exists(graph_data_path(base_name)) or not os.path.exists(graph_data_path(name)):
+        return None, None
+    old, new = load_graph_data(graph_data_path(base_name)), load_graph_data(graph_data_path(name))
+    diff = diff_graphs(old, new)
+    filename = (f"{name}{VIEW_MARKER}diff-{base_name[:16]}{'-changes' if changes_only else ''}"
+                f"{f'-{int(max_nodes)}' if max_nodes else ''}.html")
     path = os.path.join(DATA_DIR, filename)
-    net.save_graph(path)
-    return path
\ No newline at end of file
+    if not os.path.exists(path):
+        path = save_graph_html(render_diff(diff, max_nodes=max_nodes, changes_only=changes_only), filename)
+    return path, diff.summary()
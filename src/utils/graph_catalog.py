@@ -0,0 +1,239 @@
+import os
+import time
+import sqlite3
+import threading
+from src.config.folder_con import DATA_DIR
+from src.graph.graph_store import load_manifest
+from src.graph.communities import COMMUNITY_SUFFIX
+
+
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog.sqlite")
+
+# Rendered variants of a stored graph (node cap, clustering) are cached as <name>.view-<...>.html
+VIEW_MARKER = ".view-"
+
+_COLUMNS = ("name", "model", "created", "updated", "num_nodes", "num_edges", "documents", "data_path", "html_path")
+_VERSION_COLUMNS = ("lineage", "version", "name", "parent", "created")
+
+
+class GraphCatalog:
+    """
+    SQLite index of stored graphs (name/content hash, model, counts, file paths) so lookups
+    and listings don't scan DATA_DIR. Entries are written only after their files were fully
+    written, so an interrupted generation is never reported as an existing graph.
+    """
+
+    def __init__(self, path=CATALOG_PATH, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        new = not os.path.exists(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS graphs ("
+            " name TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " created REAL NOT NULL,"
+            " updated REAL NOT NULL,"
+            " num_nodes INTEGER,"
+            " num_edges INTEGER,"
+            " documents INTEGER,"
+            " data_path TEXT,"
+            " html_path TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_graphs_updated ON graphs(updated)")
+        # Rendered view variants per graph, removed together when the graph changes
+        self._conn.execute("CREATE TABLE IF NOT EXISTS views (name TEXT NOT NULL, path TEXT PRIMARY KEY)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_views_name ON views(name)")
+        # Versions of a document: graphs of its revisions, linked by the document (lineage) name
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            " lineage TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " name TEXT NOT NULL,"
+            " parent TEXT,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (lineage, name))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_versions_name ON versions(name)")
+        self._conn.commit()
+        if new:
+            self.rebuild()
+
+    def _upsert(self, name, **fields):
+        now = time.time()
+        names = ", ".join(fields)
+        marks = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{k} = excluded.{k}" for k in fields)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO graphs (name, created, updated, {names}) VALUES (?, ?, ?, {marks})"
+                f" ON CONFLICT(name) DO UPDATE SET updated = excluded.updated, {updates}",
+                (name, now, now, *fields.values()),
+            )
+            self._conn.commit()
+
+    def register_data(self, name, graph_data, data_path):
+        meta = graph_data.meta or {}
+        model = meta.get("model") or ",".join(meta.get("models", []))
+        documents = len(meta["documents"]) if "documents" in meta else 1
+        self._upsert(name, model=model, num_nodes=graph_data.num_nodes, num_edges=graph_data.num_edges,
+                     documents=documents, data_path=data_path)
+        if meta.get("lineage"):
+            self._add_version(meta["lineage"], meta["version"], name, meta.get("parent"))
+
+    def _add_version(self, lineage, version, name, parent, created=None):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO versions ({', '.join(_VERSION_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                (lineage, version, name, parent, created or time.time()),
+            )
+            self._conn.commit()
+
+    def versions(self, lineage):
+        """
+        Versions of a document, oldest first.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_VERSION_COLUMNS)} FROM versions WHERE lineage = ? ORDER BY version",
+                (lineage,),
+            ).fetchall()
+        return [dict(zip(_VERSION_COLUMNS, row)) for row in rows]
+
+    def latest_version(self, lineage):
+        versions = self.versions(lineage)
+        return versions[-1] if versions else None
+
+    def version_of(self, name):
+        """
+        The version record of a graph (lineage, version number, parent graph), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_VERSION_COLUMNS)} FROM versions WHERE name = ? ORDER BY created DESC",
+                (name,),
+            ).fetchone()
+        return dict(zip(_VERSION_COLUMNS, row)) if row else None
+
+    def register_html(self, name, html_path):
+        self._upsert(name, html_path=html_path)
+
+    def add_view(self, name, path):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO views (name, path) VALUES (?, ?)", (name, path))
+            self._conn.commit()
+
+    def pop_views(self, name):
+        """
+        Forget and return the view files of a graph (the default HTML included).
+        """
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute("SELECT path FROM views WHERE name = ?", (name,))]
+            row = self._conn.execute("SELECT html_path FROM graphs WHERE name = ?", (name,)).fetchone()
+            self._conn.execute("DELETE FROM views WHERE name = ?", (name,))
+            self._conn.execute("UPDATE graphs SET html_path = NULL WHERE name = ?", (name,))
+            self._conn.commit()
+        if row and row[0]:
+            paths.append(row[0])
+        return paths
+
+    def get(self, name):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM graphs WHERE name = ?", (name,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def exists(self, name) -> bool:
+        """
+        Primary-key lookup plus a stat of the graph's own files (catches files deleted by hand).
+        """
+        entry = self.get(name)
+        if entry is None:
+            return False
+        return any(path and os.path.exists(path) for path in (entry["data_path"], entry["html_path"]))
+
+    def _where(self, search):
+        if not search:
+            return "", ()
+        return " WHERE name LIKE ? OR model LIKE ?", (f"%{search}%", f"%{search}%")
+
+    def count(self, search: str = "") -> int:
+        where, params = self._where(search)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM graphs{where}", params).fetchone()[0]
+
+    def list(self, search: str = "", offset: int = 0, limit: int = 50):
+        """
+        One page of graphs, most recently updated first, optionally filtered by name or model.
+        """
+        where, params = self._where(search)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM graphs{where} ORDER BY updated DESC, name LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def rebuild(self):
+        """
+        Index graphs already in the data directory (one scan, on first use or on request).
+        """
+        entries = {}
+        for f in os.listdir(self.data_dir):
+            name, ext = os.path.splitext(f)
+            if ext not in (".npz", ".html") or VIEW_MARKER in f or name.endswith((".tmp", COMMUNITY_SUFFIX)):
+                continue
+            path = os.path.join(self.data_dir, f)
+            entry = entries.setdefault(name, {"created": os.path.getmtime(path)})
+            entry["data_path" if ext == ".npz" else "html_path"] = path
+
+        rows, versions = [], []
+        for name, entry in entries.items():
+            model, num_nodes, num_edges, documents = None, None, None, None
+            if "data_path" in entry:
+                try:
+                    manifest = load_manifest(entry["data_path"])
+                    meta = manifest.get("meta") or {}
+                    model = meta.get("model") or ",".join(meta.get("models", []))
+                    num_nodes, num_edges = manifest.get("num_nodes"), manifest.get("num_edges")
+                    documents = len(meta["documents"]) if "documents" in meta else 1
+                    if meta.get("lineage"):
+                        versions.append((meta["lineage"], meta["version"], name, meta.get("parent"),
+                                         manifest.get("created") or entry["created"]))
+                except Exception as e:
+                    print(f"[Warning] Skipping unreadable graph data '{entry['data_path']}': {e}")
+                    entry.pop("data_path")
+                    if "html_path" not in entry:
+                        continue
+            rows.append((name, model, entry["created"], entry["created"], num_nodes, num_edges, documents,
+                         entry.get("data_path"), entry.get("html_path")))
+        with self._lock:
+            self._conn.execute("DELETE FROM graphs")
+            self._conn.executemany(
+                f"INSERT INTO graphs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})", rows
+            )
+            self._conn.execute("DELETE FROM versions")
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO versions ({', '.join(_VERSION_COLUMNS)}) VALUES (?, ?, ?, ?, ?)", versions
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def close(self):
+        self._conn.close()
+
+
+_shared_catalog = None
+_shared_lock = threading.Lock()
+
+
+def get_catalog() -> GraphCatalog:
+    """
+    Process-wide graph catalog, opened (and built from DATA_DIR if new) on first use.
+    """
+    global _shared_catalog
+    if _shared_catalog is None:
+        with _shared_lock:
+            if _shared_catalog is None:
+                _shared_catalog = GraphCatalog()
+    return _shared_catalog
@@ -0,0 +1,49 @@
+import io
+import os
+import hashlib
+
+BLOCK_SIZE = 1 << 20  # 1 MiB
+
+
+def _open_binary(source):
+    """
+    Return (binary file object, should_close) for a path or an already open binary stream.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb"), True
+    return source, False
+
+
+def hash_stream(source, block_size: int = BLOCK_SIZE) -> str:
+    """
+    sha256 of a file or binary stream, read in blocks. For utf-8 input this equals
+    hash_text() of the decoded text, so existing graphs are still found.
+    Streams are rewound afterwards so they can be read again.
+    """
+    f, should_close = _open_binary(source)
+    h = hashlib.sha256()
+    try:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    finally:
+        if should_close:
+            f.close()
+        else:
+            f.seek(0)
+    return h.hexdigest()
+
+
+def iter_lines(source, encoding: str = "utf-8"):
+    """
+    Yield decoded lines from a path or binary stream without reading it all into memory.
+    Undecodable bytes are replaced rather than aborting the whole document.
+    """
+    f, should_close = _open_binary(source)
+    reader = io.TextIOWrapper(f, encoding=encoding, errors="replace")
+    try:
+        yield from reader
+    finally:
+        if should_close:
+            reader.close()
+        else:
+            reader.detach()  # leave the caller's stream open
@@ -1,13 +1,49 @@
 import re
 
-def clean_text(text: str) -> str:
+# URLs, emails, phone numbers and special characters are removed in a single regex pass.
+# Phone numbers may not span lines since cleaning works line by line.
+_NOISE = r'https?://\S+|www\.\S+|\S+@\S+|\+?\d[\d \t-]{7,}\d'
+_STRIP_ASCII_RE = re.compile(_NOISE + r'|[^a-zA-Z0-9\s.,;:!?()-]')
+_STRIP_UNICODE_RE = re.compile(_NOISE + r'|[^\w\s.,;:!?()-]|_')
+
+
+def clean_line(line: str, keep_unicode: bool = True) -> str:
+    """
+    Cleans a single line: removes URLs, emails, phone numbers and special characters,
+    and collapses whitespace.
+    """
+    strip = _STRIP_UNICODE_RE if keep_unicode else _STRIP_ASCII_RE
+    return ' '.join(strip.sub('', line).split())
+
+
+def iter_clean_paragraphs(lines, keep_unicode: bool = True, max_chars: int = 1_000_000):
+    """
+    Streams cleaned paragraphs from an iterable of lines (e.g. an open file).
+    Blank input lines end a paragraph; lines that only clean to nothing (e.g. a URL) are
+    skipped. Lines inside a paragraph are kept on separate lines.
+    Only the current paragraph is held in memory; paragraphs longer than max_chars
+    are emitted in pieces at line boundaries.
+    """
+    paragraph = []
+    size = 0
+    for line in lines:
+        blank = not line.strip()
+        cleaned = '' if blank else clean_line(line, keep_unicode)
+        if cleaned:
+            paragraph.append(cleaned)
+            size += len(cleaned)
+        if paragraph and (blank or size >= max_chars):
+            yield '\n'.join(paragraph)
+            paragraph = []
+            size = 0
+    if paragraph:
+        yield '\n'.join(paragraph)
+
+
+def clean_text(text: str, keep_unicode: bool = True) -> str:
     """
     Cleans text by removing URLs, emails, phone numbers, extra spaces, and special characters.
+    Paragraph breaks are kept as blank lines so the chunker can split on them; with
+    keep_unicode, accented and non-Latin letters are kept instead of being deleted.
     """
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)          # Remove URLs
-    text = re.sub(r'\S+@\S+', '', text)                        # Remove emails
-    text = re.sub(r'\+?\d[\d\s-]{7,}\d', '', text)            # Remove phone numbers
-    text = re.sub(r'[^a-zA-Z0-9\s.,;:!?()-]', '', text)       # Remove special chars
-    text = re.sub(r'\n+', '\n', text)                          # Normalize newlines
-    text = re.sub(r'\s+', ' ', text).strip()                  # Normalize spaces
-    return text
\ No newline at end of file
+    return '\n\n'.join(iter_clean_paragraphs(text.splitlines(), keep_unicode))
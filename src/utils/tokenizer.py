@@ -0,0 +1,55 @@
+import re
+from src.model.model_info import count_prompt_tokens
+
+# Word pieces and single punctuation marks, roughly how BPE tokenizers split English text
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Representative sample used to calibrate the approximation against a model's tokenizer
+_CALIBRATION_SAMPLE = (
+    "Marie Curie was a Polish and naturalised-French physicist and chemist who conducted "
+    "pioneering research on radioactivity. She was the first woman to win a Nobel Prize, "
+    "the first person to win a Nobel Prize twice, and the only person to win a Nobel Prize "
+    "in two scientific fields. Her husband, Pierre Curie, was a co-winner of her first "
+    "Nobel Prize. In 1906 she became the first woman professor at the University of Paris.\n\n"
+    "The Curies' daughter, Irene Joliot-Curie, and son-in-law, Frederic Joliot-Curie, "
+    "also won Nobel Prizes (1935, Chemistry) for discovering artificial radioactivity."
+)
+
+_calibration = {}
+
+
+def approx_token_count(text: str) -> int:
+    """
+    Offline token estimate: about one token per 4 characters of each word, one per punctuation mark.
+    Per-piece rounding is averaged out (calibrate() corrects the remaining bias per model).
+    """
+    pieces = _TOKEN_RE.findall(text)
+    return (sum(map(len, pieces)) + 3 * len(pieces)) // 4
+
+
+def calibrate(model: str) -> float:
+    """
+    Ratio between the model's real token count and approx_token_count, measured once per model.
+    Falls back to 1.0 (pure approximation) when Ollama is unreachable.
+    """
+    if model not in _calibration:
+        try:
+            real = count_prompt_tokens(model, _CALIBRATION_SAMPLE)
+            _calibration[model] = real / approx_token_count(_CALIBRATION_SAMPLE)
+        except Exception as e:
+            print(f"[Warning] Token calibration failed for {model}: {e}, using approximation")
+            return 1.0
+    return _calibration[model]
+
+
+def get_token_counter(model: str = None):
+    """
+    Return a callable counting tokens the way `model` does (calibrated approximation).
+    Without a model, the uncalibrated offline approximation is used.
+    """
+    ratio = calibrate(model) if model else 1.0
+
+    def count_tokens(text: str) -> int:
+        return int(approx_token_count(text) * ratio + 0.5)
+
+    return count_tokens
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from src.config.folder_con import DATA_DIR
+from src.config.pipeline_con import TRACING_ENABLED, TRACE_MAX_MB
+
+TRACE_PATH = os.path.join(DATA_DIR, "traces.jsonl")
+METRICS_PATH = os.path.join(DATA_DIR, "metrics.prom")
+
+# Spans are written in batches; the file is rotated to traces.jsonl.1 beyond TRACE_MAX_MB
+_FLUSH_EVERY = 256
+
+_current_span = contextvars.ContextVar("kg_current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "trace_id", "start", "attrs", "status")
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.start = time.time()
+        self.attrs = attrs
+        self.status = "ok"
+
+    def update(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """
+    In-process spans and counters for the generation pipeline.
+
+    A span costs a perf_counter pair, a small dict and a list append; spans are exported as
+    JSON lines in batches and aggregated per name for the Prometheus text file and the UI
+    summary, so tracing can stay on in production. Spans nest through a context variable,
+    which asyncio tasks inherit, so chunk spans point at their document span.
+    """
+
+    def __init__(self, trace_path=TRACE_PATH, metrics_path=METRICS_PATH, enabled=TRACING_ENABLED,
+                 max_bytes=int(TRACE_MAX_MB * 1024 * 1024)):
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Held for a whole flush, so batches from different threads are written one after another
+        self._write_lock = threading.Lock()
+        self._buffer = []
+        self.counters = {}
+        # name -> [count, total seconds, max seconds, errors]
+        self.span_stats = {}
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            yield Span(name, None, attrs)
+            return
+        span = Span(name, _current_span.get(), attrs)
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float, **attrs):
+        """
+        Record an already measured duration (e.g. time spent inside a lazy generator) as a span.
+        """
+        if self.enabled:
+            self._finish(Span(name, _current_span.get(), attrs), seconds)
+
+    def _finish(self, span, seconds):
+        record = {
+            "name": span.name, "trace": span.trace_id, "span": span.span_id, "parent": span.parent_id,
+            "start": round(span.start, 6), "seconds": round(seconds, 6), "status": span.status,
+        }
+        if span.attrs:
+            record["attrs"] = span.attrs
+        with self._lock:
+            stats = self.span_stats.setdefault(span.name, [0, 0.0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += span.status != "ok"
+            self._buffer.append(record)
+            flush = len(self._buffer) >= _FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled or not value:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name: str) -> float:
+        """
+        Total of a counter over all label values.
+        """
+        with self._lock:
+            return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def flush(self):
+        """
+        Append buffered spans to the JSONL trace and rewrite the Prometheus metrics file.
+        """
+        if not self.enabled:
+            return
+        with self._write_lock:
+            with self._lock:
+                records, self._buffer = self._buffer, []
+                counters = dict(self.counters)
+                span_stats = {k: list(v) for k, v in self.span_stats.items()}
+            try:
+                if records:
+                    if os.path.exists(self.trace_path) and os.path.getsize(self.trace_path) > self.max_bytes:
+                        os.replace(self.trace_path, self.trace_path + ".1")
+                    with open(self.trace_path, "a", encoding="utf-8") as f:
+                        f.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+                self._write_metrics(counters, span_stats)
+            except OSError as e:
+                print(f"[Warning] Could not write traces: {e}")
+
+    def _write_metrics(self, counters, span_stats):
+        lines = []
+        for (name, labels), value in sorted(counters.items()):
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"kg_{name}_total{{{label_text}}} {value}" if labels else f"kg_{name}_total {value}")
+        for name, (count, total, longest, errors) in sorted(span_stats.items()):
+            lines.append(f'kg_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'kg_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'kg_span_seconds_max{{span="{name}"}} {longest:.6f}')
+            lines.append(f'kg_span_errors_total{{span="{name}"}} {errors}')
+        tmp_path = self.metrics_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.metrics_path)
+
+    def summary(self):
+        """
+        Aggregates for display: per span name (count, total/avg/max seconds, errors) and counters.
+        """
+        with self._lock:
+            spans = {
+                name: {"count": c, "total_s": round(t, 3), "avg_s": round(t / c, 4) if c else 0.0,
+                       "max_s": round(m, 3), "errors": e}
+                for name, (c, t, m, e) in self.span_stats.items()
+            }
+            counters = {}
+            for (name, _), value in self.counters.items():
+                counters[name] = counters.get(name, 0) + value
+        return {"spans": spans, "counters": counters}
+
+
+class TimedIterator:
+    """
+    Iterator wrapper accumulating the time spent producing items (upstream stages included).
+    Used to measure lazy pipeline stages that run inside the extraction loop.
+    """
+
+    def __init__(self, iterable):
+        self._it = iter(iterable)
+        self.seconds = 0.0
+        self.items = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            item = next(self._it)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.items += 1
+        return item
+
+
+def traced(name: str):
+    """
+    Decorator running a function inside a span of the shared tracer.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_shared_tracer = None
+_shared_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Process-wide tracer shared by the app, background jobs and the CLI. Created under a lock,
+    so threads that start at the same time all count into the same tracer.
+    """
+    global _shared_tracer
+    if _shared_tracer is None:
+        with _shared_tracer_lock:
+            if _shared_tracer is None:
+                _shared_tracer = Tracer()
+    return _shared_tracer
@@ -0,0 +1,34 @@
+import numpy as np
+from src.graph.graph_store import GraphData, save_graph_data
+from src.graph.communities import detect_communities, load_communities, community_path
+from src.graph.visulization import render_communities
+
+
+def _graph(node_ids, edges):
+    edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+    return GraphData(node_ids, np.zeros(len(node_ids), dtype=np.int64), ["Person"] if node_ids else [],
+                     edges[:, 0], edges[:, 1], np.zeros(len(edges), dtype=np.int64), ["KNOWS"] if len(edges) else [])
+
+
+def test_disconnected_components_become_communities():
+    # A-B-C and D-E-F: no edges between the two communities
+    graph = _graph(list("ABCDEF"), [(0, 1), (1, 2), (3, 4), (4, 5)])
+    hierarchy = detect_communities(graph, top_max=1)
+    membership = hierarchy.membership(hierarchy.top_level)
+    assert hierarchy.count(hierarchy.top_level) == 2
+    assert len(set(membership[:3])) == 1 and len(set(membership[3:])) == 1
+    assert membership[0] != membership[3]
+    assert hierarchy.modularity[-1] == 0.5
+    assert len(render_communities(hierarchy, graph).nodes) == 2
+
+
+def test_empty_graph(tmp_path):
+    graph = _graph([], [])
+    hierarchy = detect_communities(graph)
+    assert hierarchy.count(hierarchy.top_level) == 0
+    assert hierarchy.describe(hierarchy.top_level, [], graph) == []
+
+    path = save_graph_data(graph, str(tmp_path / "empty.npz"))
+    stored = load_communities(path)
+    assert stored.count(stored.top_level) == 0
+    assert (tmp_path / "empty.communities.npz").exists() and community_path(path).endswith(".communities.npz")